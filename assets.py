@@ -0,0 +1,128 @@
+"""Static files, fingerprinted and precompressed once at startup.
+
+StaticAssets reads every file under the static folder into memory and
+names each one after a hash of its content, so js/index.js is also served
+as js/index.<hash>.js. Text files get gzip copies, and brotli copies when
+the optional brotli package is installed; a request gets the smallest
+encoding it accepts, with nothing compressed per request.
+
+Fingerprinted URLs never change content, so they are cached for a year as
+immutable. Plain names still work, with an ETag and no-cache, so they
+cost a 304 once the browser has them. CSS references to /static/... are
+rewritten to the fingerprinted names. Templates link assets through
+asset_url(); files edited while the server runs are picked up on restart.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import Response, abort
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Below this, compression saves less than the headers it adds
+MIN_COMPRESS_SIZE = 256
+
+# Preferred first
+ENCODINGS = ('br', 'gzip')
+
+CSS_URL = re.compile(rb'''url\((['"]?)/static/([^'")?#]+)\1\)''')
+
+
+class Asset:
+    __slots__ = ('name', 'digest', 'mimetype', 'bodies')
+
+    def __init__(self, name, digest, mimetype, bodies):
+        self.name = name  # Fingerprinted path under the static folder
+        self.digest = digest
+        self.mimetype = mimetype
+        self.bodies = bodies  # Content-Encoding ('identity' for none) -> bytes
+
+    def etag(self, encoding):
+        return self.digest if encoding == 'identity' else f'{self.digest}-{encoding}'
+
+
+def compress(data, encoding):
+    if encoding == 'gzip':
+        # mtime=0 keeps the output, and so its ETag, the same on every build
+        return gzip.compress(data, 9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+class StaticAssets:
+    def __init__(self, directory, url_path='/static'):
+        self.directory = directory
+        self.url_path = url_path
+        self._assets = {}  # Path under the static folder -> Asset
+        self._served = {}  # Plain or fingerprinted path -> (Asset, immutable)
+        self.build()
+
+    def build(self):
+        paths = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                paths.append(os.path.relpath(os.path.join(root, name), self.directory).replace(os.sep, '/'))
+        # CSS last, so the files it references already have their names
+        for path in sorted(paths, key=lambda path: (path.endswith('.css'), path)):
+            with open(os.path.join(self.directory, path), 'rb') as f:
+                data = f.read()
+            if path.endswith('.css'):
+                data = CSS_URL.sub(self._rewrite_url, data)
+            self._add(path, data)
+
+    def _rewrite_url(self, match):
+        asset = self._assets.get(match.group(2).decode())
+        if asset is None:
+            return match.group(0)
+        return b'url(%s%s/%s%s)' % (match.group(1), self.url_path.encode(), asset.name.encode(), match.group(1))
+
+    def _add(self, path, data):
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        root, ext = posixpath.splitext(path)
+        name = f'{root}.{digest}{ext}'
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        bodies = {'identity': data}
+        if mimetype.startswith(COMPRESSIBLE_TYPES) and len(data) >= MIN_COMPRESS_SIZE:
+            for encoding in ENCODINGS:
+                if encoding == 'br' and brotli is None:
+                    continue
+                compressed = compress(data, encoding)
+                if len(compressed) < len(data):
+                    bodies[encoding] = compressed
+        asset = Asset(name, digest, mimetype, bodies)
+        self._assets[path] = asset
+        self._served[path] = (asset, False)
+        self._served[name] = (asset, True)
+
+    def url(self, path):
+        """The fingerprinted URL of a file under the static folder."""
+        return f'{self.url_path}/{self._assets[path].name}'
+
+    def response(self, path, request):
+        found = self._served.get(path)
+        if found is None:
+            abort(404)
+        asset, immutable = found
+        encoding = next((encoding for encoding in ENCODINGS
+                         if encoding in asset.bodies and request.accept_encodings[encoding]), 'identity')
+        if any(request.if_none_match.contains_weak(asset.etag(known)) for known in asset.bodies):
+            response = Response(status=304)
+        else:
+            response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(asset.etag(encoding))
+        response.headers['Cache-Control'] = IMMUTABLE if immutable else REVALIDATE
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
@@ -0,0 +1,39 @@
+"""Compare two saved benchmark runs (the --json output of a benchmark).
+
+Prints every metric in both runs with its relative change.
+
+    python benchmarks/compare.py old.json new.json
+"""
+import argparse
+import json
+
+
+def number(value):
+    # Metrics without enough samples are saved as null
+    return f'{"-":>12}' if value is None else f'{value:>12.6g}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old['benchmark'] != new['benchmark']:
+        parser.error(f'{args.old} is {old["benchmark"]} but {args.new} is {new["benchmark"]}')
+
+    print(f'{old["benchmark"]}: {old["commit"]} -> {new["commit"]}')
+    print(f'{"name":<28} {"metric":<14} {"old":>12} {"new":>12} {"change":>8}')
+    for name, metrics in new['results'].items():
+        for metric, value in metrics.items():
+            before = old['results'].get(name, {}).get(metric)
+            change = f'{(value - before) / before * 100:+.1f}%' if before and value is not None else ''
+            print(f'{name:<28} {metric:<14} {number(before)} {number(value)} {change:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Micro-benchmarks of the pure game functions the Socket.IO handlers call.
+
+Each benchmark prepares --ops independent inputs outside the timed section,
+runs the function once on each, and reports the median cost per call over
+--repeat runs. get_leaderboard runs against a throwaway SQLite database
+seeded with --scores rows, so it never touches the real one.
+
+    python benchmarks/game_functions.py [--ops 10000] [--repeat 5] [--json out.json]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from models import db, User, Score
+from snake import SnakeRoom, advance_snake
+from tetris import BOARD_HEIGHT, FULL_ROW, TetrisRoom, fits, place_piece, check_completed_lines, move_tetris_piece
+from tictactoe import TicTacToeRoom, play, ai_move
+
+import results
+
+GAME_TYPES = ['snake', 'tetris', 'pong', 'tictactoe']
+
+
+def snake_rooms(ops):
+    # Fresh snakes start 20 cells from a wall, so one tick never ends a game
+    return [(SnakeRoom(),) for _ in range(ops)]
+
+
+def landed_pieces(ops):
+    # A piece dropped to the floor of an empty board, ready to lock
+    games = []
+    for _ in range(ops):
+        game = TetrisRoom()
+        while fits(game.board, game.piece, game.rotation, game.row + 1, game.col):
+            game.row += 1
+        games.append((game,))
+    return games
+
+
+def full_rows(ops):
+    # Four full rows at the bottom and a scattered stack above them
+    games = []
+    for _ in range(ops):
+        game = TetrisRoom()
+        for row in range(BOARD_HEIGHT - 8, BOARD_HEIGHT - 4):
+            game.board[row] = random.randrange(FULL_ROW)
+        for row in range(BOARD_HEIGHT - 4, BOARD_HEIGHT):
+            game.board[row] = FULL_ROW
+        games.append((game,))
+    return games
+
+
+def tetris_moves(ops):
+    return [(TetrisRoom(), random.choice(('left', 'right', 'rotate', 'down'))) for _ in range(ops)]
+
+
+def tictactoe_winning_moves(ops):
+    # X holds 0 and 1 and O holds 3 and 4; X plays 2 and wins
+    games = []
+    for _ in range(ops):
+        game = TicTacToeRoom()
+        for cell in (0, 3, 1, 4):
+            play(game, cell)
+        games.append((game, 2))
+    return games
+
+
+def tictactoe_openings(ops):
+    games = []
+    for _ in range(ops):
+        game = TicTacToeRoom(ai=True)
+        play(game, random.randrange(9))
+        games.append((game,))
+    return games
+
+
+MICRO = [
+    # (name, function, builds that many argument tuples)
+    ('advance_snake', advance_snake, snake_rooms),
+    ('place_piece', place_piece, landed_pieces),
+    ('check_completed_lines', check_completed_lines, full_rows),
+    ('move_tetris_piece', move_tetris_piece, tetris_moves),
+    ('tictactoe play (win)', play, tictactoe_winning_moves),
+    ('tictactoe ai_move', ai_move, tictactoe_openings),
+]
+
+
+def time_calls(fn, inputs):
+    clock = time.perf_counter
+    start = clock()
+    for args in inputs:
+        fn(*args)
+    return (clock() - start) / len(inputs)
+
+
+def bench(fn, make_inputs, repeat):
+    samples = [time_calls(fn, make_inputs()) for _ in range(repeat)]
+    return {'median_us': statistics.median(samples) * 1e6, 'min_us': min(samples) * 1e6}
+
+
+def bench_leaderboard(scores, users, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(User), [
+                {'username': f'user{i}', 'password_hash': 'x'} for i in range(users)
+            ])
+            now = datetime.utcnow()
+            db.session.execute(db.insert(Score), [
+                {'user_id': random.randint(1, users), 'game_type': random.choice(GAME_TYPES),
+                 'score': random.randint(0, 100000), 'date': now}
+                for _ in range(scores)
+            ])
+            db.session.commit()
+            db.session.execute(db.text('ANALYZE'))
+            inputs = [(GAME_TYPES[i % len(GAME_TYPES)],) for i in range(repeat * 20)]
+            return {
+                'get_leaderboard': bench(Score.get_leaderboard, lambda: inputs, repeat),
+                'get_leaderboard best': bench(
+                    lambda game_type: Score.get_leaderboard(game_type, best_per_user=True),
+                    lambda: inputs, repeat)
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scores', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help='also save the results here')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    timings = {name: bench(fn, lambda: make_inputs(args.ops), args.repeat) for name, fn, make_inputs in MICRO}
+    timings.update(bench_leaderboard(args.scores, args.users, args.repeat))
+
+    print(f'{"function":<24} {"median us":>10} {"min us":>10}')
+    for name, timing in timings.items():
+        print(f'{name:<24} {timing["median_us"]:>10.3f} {timing["min_us"]:>10.3f}')
+    if args.json:
+        results.save(args.json, 'game_functions', args, timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Import time: how long `import server` and `create_app()` take in a fresh interpreter.
+
+Each run imports the server in a new process with `python -X importtime`
+and builds the app, against a database path that does not exist yet, as a
+worker, a script or the flask CLI would on a cold start. Reports the median
+import time of the server module, of create_app() and of the two together
+(startup), the process's wall time, and the packages that cost the most,
+summed over their modules (self time). The gevent patching that wsgi.py
+does first is not counted; it costs the same however the app is laid out.
+
+With --budget, exits with status 1 if the median startup takes longer, so
+it can guard against a slow module creeping back in. Building the app must
+also leave the database alone and load no game's handlers (they load with
+the game's first event): a run that does either fails as well.
+
+    python benchmarks/import_time.py [--runs 9] [--top 10] [--budget 1500] [--json out.json]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse(stderr):
+    # Lines read 'import time:  self [us] | cumulative | imported package',
+    # a module's name indented by how deep in the import chain it is
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+# Prints create_app()'s time and the game handler modules loaded by then
+STARTUP = (
+    'import time, server; start = time.perf_counter(); server.create_app(); '
+    'print(time.perf_counter() - start, *sorted(server.loaded_games))'
+)
+
+
+def run_once():
+    with tempfile.TemporaryDirectory() as db_dir:
+        path = os.path.join(db_dir, 'import.db')
+        env = dict(os.environ, GAMEHUB_DATABASE_URI=f'sqlite:///{path}')
+        env.pop('GAMEHUB_ROOM_STORE_URI', None)
+        env.pop('GAMEHUB_MESSAGE_QUEUE_URI', None)
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP],
+                              cwd=ROOT, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        if done.returncode:
+            sys.exit(f'create_app failed:\n{done.stderr[-2000:]}')
+        create, *loaded = done.stdout.split()
+        return wall, parse(done.stderr), float(create), loaded, os.path.exists(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=9)
+    parser.add_argument('--top', type=int, default=10, help='packages to list')
+    parser.add_argument('--budget', type=float, metavar='MS', help='fail if import and create_app take longer')
+    parser.add_argument('--json', metavar='PATH', help='also save the results here')
+    args = parser.parse_args()
+
+    walls, imports, creates, startups, packages = [], [], [], [], Counter()
+    touched_db = False
+    loaded_games = set()
+    for _ in range(args.runs):
+        wall, modules, create, loaded, created = run_once()
+        walls.append(wall)
+        imported = next(cumulative for name, _, cumulative in modules if name == 'server') / 1000
+        imports.append(imported)
+        creates.append(create * 1000)
+        startups.append(imported + create * 1000)
+        for name, own, _ in modules:
+            packages[name.split('.')[0]] += own
+        loaded_games.update(loaded)
+        touched_db |= created
+
+    import_ms = statistics.median(imports)
+    create_ms = statistics.median(creates)
+    startup_ms = statistics.median(startups)
+    wall_ms = statistics.median(walls) * 1000
+    print(f'import server: {import_ms:.0f} ms median ({min(imports):.0f} ms best)')
+    print(f'create_app(): {create_ms:.0f} ms median ({min(creates):.0f} ms best)')
+    print(f'startup: {startup_ms:.0f} ms median ({min(startups):.0f} ms best), '
+          f'{wall_ms:.0f} ms wall for the whole process')
+    print(f'{"package":<24} {"self ms":>8}')
+    for name, own in packages.most_common(args.top):
+        print(f'{name:<24} {own / args.runs / 1000:>8.1f}')
+    timings = {
+        'server': {'import_ms': import_ms, 'best_ms': min(imports), 'create_app_ms': create_ms,
+                   'startup_ms': startup_ms, 'wall_ms': wall_ms},
+        'packages': {name: own / args.runs / 1000 for name, own in packages.most_common(args.top)}
+    }
+    if args.json:
+        results.save(args.json, 'import_time', args, timings)
+
+    failed = False
+    if touched_db:
+        print('building the app created the database; schema setup belongs in `flask --app server init-db`')
+        failed = True
+    if loaded_games:
+        print(f'building the app loaded game handlers ({", ".join(sorted(loaded_games))}); they load on first use')
+        failed = True
+    if args.budget is not None and startup_ms > args.budget:
+        print(f'over budget: {startup_ms:.0f} ms > {args.budget:.0f} ms')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
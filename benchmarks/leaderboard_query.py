@@ -0,0 +1,129 @@
+"""Leaderboard query latency on a large Score table, before and after the
+(game_type, score DESC) index and the joined username query, and for a deep
+page fetched by OFFSET versus by keyset.
+
+Seeds a throwaway SQLite database, so it never touches the real one.
+
+    python benchmarks/leaderboard_query.py [--rows 1000000] [--users 5000] [--depth 100000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, User, Score, score_leaderboard_index
+
+GAME_TYPES = ['snake', 'tetris', 'pong', 'tictactoe']
+
+
+def legacy_leaderboard(game_type, limit=10):
+    # The query before this change: ORM rows plus one lazy user load per row
+    scores = Score.query.filter_by(game_type=game_type)\
+        .order_by(Score.score.desc())\
+        .limit(limit)\
+        .all()
+    return [(score.user.username, score.score) for score in scores]
+
+
+def offset_page(game_type, depth, limit=10):
+    # What paging without a cursor costs: every skipped row is still read
+    return db.session.execute(
+        db.select(Score.id, User.username, Score.score, Score.date)
+        .join(User)
+        .where(Score.game_type == game_type)
+        .order_by(Score.score.desc(), Score.id)
+        .offset(depth)
+        .limit(limit)
+    ).all()
+
+
+def page_cursors(depth):
+    # (score, id) of the row just above `depth`, per game type
+    cursors = {}
+    for game_type in GAME_TYPES:
+        row = offset_page(game_type, depth - 1, limit=1)[0]
+        cursors[game_type] = (row.score, row.id)
+    return cursors
+
+
+def timed(fn, repeat):
+    samples = []
+    for i in range(repeat):
+        game_type = GAME_TYPES[i % len(GAME_TYPES)]
+        # Fresh session each call so lazy loads are not served from the identity map
+        db.session.remove()
+        start = time.perf_counter()
+        fn(game_type)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def seed(rows, users):
+    db.session.execute(db.insert(User), [
+        {'username': f'user{i}', 'password_hash': 'x'} for i in range(users)
+    ])
+    now = datetime.utcnow()
+    chunk = 50000
+    for offset in range(0, rows, chunk):
+        db.session.execute(db.insert(Score), [
+            {
+                'user_id': random.randint(1, users),
+                'game_type': random.choice(GAME_TYPES),
+                'score': random.randint(0, 100000),
+                'date': now
+            }
+            for _ in range(min(chunk, rows - offset))
+        ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=100000, help='rows above the deep page')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            score_leaderboard_index.drop(db.engine)
+            start = time.perf_counter()
+            seed(args.rows, args.users)
+            print(f'seeded {args.rows} scores for {args.users} users in {time.perf_counter() - start:.1f}s')
+
+            results = [('legacy query, no index', timed(legacy_leaderboard, args.repeat))]
+            score_leaderboard_index.create(db.engine)
+            db.session.execute(db.text('ANALYZE'))
+            results += [
+                ('legacy query, index', timed(legacy_leaderboard, args.repeat)),
+                ('get_leaderboard, index', timed(Score.get_leaderboard, args.repeat)),
+                ('best_per_user, index', timed(
+                    lambda game_type: Score.get_leaderboard(game_type, best_per_user=True), args.repeat)),
+            ]
+            cursors = page_cursors(args.depth)
+            results += [
+                (f'page at {args.depth}, offset', timed(
+                    lambda game_type: offset_page(game_type, args.depth), args.repeat)),
+                (f'page at {args.depth}, keyset', timed(
+                    lambda game_type: Score.get_leaderboard_page(game_type, after=cursors[game_type]), args.repeat)),
+            ]
+
+    print(f'{"query":<26} {"median ms":>10} {"max ms":>10}')
+    for name, (median, worst) in results:
+        print(f'{name:<26} {median:>10.2f} {worst:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
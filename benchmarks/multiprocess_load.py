@@ -0,0 +1,181 @@
+"""Multi-process load test: pong throughput against 1..N worker processes.
+
+For each worker count, starts that many server processes sharing rooms and
+broadcasts through Redis (GAMEHUB_ROOM_STORE_URI / GAMEHUB_MESSAGE_QUEUE_URI),
+opens two Socket.IO clients per pong room, starts every match and counts
+the pong_game_update snapshots delivered. Each player sends its paddle
+position after every snapshot, tracking the ball, so matches keep going
+and input load is included. Each room is pinned to one worker
+by hashing its id, the way a room-aware load balancer would route it.
+Without --redis-url a local fakeredis TCP server is started.
+
+Needs: python-socketio[asyncio_client] (aiohttp), redis, and fakeredis
+unless --redis-url is given.
+
+    python benchmarks/multiprocess_load.py [--workers 1,2,4] [--rooms 200] [--duration 10]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = (
+    'import sys; sys.path.insert(0, {root!r}); import wsgi; '
+    'wsgi.socketio.run(wsgi.app, host="127.0.0.1", port={port}, log_output=False)'
+)
+
+FAKEREDIS = (
+    'from fakeredis import TcpFakeServer; '
+    'TcpFakeServer(("127.0.0.1", {port}), server_type="redis").serve_forever()'
+)
+
+PONG_SNAPSHOT_RATE = 20  # app.config['PONG_SNAPSHOT_RATE'] in server.create_app
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'nothing listening on port {port}')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_workers(count, base_port, env):
+    workers = [subprocess.Popen(
+        [sys.executable, '-c', WORKER.format(root=ROOT, port=base_port + i)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    ) for i in range(count)]
+    for i in range(count):
+        wait_for_port(base_port + i)
+    return workers
+
+
+async def run_clients(rooms, ports, duration, results):
+    import socketio
+
+    received = [0]
+    clients = []
+
+    async def player(room, port):
+        client = socketio.AsyncClient()
+        side = []
+
+        @client.on('pong_joined')
+        async def on_joined(data):
+            side.append(data['side'])
+
+        @client.on('pong_game_update')
+        async def on_update(data):
+            received[0] += 1
+            if side:
+                await client.emit('pong_paddle_move', {
+                    'room': room, 'side': side[0], 'position': data['ball']['y'] - 50
+                })
+
+        await client.connect(f'http://127.0.0.1:{port}', transports=['websocket'])
+        await client.emit('join_pong', {'room': room})
+        clients.append(client)
+        return client
+
+    for room in rooms:
+        port = ports[zlib.crc32(room.encode()) % len(ports)]
+        pair = [await player(room, port), await player(room, port)]
+        for client in pair:
+            await client.emit('pong_player_ready', {'room': room})
+
+    await asyncio.sleep(1)  # Let every match start
+    received[0] = 0
+    start = time.monotonic()
+    await asyncio.sleep(duration)
+    results.put((received[0], time.monotonic() - start))
+    for client in clients:
+        await client.disconnect()
+
+
+def client_process(rooms, ports, duration, results):
+    asyncio.run(run_clients(rooms, ports, duration, results))
+
+
+def measure(worker_count, args, redis_url, db_dir):
+    env = dict(
+        os.environ,
+        GAMEHUB_ROOM_STORE_URI=redis_url,
+        GAMEHUB_MESSAGE_QUEUE_URI=redis_url,
+        GAMEHUB_DATABASE_URI=f'sqlite:///{os.path.join(db_dir, f"load{worker_count}.db")}'
+    )
+    ports = [args.base_port + i for i in range(worker_count)]
+    workers = start_workers(worker_count, args.base_port, env)
+    try:
+        rooms = [f'load-{worker_count}-{i}' for i in range(args.rooms)]
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(target=client_process, args=(rooms[i::args.client_procs], ports, args.duration, results))
+            for i in range(args.client_procs)
+        ]
+        for proc in procs:
+            proc.start()
+        frames = elapsed = 0
+        for _ in procs:
+            count, seconds = results.get()
+            frames += count
+            elapsed = max(elapsed, seconds)
+        for proc in procs:
+            proc.join()
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+    return frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--client-procs', type=int, default=2)
+    parser.add_argument('--base-port', type=int, default=5100)
+    parser.add_argument('--redis-url')
+    args = parser.parse_args()
+
+    fake_redis = None
+    redis_url = args.redis_url
+    if not redis_url:
+        port = free_port()
+        fake_redis = subprocess.Popen([sys.executable, '-c', FAKEREDIS.format(port=port)])
+        wait_for_port(port)
+        redis_url = f'redis://127.0.0.1:{port}/0'
+
+    # Each room has two clients, each receiving every snapshot
+    target = args.rooms * 2 * PONG_SNAPSHOT_RATE
+    print(f'{args.rooms} pong rooms, {os.cpu_count()} CPUs, target {target} frames/s')
+    print(f'{"workers":>8} {"frames/s":>12} {"of target":>10}')
+    try:
+        with tempfile.TemporaryDirectory() as db_dir:
+            for count in (int(n) for n in args.workers.split(',')):
+                rate = measure(count, args, redis_url, db_dir)
+                print(f'{count:>8} {rate:>12.0f} {rate / target:>10.0%}')
+    finally:
+        if fake_redis:
+            fake_redis.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Replays recorded snake and tetris games, checking outcomes and timing them.
+
+Every recording in DIR (saved by the server with GAMEHUB_REPLAY_DIR, or by
+--record) is played again from its seed and inputs. A game whose final
+score or state digest differs from the recording is listed and the script
+exits with status 1, so it doubles as a regression test for engine
+changes. Replay speed is reported as games and ticks per second and as a
+multiple of real time.
+
+--record plays --games games per game type with simple bots and saves them
+to DIR first, for when no real recordings are at hand.
+
+    python benchmarks/replay_games.py DIR [--record] [--games 200] [--repeat 5] [--json out.json]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay import digest, load_recording, replay, save_recording
+from snake import GRID_HEIGHT, GRID_WIDTH, MOVES, OPPOSITE_DIRECTIONS, SnakeRoom, advance_snake, is_occupied, turn
+from tetris import TetrisRoom, apply_gravity, player_move
+
+import results
+
+# Seconds of play per tick, as in server.TICK_INTERVALS
+TICK_SECONDS = {'snake': 0.2, 'tetris': 1.0}
+MAX_TICKS = 20000
+
+
+def snake_bot_game():
+    # Heads for the food by any move that does not crash at once
+    game = SnakeRoom()
+    while not game.game_over and game.ticks < MAX_TICKS:
+        head = game.snake[0]
+        x, y = head % GRID_WIDTH, head // GRID_WIDTH
+        food = game.food
+        safe = []
+        for direction, (dx, dy) in MOVES.items():
+            nx, ny = x + dx, y + dy
+            if direction == OPPOSITE_DIRECTIONS[game.direction]:
+                continue
+            if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT and (
+                    not is_occupied(game, ny * GRID_WIDTH + nx) or ny * GRID_WIDTH + nx == game.snake[-1]):
+                distance = abs(nx - food % GRID_WIDTH) + abs(ny - food // GRID_WIDTH)
+                safe.append((distance, random.random(), direction))
+        if safe:
+            turn(game, min(safe)[2])
+        advance_snake(game)
+    return game
+
+
+def tetris_bot_game():
+    game = TetrisRoom()
+    while not game.game_over and game.ticks < MAX_TICKS:
+        for _ in range(random.randrange(4)):
+            player_move(game, random.choice(('left', 'right', 'rotate', 'rotate', 'down')))
+            if game.game_over:
+                return game
+        apply_gravity(game)
+    return game
+
+
+BOTS = {'snake': snake_bot_game, 'tetris': tetris_bot_game}
+
+
+def record_games(directory, games):
+    os.makedirs(directory, exist_ok=True)
+    for game_type, bot in BOTS.items():
+        for _ in range(games):
+            save_recording(directory, game_type, bot())
+
+
+def load_all(directory):
+    recordings = {game_type: [] for game_type in BOTS}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.replay'):
+            recording = load_recording(os.path.join(directory, name))
+            recordings[recording.game_type].append((name, recording))
+    return recordings
+
+
+def check(game_type, recordings):
+    mismatches = []
+    for name, recording in recordings:
+        game = replay(game_type, recording.seed, recording.inputs, recording.ticks)
+        if (game.score, game.ticks, digest(game_type, game)) != (recording.score, recording.ticks, recording.digest):
+            mismatches.append(name)
+    return mismatches
+
+
+def time_replays(game_type, recordings, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, recording in recordings:
+            replay(game_type, recording.seed, recording.inputs, recording.ticks)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('dir')
+    parser.add_argument('--record', action='store_true', help='play bot games into DIR first')
+    parser.add_argument('--games', type=int, default=200, help='bot games per game type with --record')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help='also save the results here')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.record:
+        record_games(args.dir, args.games)
+
+    timings = {}
+    failed = False
+    print(f'{"game":>8} {"games":>6} {"ticks":>9} {"games/s":>10} {"ticks/s":>12} {"x real time":>12} {"mismatches":>11}')
+    for game_type, recordings in load_all(args.dir).items():
+        if not recordings:
+            continue
+        mismatches = check(game_type, recordings)
+        ticks = sum(recording.ticks for _, recording in recordings)
+        elapsed = time_replays(game_type, recordings, args.repeat)
+        timings[game_type] = {
+            'games': len(recordings),
+            'ticks': ticks,
+            'games_per_s': len(recordings) / elapsed,
+            'ticks_per_s': ticks / elapsed,
+            'speedup': ticks * TICK_SECONDS[game_type] / elapsed,
+            'mismatches': len(mismatches)
+        }
+        print(f'{game_type:>8} {len(recordings):>6} {ticks:>9} {len(recordings) / elapsed:>10.0f} '
+              f'{ticks / elapsed:>12.0f} {timings[game_type]["speedup"]:>12.0f} {len(mismatches):>11}')
+        for name in mismatches:
+            print(f'  mismatch: {name}')
+        failed |= bool(mismatches)
+    if args.json:
+        results.save(args.json, 'replay_games', args, timings)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Saving benchmark results so runs can be compared between commits.
+
+    python benchmarks/compare.py old.json new.json
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(path, benchmark, args, results):
+    """Write `results` ({name: {metric: value}}) to `path` as JSON."""
+    with open(path, 'w') as f:
+        json.dump({
+            'benchmark': benchmark,
+            'commit': git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'machine': platform.machine(),
+            'args': vars(args),
+            'results': results
+        }, f, indent=2)
@@ -0,0 +1,68 @@
+"""Memory per room and tick throughput for many live rooms of each game.
+
+Creates --rooms rooms of every game type under tracemalloc and reports the
+bytes allocated per room, then advances every room --sweeps times the way
+the tick scheduler does and reports room ticks per second.
+
+    python benchmarks/room_memory.py [--rooms 10000] [--sweeps 10]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snake import SnakeRoom, advance_snake
+from tetris import TetrisRoom, apply_gravity
+from pong import PongRoom, advance_pong
+from tictactoe import TicTacToeRoom
+
+# game type -> (room class, one tick); tic-tac-toe has no tick.
+# Snakes start 20 cells from a wall, so up to 19 sweeps keep them all alive.
+GAMES = {
+    'snake': (SnakeRoom, advance_snake),
+    'tetris': (TetrisRoom, apply_gravity),
+    'pong': (PongRoom, advance_pong),
+    'tictactoe': (TicTacToeRoom, None)
+}
+
+
+def bytes_per_room(room_class, count):
+    gc.collect()
+    tracemalloc.start()
+    rooms = [room_class() for _ in range(count)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Leave out the list holding the rooms
+    allocated -= sys.getsizeof(rooms)
+    return rooms, allocated / count
+
+
+def ticks_per_second(rooms, tick, sweeps):
+    start = time.perf_counter()
+    for _ in range(sweeps):
+        for game in rooms:
+            tick(game)
+    return len(rooms) * sweeps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=10000)
+    parser.add_argument('--sweeps', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f'{args.rooms} rooms per game type')
+    print(f'{"game":>10} {"bytes/room":>12} {"room ticks/s":>14}')
+    for name, (room_class, tick) in GAMES.items():
+        rooms, size = bytes_per_room(room_class, args.rooms)
+        rate = f'{ticks_per_second(rooms, tick, args.sweeps):>14.0f}' if tick else f'{"-":>14}'
+        print(f'{name:>10} {size:>12.0f} {rate}')
+        del rooms
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Slow readers: server memory and delivery with clients that read too slowly.
+
+Starts one server process and opens --slow websocket clients that each play
+a hot-seat pong match (PONG_SNAPSHOT_RATE snapshots a second, with no end
+score) but read at most --read-rate bytes a second, with a small receive
+buffer, as a weak mobile link or a deliberately slow client would. --fast
+more clients do the same and read everything at once. Every client answers Engine.IO pings, so
+only falling behind can get it dropped.
+
+Every second it samples the server's RSS. At the end it reports RSS growth,
+snapshots received per second by fast and slow clients, how many clients
+were disconnected, and the server's outbound counters from /stats (absent
+on servers without outbound queues).
+
+    python benchmarks/slow_readers.py [--slow 200] [--fast 50] [--read-rate 2000] [--duration 30] [--json out.json]
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# As socketio.run serves the app, but on a listener whose send buffer (which
+# accepted sockets inherit) is fixed at SEND_BUFFER bytes, so a slow reader
+# backs up into the server within seconds, as it would behind a slow link,
+# rather than into megabytes of auto-tuned kernel buffer. Nobody moves a
+# paddle, so matches are made endless to keep frames coming.
+WORKER = '''
+import socket, sys
+sys.path.insert(0, {root!r})
+import pong
+pong.WINNING_SCORE = 10 ** 9
+import wsgi
+from gevent import pywsgi
+listener = socket.socket()
+listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, {send_buffer})
+listener.bind(('127.0.0.1', {port}))
+listener.listen(1024)
+pywsgi.WSGIServer(listener, wsgi.app, log=None).serve_forever()
+'''
+SEND_BUFFER = 16384
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'nothing listening on port {port}')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+class Player:
+    """A raw websocket Socket.IO client playing one hot-seat pong match."""
+
+    def __init__(self, port, room, read_rate):
+        self.read_rate = read_rate  # Bytes per second, or None for as fast as they come
+        self.frames = 0
+        self.closed = False
+        self.sock = socket.socket()
+        if read_rate:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        self.sock.connect(('127.0.0.1', port))
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((
+            'GET /socket.io/?EIO=4&transport=websocket HTTP/1.1\r\n'
+            f'Host: 127.0.0.1:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+            f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+        self.buffer = b''
+        while b'\r\n\r\n' not in self.buffer:
+            self.buffer += self.sock.recv(4096)
+        self.buffer = self.buffer.split(b'\r\n\r\n', 1)[1]
+        # So a connection gone quiet still lets run() see its deadline
+        self.sock.settimeout(1)
+        self.send('40')
+        self.send('42' + json.dumps(['join_pong', {'room': room, 'wire': 'json', 'hotseat': True}]))
+
+    def send(self, text):
+        data = text.encode()
+        mask = os.urandom(4)
+        header = struct.pack('!BB', 0x81, 0x80 | len(data)) if len(data) < 126 else \
+            struct.pack('!BBH', 0x81, 0x80 | 126, len(data))
+        self.sock.sendall(header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(data)))
+
+    def run(self, deadline):
+        chunk = max(1, self.read_rate // 10) if self.read_rate else 65536
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    data = self.sock.recv(chunk)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break
+                self.buffer += data
+                self.parse()
+                if self.read_rate:
+                    time.sleep(0.1)
+        except OSError:
+            pass
+        self.closed = time.monotonic() < deadline
+        self.sock.close()
+
+    def parse(self):
+        while len(self.buffer) >= 2:
+            length = self.buffer[1] & 0x7f
+            start = 2
+            if length == 126:
+                if len(self.buffer) < 4:
+                    return
+                length, = struct.unpack('!H', self.buffer[2:4])
+                start = 4
+            if len(self.buffer) < start + length:
+                return
+            payload = self.buffer[start:start + length]
+            self.buffer = self.buffer[start + length:]
+            if payload == b'2':
+                self.send('3')  # Engine.IO pong
+            elif payload.startswith(b'42["pong_game_update"'):
+                self.frames += 1
+
+
+def stats(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/stats') as response:
+        return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--slow', type=int, default=200)
+    parser.add_argument('--fast', type=int, default=50)
+    parser.add_argument('--read-rate', type=int, default=2000, help='bytes/s each slow client reads')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--json', metavar='PATH', help='also save the results here')
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as db_dir:
+        env = dict(os.environ, GAMEHUB_DATABASE_URI=f'sqlite:///{os.path.join(db_dir, "slow.db")}')
+        env.pop('GAMEHUB_ROOM_STORE_URI', None)
+        env.pop('GAMEHUB_MESSAGE_QUEUE_URI', None)
+        worker = subprocess.Popen([sys.executable, '-c', WORKER.format(root=ROOT, port=port, send_buffer=SEND_BUFFER)],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            start_rss = rss_mb(worker.pid)
+            players = [Player(port, f'slow-{i}', args.read_rate) for i in range(args.slow)]
+            players += [Player(port, f'fast-{i}', None) for i in range(args.fast)]
+            start = time.monotonic()
+            deadline = start + args.duration
+            threads = [threading.Thread(target=player.run, args=(deadline,), daemon=True) for player in players]
+            for thread in threads:
+                thread.start()
+            samples = []
+            while time.monotonic() < deadline:
+                time.sleep(1)
+                samples.append(rss_mb(worker.pid))
+            outbound = stats(port).get('outbound')
+            for thread in threads:
+                thread.join(5)
+        finally:
+            worker.terminate()
+            worker.wait()
+
+    timings = {}
+    print(f'server RSS {start_rss:.1f} MB at start, {max(samples):.1f} MB peak, {samples[-1]:.1f} MB at end')
+    print(f'{"clients":>8} {"count":>6} {"frames/s each":>14} {"disconnected":>13}')
+    for kind, group in (('slow', players[:args.slow]), ('fast', players[args.slow:])):
+        if not group:
+            continue
+        rate = sum(player.frames for player in group) / len(group) / args.duration
+        closed = sum(player.closed for player in group)
+        timings[kind] = {'clients': len(group), 'frames_per_s': rate, 'disconnected': closed}
+        print(f'{kind:>8} {len(group):>6} {rate:>14.1f} {closed:>13}')
+    timings['server'] = {'rss_start_mb': start_rss, 'rss_peak_mb': max(samples), 'rss_end_mb': samples[-1]}
+    if outbound is not None:
+        outbound.pop('sockets', None)  # Per socket; the totals are enough here
+        print(f'outbound: {outbound}')
+        timings['outbound'] = outbound
+    if args.json:
+        results.save(args.json, 'slow_readers', args, timings)
+
+
+if __name__ == '__main__':
+    main()
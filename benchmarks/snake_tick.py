@@ -0,0 +1,67 @@
+"""Per-tick cost of the snake engine from length 1 up to a full board.
+
+The snake is laid along a Hamiltonian cycle of the 40x30 grid and steered
+around it, so it never dies and every length up to a full board can be
+timed.
+
+    python benchmarks/snake_tick.py [--ticks N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snake import GRID_WIDTH, GRID_HEIGHT, SnakeRoom, advance_snake
+
+DIRECTIONS = {(0, -1): 'UP', (0, 1): 'DOWN', (-1, 0): 'LEFT', (1, 0): 'RIGHT'}
+
+
+def hamiltonian_cycle():
+    # Along the top row, serpentine back through columns 1.., then up column 0
+    cycle = [(x, 0) for x in range(GRID_WIDTH)]
+    for y in range(1, GRID_HEIGHT):
+        xs = range(GRID_WIDTH - 1, 0, -1) if y % 2 else range(1, GRID_WIDTH)
+        cycle.extend((x, y) for x in xs)
+    cycle.extend((0, y) for y in range(GRID_HEIGHT - 1, 0, -1))
+    return cycle
+
+
+def bench_length(cycle, length, ticks):
+    # Head at cycle[length - 1], body trailing back to cycle[0]
+    body = [cycle[i] for i in range(length - 1, -1, -1)]
+    game = SnakeRoom(body=body)
+    steer = {}
+    for i, (x, y) in enumerate(cycle):
+        nx, ny = cycle[(i + 1) % len(cycle)]
+        steer[y * GRID_WIDTH + x] = DIRECTIONS[(nx - x, ny - y)]
+
+    elapsed = 0.0
+    clock = time.perf_counter
+    for _ in range(ticks):
+        game.direction = steer[game.snake[0]]
+        start = clock()
+        advance_snake(game)
+        elapsed += clock() - start
+        if game.game_over:
+            # Only filling the board ends the game on a cycle; start over
+            # outside the timed section
+            game = SnakeRoom(body=body)
+    return elapsed / ticks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=20000)
+    args = parser.parse_args()
+
+    cycle = hamiltonian_cycle()
+    cells = GRID_WIDTH * GRID_HEIGHT
+    print(f'{"length":>8} {"us/tick":>10}')
+    for length in (1, 10, 100, 300, 600, 900, 1199, cells):
+        print(f'{length:>8} {bench_length(cycle, length, args.ticks):>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""In-process load generator: thousands of Socket.IO clients on one server.
+
+Opens --clients Socket.IO test clients against the app, split evenly over
+the --games given, joins each to a room and drives input at a human rate
+for --duration seconds, while the server's tick scheduler runs as it does
+in production:
+
+    snake      a turn every 0.2-0.6 s, restarting after a crash
+    tetris     a move every 0.15-0.4 s, restarting on game over
+    pong       two players per room, a paddle position every 50-150 ms
+    tictactoe  against the computer, a move every 0.5-1.5 s
+
+Reports, per game type, the latency of input events (handler plus the
+frames it sends, which test clients receive synchronously) at p50/p99,
+input events/s, frames delivered/s, and the time and lateness of each tick
+sweep; then the process RSS before the clients connect, once they have
+joined, and at the end. Everything runs offline in this one process, with
+a throwaway SQLite database.
+
+    python benchmarks/socketio_load.py [--clients 2000] [--duration 10] [--json out.json]
+"""
+import argparse
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Before the server is imported: its config reads the environment once
+_db_dir = tempfile.TemporaryDirectory()
+os.environ['GAMEHUB_DATABASE_URI'] = f'sqlite:///{os.path.join(_db_dir.name, "bench.db")}'
+os.environ.pop('GAMEHUB_ROOM_STORE_URI', None)
+os.environ.pop('GAMEHUB_MESSAGE_QUEUE_URI', None)
+
+from wsgi import app  # noqa: E402  (patches the standard library for gevent)
+import server  # noqa: E402
+from server import socketio, games  # noqa: E402
+from pong import PADDLE_HEIGHT  # noqa: E402
+
+import gevent  # noqa: E402
+
+import results  # noqa: E402
+
+GAME_TYPES = ('snake', 'tetris', 'pong', 'tictactoe')
+TURNS = {'UP': ('LEFT', 'RIGHT'), 'DOWN': ('LEFT', 'RIGHT'), 'LEFT': ('UP', 'DOWN'), 'RIGHT': ('UP', 'DOWN')}
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+class FrameCounter:
+    # Stands in for a test client's received queue: counts frames, keeps none
+    def __init__(self, counts):
+        self.counts = counts
+
+    def append(self, packet):
+        self.counts[packet['name']] += 1
+
+
+class Load:
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.measuring = False
+        self.latency = defaultdict(list)  # game type -> seconds per input event
+        self.frames = Counter()  # event name -> frames delivered while measuring
+        self.sweeps = defaultdict(list)  # game type -> (duration, lateness) per tick sweep
+
+    def client(self):
+        client = socketio.test_client(app)
+        client.queue = FrameCounter(self.frames)
+        return client
+
+    def send(self, game_type, client, event, data):
+        start = time.perf_counter()
+        client.emit(event, data)
+        if self.measuring:
+            self.latency[game_type].append(time.perf_counter() - start)
+
+    def running(self):
+        return time.monotonic() < self.deadline
+
+    def snake(self, client, room, wire):
+        client.emit('join_snake', {'room': room, 'wire': wire})
+        while self.running():
+            gevent.sleep(random.uniform(0.2, 0.6))
+            game = games['snake'].get(room)
+            if game is None or game.game_over:
+                self.send('snake', client, 'restart_snake', {'room': room, 'wire': wire})
+            else:
+                direction = random.choice(TURNS[game.direction])
+                self.send('snake', client, 'snake_direction', {'room': room, 'direction': direction})
+
+    def tetris(self, client, room, wire):
+        client.emit('join_tetris', {'room': room, 'wire': wire})
+        while self.running():
+            gevent.sleep(random.uniform(0.15, 0.4))
+            game = games['tetris'].get(room)
+            if game is None or game.game_over:
+                self.send('tetris', client, 'restart_tetris', {'room': room, 'wire': wire})
+            else:
+                move = random.choice(('left', 'right', 'rotate', 'down'))
+                self.send('tetris', client, 'tetris_move', {'room': room, 'move': move})
+
+    def pong(self, client, room, wire, side):
+        client.emit('join_pong', {'room': room, 'wire': wire})
+        client.emit('pong_player_ready', {'room': room})
+        while self.running():
+            gevent.sleep(random.uniform(0.05, 0.15))
+            game = games['pong'].get(room)
+            if game is None or not game.in_progress:
+                continue
+            # Track the ball, so matches keep going
+            position = game.ball_y - PADDLE_HEIGHT / 2 + random.uniform(-30, 30)
+            self.send('pong', client, 'pong_paddle_move', {'room': room, 'side': side, 'position': position})
+
+    def tictactoe(self, client, room, wire):
+        client.emit('join_tictactoe', {'room': room, 'ai': True, 'wire': wire})
+        while self.running():
+            gevent.sleep(random.uniform(0.5, 1.5))
+            game = games['tictactoe'].get(room)
+            if game is None:
+                continue
+            if game.winner or game.draw:
+                self.send('tictactoe', client, 'restart_tictactoe', {'room': room})
+                continue
+            taken = game.x_mask | game.o_mask
+            cell = random.choice([cell for cell in range(9) if not taken >> cell & 1])
+            self.send('tictactoe', client, 'tictactoe_move', {'room': room, 'row': cell // 3, 'col': cell % 3})
+
+
+def time_sweeps(load):
+    # Wrap the scheduler's per-game sweep to record its cost and how late it ran
+    tick_rooms = server.tick_rooms
+    last_start = {}
+
+    def timed_tick_rooms(game_type):
+        start = time.monotonic()
+        tick_rooms(game_type)
+        if load.measuring and game_type in last_start:
+            lateness = max(0.0, start - last_start[game_type] - server.TICK_INTERVALS[game_type])
+            load.sweeps[game_type].append((time.monotonic() - start, lateness))
+        last_start[game_type] = start
+
+    server.tick_rooms = timed_tick_rooms
+
+
+def percentiles(samples):
+    # p50 and p99 in milliseconds; None without enough samples
+    if len(samples) < 2:
+        return None, None
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+def ms(value, width, precision):
+    return f'{"-":>{width}}' if value is None else f'{value:>{width}.{precision}f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of load before measuring')
+    parser.add_argument('--games', default=','.join(GAME_TYPES))
+    parser.add_argument('--wire', choices=('json', 'binary'), default='binary')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help='also save the results here')
+    args = parser.parse_args()
+
+    game_types = args.games.split(',')
+    for game_type in game_types:
+        if game_type not in GAME_TYPES:
+            parser.error(f'unknown game {game_type!r}')
+    random.seed(args.seed)
+    app.config['ROOM_IDLE_TTL'] = app.config['ROOM_FINISHED_TTL'] = 3600
+
+    rss_start = rss_mb()
+    started = time.monotonic()
+    load = Load(deadline=float('inf'))  # Set once every client has connected
+    time_sweeps(load)
+    players = []
+    per_game = args.clients // len(game_types)
+    for game_type in game_types:
+        if game_type == 'pong':
+            for i in range(per_game // 2):
+                room = f'bench_pong_{i}'
+                players.append((load.pong, load.client(), room, args.wire, 'left'))
+                players.append((load.pong, load.client(), room, args.wire, 'right'))
+        else:
+            for i in range(per_game):
+                players.append((getattr(load, game_type), load.client(), f'bench_{game_type}_{i}', args.wire))
+    connect_time = time.monotonic() - started
+
+    load.deadline = time.monotonic() + args.warmup + args.duration
+    greenlets = [gevent.spawn(run, *player_args) for run, *player_args in players]
+    gevent.sleep(args.warmup)
+    rss_joined = rss_mb()
+    load.frames.clear()
+    load.measuring = True
+    measure_start = time.monotonic()
+    gevent.sleep(args.duration)
+    load.measuring = False
+    elapsed = time.monotonic() - measure_start
+    gevent.joinall(greenlets)
+
+    print(f'{len(players)} clients in {sum(len(games[gt]) for gt in game_types)} rooms '
+          f'(connected in {connect_time:.1f}s), measured {elapsed:.1f}s')
+    print(f'{"game":>10} {"p50 ms":>8} {"p99 ms":>8} {"events/s":>10} '
+          f'{"sweep p50":>10} {"sweep p99":>10} {"late p99":>9}')
+    report = {}
+    for game_type in game_types:
+        latency = load.latency[game_type]
+        p50, p99 = percentiles(latency)
+        sweep_p50, sweep_p99 = percentiles([duration for duration, _ in load.sweeps[game_type]])
+        _, late_p99 = percentiles([lateness for _, lateness in load.sweeps[game_type]])
+        report[game_type] = {
+            'p50_ms': p50, 'p99_ms': p99, 'events_per_s': len(latency) / elapsed,
+            'sweep_p50_ms': sweep_p50, 'sweep_p99_ms': sweep_p99, 'late_p99_ms': late_p99
+        }
+        print(f'{game_type:>10} {ms(p50, 8, 3)} {ms(p99, 8, 3)} {len(latency) / elapsed:>10.0f} '
+              f'{ms(sweep_p50, 10, 2)} {ms(sweep_p99, 10, 2)} {ms(late_p99, 9, 2)}')
+
+    frames_per_s = sum(load.frames.values()) / elapsed
+    rss_end = rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    report['process'] = {
+        'frames_per_s': frames_per_s, 'rss_start_mb': rss_start, 'rss_joined_mb': rss_joined,
+        'rss_end_mb': rss_end, 'rss_peak_mb': peak
+    }
+    print(f'frames delivered/s: {frames_per_s:.0f} '
+          f'({", ".join(f"{name} {count / elapsed:.0f}" for name, count in load.frames.most_common())})')
+    print(f'RSS MB: start {rss_start:.1f}, joined {rss_joined:.1f}, end {rss_end:.1f}, peak {peak:.1f}')
+    if args.json:
+        results.save(args.json, 'socketio_load', args, report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Cost and size of game frames in the JSON and binary wire formats.
+
+Builds a stream of real snake, tetris and pong frames, then times turning
+each into Socket.IO packets (what the server does per emit) in both formats,
+with the stdlib json module and with the server's PacketJSON.
+
+    python benchmarks/wire_format.py [--frames N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet
+
+from snake import SnakeRoom, advance_snake
+from tetris import TetrisRoom, move_tetris_piece
+from pong import PongRoom, advance_pong
+from wire import ENCODERS, PacketJSON
+
+
+def snake_frames(count):
+    game = SnakeRoom()
+    for _ in range(count):
+        delta = advance_snake(game)
+        game.seq += 1
+        delta['seq'] = game.seq
+        yield 'game_update', delta
+        game.direction = random.choice(('UP', 'DOWN', 'RIGHT'))
+        if game.game_over:
+            game = SnakeRoom()
+
+
+def tetris_frames(count):
+    game = TetrisRoom()
+    while count:
+        delta = move_tetris_piece(game, random.choice(('left', 'right', 'rotate', 'down')))
+        if not delta:
+            continue
+        game.seq += 1
+        delta['seq'] = game.seq
+        yield 'game_update', delta
+        count -= 1
+        if game.game_over:
+            game = TetrisRoom()
+
+
+def pong_frames(count):
+    game = PongRoom()
+    for _ in range(count):
+        advance_pong(game, 6)
+        yield 'pong_game_update', game.snapshot()
+        if game.winner:
+            game = PongRoom()
+
+
+def measure(game_type, frames):
+    results = {}
+    for wire in ('json', 'binary'):
+        size = 0
+        start = time.perf_counter()
+        for event, payload in frames:
+            data = ENCODERS[game_type, event](payload) if wire == 'binary' else payload
+            encoded = packet.Packet(packet.EVENT, data=[event, data]).encode()
+            size += sum(map(len, encoded)) if isinstance(encoded, list) else len(encoded)
+        results[wire] = ((time.perf_counter() - start) / len(frames) * 1e6, size / len(frames))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f'{"encoder":>10} {"game":>8} {"json us":>9} {"bin us":>9} {"json B":>8} {"bin B":>8}')
+    for encoder, json_module in (('stdlib', json), ('PacketJSON', PacketJSON)):
+        packet.Packet.json = json_module
+        for game_type, frames in (('snake', snake_frames), ('tetris', tetris_frames), ('pong', pong_frames)):
+            random.seed(1)
+            results = measure(game_type, list(frames(args.frames)))
+            (json_us, json_size), (bin_us, bin_size) = results['json'], results['binary']
+            print(f'{encoder:>10} {game_type:>8} {json_us:>9.2f} {bin_us:>9.2f} {json_size:>8.1f} {bin_size:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
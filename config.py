@@ -0,0 +1,56 @@
+"""Deployment settings, overridable through the environment.
+
+SQLite is the default. Set GAMEHUB_DATABASE_URI to a Postgres URI (with a
+driver such as psycopg installed) for larger installs, and optionally
+GAMEHUB_READ_DATABASE_URI to send read-only queries to a second engine.
+
+To run several worker processes, point GAMEHUB_ROOM_STORE_URI and
+GAMEHUB_MESSAGE_QUEUE_URI at a Redis server (requires the redis package).
+"""
+import os
+
+DATABASE_URI = os.environ.get('GAMEHUB_DATABASE_URI', 'sqlite:///gameplatform.db')
+READ_DATABASE_URI = os.environ.get('GAMEHUB_READ_DATABASE_URI')
+
+# Sized for many greenlets sharing one process
+DB_POOL_SIZE = int(os.environ.get('GAMEHUB_DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.environ.get('GAMEHUB_DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = int(os.environ.get('GAMEHUB_DB_POOL_TIMEOUT', 10))
+
+# Applied to every new SQLite connection; WAL lets readers run alongside
+# the score writer instead of queueing behind it
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('GAMEHUB_SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('GAMEHUB_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+}
+
+# Shared room state across worker processes; in-process when unset
+ROOM_STORE_URI = os.environ.get('GAMEHUB_ROOM_STORE_URI')
+# Socket.IO message queue so broadcasts reach sockets on every worker
+MESSAGE_QUEUE_URI = os.environ.get('GAMEHUB_MESSAGE_QUEUE_URI')
+
+# Finished snake and tetris games are saved here for replay when set (see replay.py)
+REPLAY_DIR = os.environ.get('GAMEHUB_REPLAY_DIR')
+
+
+def engine_options(uri):
+    if uri.startswith('sqlite'):
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            return {}  # In-memory databases use a single shared connection
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            # Pooled connections move between greenlets and worker threads
+            'connect_args': {'check_same_thread': False}
+        }
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
+
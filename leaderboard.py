@@ -0,0 +1,95 @@
+"""In-process leaderboards: the top N per game type, and rendered pages.
+
+LeaderboardCache loads a game type's top N from the database the first time
+it is asked for and then keeps it up to date as scores are recorded, so
+the live top N touches the database once. LeaderboardPages keeps rendered leaderboard pages (HTML or JSON,
+any depth) until a score for their game type is written, so repeated views
+of a page are served from memory.
+"""
+from bisect import insort
+from collections import OrderedDict, namedtuple
+from itertools import count
+
+from models import Score
+
+LeaderboardEntry = namedtuple('LeaderboardEntry', 'username score date')
+
+
+class LeaderboardCache:
+    def __init__(self, size=10):
+        self.size = size
+        # game_type -> sorted [(-score, order, entry)]; `order` keeps ties in
+        # arrival order, like the id tiebreak in the database
+        self._boards = {}
+        self._order = count()
+
+    def _board(self, game_type):
+        board = self._boards.get(game_type)
+        if board is None:
+            loaded = [
+                (-row.score, next(self._order), LeaderboardEntry(row.username, row.score, row.date))
+                for row in Score.get_leaderboard(game_type, limit=self.size)
+            ]
+            # Another greenlet may have loaded it, and recorded scores, while
+            # this one waited on the query
+            board = self._boards.setdefault(game_type, loaded)
+        return board
+
+    def top(self, game_type):
+        return [entry for _, _, entry in self._board(game_type)]
+
+    def record(self, game_type, username, score, date):
+        """Add a new score; return True if it changed the top N."""
+        board = self._board(game_type)
+        if len(board) >= self.size and -score >= board[-1][0]:
+            return False
+        insort(board, (-score, next(self._order), LeaderboardEntry(username, score, date)))
+        del board[self.size:]
+        return True
+
+    def to_wire(self, game_type):
+        return {
+            'game_type': game_type,
+            'scores': [{'username': entry.username, 'score': entry.score}
+                       for entry in self.top(game_type)]
+        }
+
+
+class LeaderboardPages:
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self._pages = OrderedDict()  # (game_type, ...) -> rendered page
+        self._generations = {}  # game_type -> invalidation count
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        """The cached page for `key` (game type first), rendering it on a miss."""
+        page = self._pages.get(key)
+        if page is not None:
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page
+        self.misses += 1
+        generation = self._generations.get(key[0], 0)
+        page = render()
+        # Not kept if a score was written while rendering (it yields on the query)
+        if self._generations.get(key[0], 0) == generation:
+            self._pages[key] = page
+            if len(self._pages) > self.maxsize:
+                self._pages.popitem(last=False)
+        return page
+
+    def invalidate(self, game_type):
+        self._generations[game_type] = self._generations.get(game_type, 0) + 1
+        for key in [key for key in self._pages if key[0] == game_type]:
+            del self._pages[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._pages),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,243 @@
+"""In-process metrics for the running server, in Prometheus text format.
+
+Counters and histograms are plain dicts keyed by label values, updated
+inline on the hot paths; gauges are read from callbacks only when /metrics
+is scraped. Every Socket.IO event is counted, but only a `sample_rate`
+share of handler calls is timed, so the per-event cost stays a dict update
+and a random() call.
+
+Outbound packets are counted as Socket.IO encodes them: once per emit,
+however many sockets the emit reaches.
+"""
+import random
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from flask import g, request
+
+# Upper bounds in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5)
+
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK'}
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}  # label values -> count
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, zip(self.labels, labels), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self.values = {}
+
+    def observe(self, labels, value):
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def samples(self):
+        for labels, counts in self.values.items():
+            named = list(zip(self.labels, labels))
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                total += count
+                yield f'{self.name}_bucket', named + [('le', _format(bound))], total
+            yield f'{self.name}_sum', named, counts[-1]
+            yield f'{self.name}_count', named, total
+
+
+class Gauge:
+    """A value read from `collect()` at scrape time: {label values: value}."""
+
+    def __init__(self, name, help, labels, collect, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.collect = collect
+        self.kind = kind
+
+    def samples(self):
+        for labels, value in self.collect().items():
+            yield self.name, zip(self.labels, labels), value
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    def __init__(self, sample_rate=0.1):
+        self.sample_rate = sample_rate
+        self._metrics = []
+        self._events = set()  # Event names with a handler; others are labelled 'other'
+        self.events = self.counter(
+            'gamehub_socketio_events_total', 'Socket.IO events received.', ('event',))
+        self.event_seconds = self.histogram(
+            'gamehub_socketio_event_seconds', 'Socket.IO handler time, sampled.', ('event',))
+        self.received_bytes = self.counter(
+            'gamehub_socketio_received_bytes_total', 'Bytes of Socket.IO events received.', ('event',))
+        self.emitted = self.counter(
+            'gamehub_socketio_emitted_total', 'Socket.IO packets encoded for sending, one per emit.', ('event',))
+        self.emitted_bytes = self.counter(
+            'gamehub_socketio_emitted_bytes_total', 'Bytes of Socket.IO packets encoded for sending.', ('event',))
+        self.request_seconds = self.histogram(
+            'gamehub_http_request_seconds', 'Flask request time.', ('endpoint',))
+        self.query_seconds = self.histogram(
+            'gamehub_db_query_seconds', 'Database statement time.', ('operation',))
+        self.commit_seconds = self.histogram(
+            'gamehub_db_commit_seconds', 'Session commit time, including the flush.')
+        self.tick_seconds = self.histogram(
+            'gamehub_tick_seconds', 'Time to tick every room of a game type.', ('game',))
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, labels, collect, kind='gauge'):
+        return self._register(Gauge(name, help, labels, collect, kind))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                labels = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+                lines.append(f'{name}{{{labels}}} {_format(value)}' if labels else f'{name} {_format(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # --- Hooks ---
+
+    def instrument_socketio(self, server):
+        """Count and time every handler registered on a python-socketio server so far.
+
+        Safe to call again as more handlers are registered: those already
+        counted are left as they are.
+        """
+        for handlers in server.handlers.values():
+            for name, handler in handlers.items():
+                if name in self._events:
+                    continue
+                self._events.add(name)
+                handlers[name] = self._timed_handler(name, handler)
+
+    def _timed_handler(self, name, handler):
+        labels = (name,)
+
+        def timed(*args):
+            self.events.inc(labels)
+            if random.random() >= self.sample_rate:
+                return handler(*args)
+            start = time.perf_counter()
+            try:
+                return handler(*args)
+            finally:
+                self.event_seconds.observe(labels, time.perf_counter() - start)
+        return timed
+
+    def counting_json(self, json_module):
+        """Wrap the json module Socket.IO encodes packets with, to count bytes per event."""
+        metrics = self
+
+        class CountingJSON:
+            @staticmethod
+            def dumps(obj, **kwargs):
+                data = json_module.dumps(obj, **kwargs)
+                # Event packets carry [name, *args]
+                if type(obj) is list and obj and type(obj[0]) is str:
+                    labels = (obj[0],)
+                    metrics.emitted.inc(labels)
+                    metrics.emitted_bytes.inc(labels, len(data))
+                return data
+
+            @staticmethod
+            def loads(data, **kwargs):
+                obj = json_module.loads(data, **kwargs)
+                if type(obj) is list and obj and type(obj[0]) is str:
+                    # Clients choose event names; keep unknown ones to one label
+                    name = obj[0] if obj[0] in metrics._events else 'other'
+                    metrics.received_bytes.inc((name,), len(data))
+                return obj
+
+        return CountingJSON
+
+    def instrument_app(self, app):
+        """Time every Flask request by endpoint."""
+        @app.before_request
+        def start_timer():
+            g.metrics_start = time.perf_counter()
+
+        @app.after_request
+        def stop_timer(response):
+            start = g.pop('metrics_start', None)
+            if start is not None:
+                self.request_seconds.observe((request.endpoint or 'unmatched',), time.perf_counter() - start)
+            return response
+
+    def instrument_engine(self, engine):
+        """Time every statement run on a SQLAlchemy engine."""
+        @event.listens_for(engine, 'before_cursor_execute')
+        def start_query(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def end_query(conn, cursor, statement, parameters, context, executemany):
+            start = conn.info['metrics_query_start'].pop()
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+            if operation not in SQL_OPERATIONS:
+                operation = 'OTHER'
+            self.query_seconds.observe((operation,), time.perf_counter() - start)
+
+        @event.listens_for(engine, 'handle_error')
+        def failed_query(context):
+            starts = context.connection.info.get('metrics_query_start') if context.connection else None
+            if starts:
+                starts.pop()
+
+    def instrument_session(self, session):
+        """Time commits of a SQLAlchemy (scoped) session."""
+        @event.listens_for(session, 'before_commit')
+        def start_commit(session):
+            session.info['metrics_commit_start'] = time.perf_counter()
+
+        @event.listens_for(session, 'after_commit')
+        def end_commit(session):
+            start = session.info.pop('metrics_commit_start', None)
+            if start is not None:
+                self.commit_seconds.observe((), time.perf_counter() - start)
@@ -1,21 +1,45 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
 from datetime import datetime
 
 db = SQLAlchemy()
 
+def enable_sqlite_pragmas(engine, pragmas):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+def read_engine():
+    # The optional 'read' bind, else the default engine
+    return db.engines.get('read', db.engine)
+
+def read(statement):
+    """Execute a read-only statement on the read engine."""
+    return db.session.execute(statement, bind_arguments={'bind': read_engine()})
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(120), nullable=False)
     scores = db.relationship('Score', backref='user', lazy=True)
 
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    @staticmethod
+    def get(user_id):
+        return db.session.get(User, user_id, bind_arguments={'bind': read_engine()})
 
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+    @staticmethod
+    def find_by_username(username):
+        return read(db.select(User).filter_by(username=username)).scalar_one_or_none()
+
+# Rows _get_best_per_user reads per wanted user before it groups instead
+BEST_PER_USER_SCAN = 50
 
 class Score(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -25,8 +49,105 @@ class Score(db.Model):
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     @staticmethod
-    def get_leaderboard(game_type, limit=10):
-        return Score.query.filter_by(game_type=game_type)\
-            .order_by(Score.score.desc())\
-            .limit(limit)\
-            .all()
+    def get_leaderboard(game_type, limit=10, best_per_user=False):
+        """Top scores as (username, score, date) rows, highest first.
+
+        With best_per_user, each user appears once with their best score.
+        """
+        if best_per_user:
+            return Score._get_best_per_user(game_type, limit)
+        return read(
+            db.select(User.username, Score.score, Score.date)
+            .join(User)
+            .where(Score.game_type == game_type)
+            .order_by(Score.score.desc(), Score.id)
+            .limit(limit)
+        ).all()
+
+    @staticmethod
+    def get_leaderboard_page(game_type, limit=10, after=None):
+        """Up to `limit` scores as (id, username, score, date) rows, highest first.
+
+        `after` is the (score, id) of the last row of the previous page. The
+        next page starts from there in the leaderboard index, however deep it
+        is, instead of skipping an offset.
+        """
+        query = (
+            db.select(Score.id, User.username, Score.score, Score.date)
+            .join(User)
+            .where(Score.game_type == game_type)
+        )
+        if after is not None:
+            score, score_id = after
+            # score <= :score bounds the index range; ties continue by id
+            query = query.where(Score.score <= score, db.or_(Score.score < score, Score.id > score_id))
+        return read(query.order_by(Score.score.desc(), Score.id).limit(limit)).all()
+
+    @staticmethod
+    def count_through(game_type, after):
+        """How many scores rank at or above the (score, id) position `after`."""
+        score, score_id = after
+        return read(
+            db.select(db.func.count())
+            .select_from(Score)
+            .where(Score.game_type == game_type, Score.score >= score,
+                   db.or_(Score.score > score, Score.id <= score_id))
+        ).scalar_one()
+
+    @staticmethod
+    def _get_best_per_user(game_type, limit):
+        # Walk the leaderboard index from the top and keep each user's first
+        # (best) row; this stops after `limit` distinct users instead of
+        # grouping every score of the game type. When a few users hold most
+        # top scores, or there are fewer than `limit` of them, the walk would
+        # read every row, so past BEST_PER_USER_SCAN rows per wanted user it
+        # groups instead.
+        rows = read(
+            db.select(Score.user_id, User.username, Score.score, Score.date)
+            .join(User)
+            .where(Score.game_type == game_type)
+            .order_by(Score.score.desc(), Score.id)
+            .limit(limit * BEST_PER_USER_SCAN + 1)
+            .execution_options(yield_per=limit * 4)
+        )
+        best = {}
+        scanned = 0
+        try:
+            for row in rows:
+                scanned += 1
+                if row.user_id not in best:
+                    best[row.user_id] = row
+                    if len(best) == limit:
+                        return list(best.values())
+        finally:
+            rows.close()
+        if scanned <= limit * BEST_PER_USER_SCAN:
+            return list(best.values())  # Every row read; that is all the users
+        return Score._get_best_per_user_grouped(game_type, limit)
+
+    @staticmethod
+    def _get_best_per_user_grouped(game_type, limit):
+        # GROUP BY user_id for the top `limit` best scores, then each of
+        # those users' best row (the first one, on ties) for its date
+        top = (
+            db.select(Score.user_id, db.func.max(Score.score).label('score'))
+            .where(Score.game_type == game_type)
+            .group_by(Score.user_id)
+            .order_by(db.desc('score'), Score.user_id)
+            .limit(limit)
+            .subquery()
+        )
+        rows = read(
+            db.select(Score.user_id, User.username, Score.score, Score.date)
+            .join(User)
+            .join(top, db.and_(Score.user_id == top.c.user_id, Score.score == top.c.score))
+            .where(Score.game_type == game_type)
+            .order_by(Score.score.desc(), Score.id)
+        )
+        best = {}
+        for row in rows:
+            best.setdefault(row.user_id, row)
+        return list(best.values())
+
+# Serves get_leaderboard's filter and sort straight from the index
+score_leaderboard_index = db.Index('ix_score_game_type_score', Score.game_type, Score.score.desc())
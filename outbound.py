@@ -0,0 +1,222 @@
+"""Per-socket outbound queues, so a slow reader cannot hold unbounded frames.
+
+Engine.IO gives each socket an unbounded queue of packets waiting to be
+written. A client that reads slower than its room produces frames (a weak
+mobile link, or one that stops reading on purpose) would make that queue,
+and the server's memory, grow with frames that are out of date before they
+are sent.
+
+OutboundQueues sits between Socket.IO and Engine.IO, on the server's
+_send_eio_packet, which every emitted event goes through. While a socket
+has fewer than `window` packets waiting in Engine.IO, events pass straight
+through. Past that, they wait in the socket's own outbox:
+
+- An event named in `coalesce` is a state frame that the next one
+  supersedes, so a newer frame replaces the one still waiting.
+- An event named in `resync` is a delta, which needs the ones before it.
+  When a second one would wait, the waiting delta and every later one
+  are dropped. In their place the socket gets what the event's resync
+  function returns for it, such as a keyframe of its room. The keyframe
+  is built only when it is sent, so it is as fresh as a frame can be.
+- Every other event is kept, in order.
+
+A drain task moves waiting events on as the Engine.IO queue empties. A
+client that reads slowly but steadily so gets fewer, fresher frames and
+stays connected. One from which nothing has moved on for `max_lag`
+seconds, or with more than `max_pending` kept events waiting, is
+disconnected. So each socket holds at most `window` packets, one frame per
+coalesced or resync event and `max_pending` other events.
+"""
+import time
+from collections import deque
+
+from socketio import packet as sio_packet
+
+
+def event_name(data):
+    # Socket.IO event packets encode as '2["name",...' or, with binary
+    # attachments, '51-["name",...'
+    start = data.find('["') + 2
+    return data[start:data.index('"', start)] if start > 1 else None
+
+
+def attachment_count(data):
+    # Binary events and acks ('5' and '6') are followed by their attachments
+    if type(data) is str and data[:1] in ('5', '6'):
+        return int(data[1:data.index('-')])
+    return 0
+
+
+# In place of a message's packets: send the event's resync frames instead
+KEYFRAME = 'keyframe'
+
+
+class Outbox:
+    __slots__ = ('messages', 'latest', 'kept', 'backlog', 'moved')
+
+    def __init__(self, backlog):
+        # [event, packets]; packets is None once superseded, or KEYFRAME
+        self.messages = deque()
+        self.latest = {}  # Coalesced or resync event -> its waiting message
+        self.kept = 0  # Waiting messages that are never dropped
+        self.backlog = backlog  # Engine.IO queue length after the last drain
+        self.moved = time.monotonic()  # When the client last took packets off it
+
+
+class OutboundQueues:
+    def __init__(self, server, start_background_task, sleep, coalesce=(), resync=None, window=16,
+                 max_pending=256, max_lag=10.0, drain_interval=0.05):
+        self._server = server  # A python-socketio Server
+        self._start_background_task = start_background_task
+        self._sleep = sleep
+        self._send = server._send_eio_packet
+        self.coalesce = frozenset(coalesce)
+        self.resync = resync or {}  # Delta event -> fn(eio_sid) returning [(event, data)] to send instead
+        self.window = window
+        self.max_pending = max_pending
+        self.max_lag = max_lag
+        self.drain_interval = drain_interval
+        self._outboxes = {}  # Engine.IO sid -> Outbox, for sockets that are behind
+        self._attaching = {}  # Engine.IO sid -> [message or None if sent, attachments to come]
+        self._dropping = set()
+        self._task = None
+        self.coalesced = 0
+        self.disconnected = 0
+        server._send_eio_packet = self.send
+
+    def send(self, eio_sid, pkt):
+        attaching = self._attaching.get(eio_sid)
+        if attaching is not None:
+            # Attachments go wherever their event went
+            message, _ = attaching
+            if message is None:
+                self._send(eio_sid, pkt)
+            else:
+                message[1].append(pkt)
+            attaching[1] -= 1
+            if not attaching[1]:
+                del self._attaching[eio_sid]
+            return
+        if eio_sid in self._dropping:
+            return
+        outbox = self._outboxes.get(eio_sid)
+        if outbox is None and self._backlog(eio_sid) < self.window:
+            self._send(eio_sid, pkt)
+            message = None
+        else:
+            message = self._hold(eio_sid, outbox, pkt)
+        attachments = attachment_count(pkt.data)
+        if attachments:
+            self._attaching[eio_sid] = [message, attachments]
+
+    def _backlog(self, eio_sid):
+        socket = self._server.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    def _hold(self, eio_sid, outbox, pkt):
+        if outbox is None:
+            outbox = self._outboxes[eio_sid] = Outbox(self._backlog(eio_sid))
+            if self._task is None:
+                self._task = self._start_background_task(self._drain_loop)
+        event = event_name(pkt.data) if type(pkt.data) is str else None
+        message = [event, [pkt]]
+        if event in self.resync:
+            waiting = outbox.latest.get(event)
+            if waiting is not None:
+                waiting[1] = KEYFRAME
+                self.coalesced += 1
+                return [event, []]  # Dropped, with any attachments it has
+            outbox.latest[event] = message
+        elif event in self.coalesce:
+            older = outbox.latest.get(event)
+            if older is not None:
+                older[1] = None
+                self.coalesced += 1
+            outbox.latest[event] = message
+        else:
+            outbox.kept += 1
+            if outbox.kept > self.max_pending:
+                # Disconnecting here would change rooms under the emit that called us
+                self._dropping.add(eio_sid)
+        outbox.messages.append(message)
+        return message
+
+    def _drain_loop(self):
+        while True:
+            self._sleep(self.drain_interval)
+            now = time.monotonic()
+            for eio_sid, outbox in list(self._outboxes.items()):
+                try:
+                    self._drain(eio_sid, outbox, now)
+                except Exception:
+                    self._server.logger.exception('Outbound drain failed for %s', eio_sid)
+            for eio_sid in list(self._dropping):
+                self._drop(eio_sid)
+
+    def _drain(self, eio_sid, outbox, now):
+        socket = self._server.eio.sockets.get(eio_sid)
+        if socket is None or socket.closed:
+            self._forget(eio_sid)
+            return
+        if eio_sid in self._attaching or eio_sid in self._dropping:
+            return
+        messages = outbox.messages
+        if socket.queue.qsize() < outbox.backlog:
+            outbox.moved = now
+        while messages and socket.queue.qsize() < self.window:
+            message = messages.popleft()
+            event, packets = message
+            if packets is None:
+                continue
+            if outbox.latest.get(event) is message:
+                del outbox.latest[event]
+            else:
+                outbox.kept -= 1
+            if packets is KEYFRAME:
+                for name, data in self.resync[event](eio_sid):
+                    self._server._send_packet(eio_sid, self._server.packet_class(
+                        sio_packet.EVENT, namespace='/', data=[name, data]))
+                continue
+            for pkt in packets:
+                self._send(eio_sid, pkt)
+        outbox.backlog = socket.queue.qsize()
+        if not messages:
+            del self._outboxes[eio_sid]
+        elif now - outbox.moved > self.max_lag:
+            self._dropping.add(eio_sid)
+
+    def _drop(self, eio_sid):
+        self._forget(eio_sid)
+        self._dropping.discard(eio_sid)
+        socket = self._server.eio.sockets.get(eio_sid)
+        if socket is not None and not socket.closed:
+            self.disconnected += 1
+            self._start_background_task(self._close, eio_sid, socket)
+
+    def _close(self, eio_sid, socket):
+        # Without waiting for, or sending to, a client that is not reading;
+        # the disconnect handlers run as for any other lost connection
+        socket.close(wait=False, abort=True)
+        self._server.eio.sockets.pop(eio_sid, None)
+
+    def _forget(self, eio_sid):
+        self._outboxes.pop(eio_sid, None)
+        self._attaching.pop(eio_sid, None)
+
+    def depths(self):
+        """Packets waiting to be written, and events in the outbox, per socket that is behind."""
+        return {
+            eio_sid: {'queued': self._backlog(eio_sid), 'waiting': outbox.kept + len(outbox.latest)}
+            for eio_sid, outbox in self._outboxes.items()
+        }
+
+    def stats(self):
+        depths = self.depths()
+        return {
+            'behind': len(depths),
+            'waiting': sum(depth['waiting'] for depth in depths.values()),
+            'max_waiting': max((depth['waiting'] for depth in depths.values()), default=0),
+            'coalesced': self.coalesced,
+            'disconnected': self.disconnected,
+            'sockets': depths
+        }
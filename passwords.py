@@ -0,0 +1,49 @@
+"""Password hashing off the gevent event loop.
+
+werkzeug's hashes are deliberately slow (scrypt by default), and run
+inline they stall every greenlet in the process, game ticks included. The
+hashlib functions underneath release the GIL, so PasswordHasher runs them
+in a small pool of real OS threads and the calling greenlet just waits.
+The pool takes at most `max_pending` hashes at a time; past that, requests
+are refused with HasherBusy instead of queueing up behind a login storm.
+"""
+from gevent.threadpool import ThreadPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Too many password hashes already waiting."""
+
+
+class PasswordHasher:
+    def __init__(self, method='scrypt:32768:8:1', workers=2, max_pending=32):
+        # A full werkzeug method string, parameters included, so stored
+        # hashes made with other parameters can be told apart
+        self.method = method
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._pool = ThreadPool(workers)
+
+    def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusy()
+        self.pending += 1
+        try:
+            return self._pool.apply(fn, args)
+        finally:
+            self.pending -= 1
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if `pwhash` was made with a different method or parameters."""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def stats(self):
+        return {'pending': self.pending, 'rejected': self.rejected}
@@ -0,0 +1,191 @@
+"""Pong engine: room state and fixed-timestep physics, independent of Socket.IO.
+
+The simulation advances in fixed steps of 1 / PHYSICS_RATE seconds, however
+often the server sends snapshots, so ball speed never depends on the tick or
+client rate. Paddle positions from clients are held as pending input and
+applied once before the next steps, so only the latest position per tick
+counts. Paddle hits are swept: the ball's path during a step is tested
+against each paddle face, so a fast ball cannot pass through a paddle
+between two steps.
+"""
+import math
+
+from recording import SeededRandom, new_seed
+
+CANVAS_WIDTH = 800
+CANVAS_HEIGHT = 600
+PADDLE_WIDTH = 20
+PADDLE_HEIGHT = 100
+BALL_RADIUS = 10
+WINNING_SCORE = 5
+
+PHYSICS_RATE = 120  # Steps per second
+STEP = 1 / PHYSICS_RATE
+BALL_SPEED = 300  # Pixels per second along each axis at serve
+MAX_BALL_DY = 3 * BALL_SPEED
+# Vertical speed (px/s) added per pixel the hit lands away from the paddle centre
+PADDLE_SPIN = 6
+
+SIDES = ('left', 'right')
+
+
+class PongRoom:
+    __slots__ = ('players', 'ball_x', 'ball_y', 'ball_dx', 'ball_dy', 'left_y', 'right_y',
+                 'left_input', 'right_input', 'left_score', 'right_score', 'winner',
+                 'step', 'ready', 'in_progress', 'rng')
+
+    def __init__(self, seed=None):
+        self.rng = SeededRandom(new_seed() if seed is None else seed)  # Serve directions
+        self.players = []  # Socket ids by seat: left, then right; None for a seat whose player left
+        self.ball_x = CANVAS_WIDTH // 2
+        self.ball_y = CANVAS_HEIGHT // 2
+        self.ball_dx = BALL_SPEED
+        self.ball_dy = BALL_SPEED
+        self.left_y = (CANVAS_HEIGHT - PADDLE_HEIGHT) // 2  # Top edge of each paddle
+        self.right_y = self.left_y
+        self.left_input = None  # Latest paddle position received since the last tick
+        self.right_input = None
+        self.left_score = 0
+        self.right_score = 0
+        self.winner = None
+        self.step = 0  # Physics steps run so far
+        self.ready = 0  # Number of players ready
+        self.in_progress = False
+
+    def move_paddle(self, side, y):
+        # Applied on the next tick; later moves in the same tick replace it
+        if not math.isfinite(y):
+            return
+        y = min(max(y, 0), CANVAS_HEIGHT - PADDLE_HEIGHT)
+        if side == 'left':
+            self.left_input = y
+        elif side == 'right':
+            self.right_input = y
+
+    def sit(self, sid):
+        """Seat `sid` on the first free side; return its index in SIDES, or None if the room is full."""
+        if None in self.players:
+            seat = self.players.index(None)
+            self.players[seat] = sid
+            return seat
+        if len(self.players) < len(SIDES):
+            self.players.append(sid)
+            return len(self.players) - 1
+        return None
+
+    def leave(self, sid):
+        # The other player keeps their side
+        self.players = [None if player == sid else player for player in self.players]
+
+    def seated(self):
+        return sum(sid is not None for sid in self.players)
+
+    def sides_of(self, sid):
+        """Sides `sid` controls: one, or both for a hot-seat game."""
+        return [side for side, player in zip(SIDES, self.players) if player == sid]
+
+    def ball_wire(self):
+        return {'x': self.ball_x, 'y': self.ball_y, 'dx': self.ball_dx, 'dy': self.ball_dy,
+                'radius': BALL_RADIUS}
+
+    def scores_wire(self):
+        return {'left': self.left_score, 'right': self.right_score}
+
+    def snapshot(self):
+        return {
+            'step': self.step,
+            'ball': self.ball_wire(),
+            'paddles': {'left': self.left_y, 'right': self.right_y},
+            'scores': self.scores_wire(),
+            'winner': self.winner
+        }
+
+    def to_wire(self):
+        return {
+            'players': self.players,
+            'ball': self.ball_wire(),
+            'paddles': {
+                'left': {'y': self.left_y, 'height': PADDLE_HEIGHT},
+                'right': {'y': self.right_y, 'height': PADDLE_HEIGHT}
+            },
+            'scores': self.scores_wire(),
+            'winner': self.winner,
+            'step': self.step,
+            'ready': self.ready,
+            'in_progress': self.in_progress
+        }
+
+
+def advance_pong(game, steps=1):
+    """Apply pending paddle input, then run `steps` physics steps."""
+    if game.left_input is not None:
+        game.left_y, game.left_input = game.left_input, None
+    if game.right_input is not None:
+        game.right_y, game.right_input = game.right_input, None
+    for _ in range(steps):
+        step_pong(game)
+        if game.winner:
+            game.in_progress = False
+            break
+
+
+def _paddle_hit(game, paddle_y, hit_y):
+    # The hit lands on the paddle face between its top and bottom edges
+    if not paddle_y <= hit_y <= paddle_y + PADDLE_HEIGHT:
+        return False
+    game.ball_dx = -game.ball_dx
+    # Adjust angle based on where the ball hits the paddle
+    dy = game.ball_dy + (hit_y - (paddle_y + PADDLE_HEIGHT / 2)) * PADDLE_SPIN
+    game.ball_dy = min(max(dy, -MAX_BALL_DY), MAX_BALL_DY)
+    return True
+
+
+def step_pong(game):
+    x0, y0 = game.ball_x, game.ball_y
+    x = x0 + game.ball_dx * STEP
+    y = y0 + game.ball_dy * STEP
+
+    # Paddle faces, as the x the ball's centre reaches on contact
+    left_face = PADDLE_WIDTH + BALL_RADIUS
+    right_face = CANVAS_WIDTH - PADDLE_WIDTH - BALL_RADIUS
+    if x0 >= left_face > x:
+        hit_y = y0 + (y - y0) * (x0 - left_face) / (x0 - x)
+        if _paddle_hit(game, game.left_y, hit_y):
+            x = 2 * left_face - x
+    elif x0 <= right_face < x:
+        hit_y = y0 + (y - y0) * (right_face - x0) / (x - x0)
+        if _paddle_hit(game, game.right_y, hit_y):
+            x = 2 * right_face - x
+
+    # Bounce off the top and bottom walls
+    if y - BALL_RADIUS <= 0:
+        y = 2 * BALL_RADIUS - y
+        game.ball_dy = abs(game.ball_dy)
+    elif y + BALL_RADIUS >= CANVAS_HEIGHT:
+        y = 2 * (CANVAS_HEIGHT - BALL_RADIUS) - y
+        game.ball_dy = -abs(game.ball_dy)
+
+    game.ball_x, game.ball_y = x, y
+    game.step += 1
+
+    # Check for scoring
+    if x - BALL_RADIUS <= 0:
+        # Right player scores
+        game.right_score += 1
+        if game.right_score >= WINNING_SCORE:
+            game.winner = 'right'
+        reset_ball(game)
+    elif x + BALL_RADIUS >= CANVAS_WIDTH:
+        # Left player scores
+        game.left_score += 1
+        if game.left_score >= WINNING_SCORE:
+            game.winner = 'left'
+        reset_ball(game)
+
+
+def reset_ball(game):
+    # Reset ball to center with random direction
+    game.ball_x = CANVAS_WIDTH // 2
+    game.ball_y = CANVAS_HEIGHT // 2
+    game.ball_dx = BALL_SPEED if game.rng.randbelow(2) else -BALL_SPEED
+    game.ball_dy = BALL_SPEED if game.rng.randbelow(2) else -BALL_SPEED
@@ -0,0 +1,141 @@
+"""Pong's Socket.IO handlers, spectators and server tick, loaded by server.load_game."""
+import math
+
+from flask import request
+from flask_socketio import emit, join_room
+
+from server import (add_room_member, app, games, record_score, routed, socket_user, socketio, start_tick_scheduler,
+                    wire_format)
+from pong import PongRoom, advance_pong, PHYSICS_RATE, SIDES
+from wire import spectator_room
+
+# Fixed physics steps per pong snapshot, and per snapshot sent to spectators
+PONG_STEPS_PER_TICK = max(1, round(PHYSICS_RATE / app.config['PONG_SNAPSHOT_RATE']))
+PONG_STEPS_PER_SPECTATOR_FRAME = max(PONG_STEPS_PER_TICK, round(PHYSICS_RATE / app.config['PONG_SPECTATOR_RATE']))
+
+
+@socketio.on('join_pong')
+@routed('pong')
+def handle_pong_join(data):
+    room = data['room']
+    game = games['pong'].get(room)
+    # A third socket, or one that asks to, watches instead of playing
+    if data.get('spectate') or game is not None and game.seated() >= 2:
+        watch_pong(room, data)
+        return
+    join_room(room)
+    start_tick_scheduler()
+
+    # Initialize game state if it doesn't exist
+    if game is None:
+        games['pong'][room] = game = PongRoom()
+    add_room_member('pong', room, data)
+
+    # Add player to the game
+    player_id = request.sid
+
+    if data.get('hotseat') and game.seated() == 0:
+        # Both players share one keyboard and socket; start right away
+        game.players = [player_id, player_id]
+        game.ready = 2
+        game.in_progress = True
+        emit('pong_joined', {
+            'side': 'both',
+            'gameState': game.to_wire()
+        })
+        emit('pong_game_start', room=room)
+    else:
+        # A player who left frees their side, which the next joiner takes
+        player_side = SIDES[game.sit(player_id)]
+
+        emit('pong_joined', {
+            'side': player_side,
+            'gameState': game.to_wire()
+        })
+
+        # If two players have joined, start the game
+        if game.seated() == 2:
+            emit('pong_ready', room=room)
+
+
+def watch_pong(room, data):
+    game = games['pong'].get(room)
+    if game is None:
+        emit('pong_spectate_unavailable', {'room': room, 'reason': 'not_found'})
+        return
+    if games['pong'].spectator_count(room) >= app.config['PONG_SPECTATOR_LIMIT']:
+        emit('pong_spectate_unavailable', {'room': room, 'reason': 'full'})
+        return
+    # The plain room only so that handle_disconnect finds the spectator
+    join_room(room)
+    wire = wire_format(data)
+    join_room(spectator_room(room, wire))
+    games['pong'].add_spectator(room, request.sid, wire)
+    emit('pong_spectate', {'gameState': game.to_wire()})
+
+
+@socketio.on('pong_player_ready')
+@routed('pong')
+def handle_pong_ready(data):
+    room = data['room']
+    game = games['pong'].get(room)
+
+    if game:
+        game.ready += 1
+        if game.ready == 2:
+            game.in_progress = True
+            emit('pong_game_start', room=room)
+
+
+@socketio.on('pong_paddle_move')
+@routed('pong')
+def handle_pong_paddle_move(data):
+    room = data['room']
+    side = data['side']  # 'left' or 'right'
+    position = data['position']
+    game = games['pong'].get(room)
+    # NaN or infinity would end up in the JSON snapshots; bools are ints to isinstance
+    if type(position) not in (int, float) or not math.isfinite(position):
+        return
+
+    # Players may only move their own paddle. The position takes effect on
+    # the next tick and reaches the room in its snapshot.
+    if game and game.in_progress and side in game.sides_of(request.sid):
+        game.move_paddle(side, position)
+
+
+def tick(game):
+    if not game.in_progress:
+        return None
+    before = game.step
+    advance_pong(game, PONG_STEPS_PER_TICK)
+    if game.winner is not None:
+        record_match(game)
+    # Spectators get the snapshot when it starts a new spectator frame, and the last one
+    spectators = (game.winner is not None
+                  or before // PONG_STEPS_PER_SPECTATOR_FRAME != game.step // PONG_STEPS_PER_SPECTATOR_FRAME)
+    return 'pong_game_update', game.snapshot(), spectators
+
+
+def record_match(game):
+    # Each player scores the points of their own side, the hot-seat player
+    # those of the winner. Players connected to another worker are not known here.
+    scores = game.scores_wire()
+    # Ticks run outside any request; the first score for pong loads its board from the database
+    with app.app_context():
+        for sid in dict.fromkeys(game.players):
+            user = socket_user(sid) if sid is not None else None
+            if user is not None:
+                record_score(user, 'pong', max(scores[side] for side in game.sides_of(sid)))
+
+
+def finished(game):
+    return game.winner is not None
+
+
+def player_left(game, sid):
+    if sid in game.players:
+        game.leave(sid)
+        # A match needs both players; wait for a new opponent
+        game.in_progress = False
+        game.ready = 0
@@ -0,0 +1,40 @@
+"""In-process token-bucket rate limiting, keyed by anything hashable.
+
+Each key may make `limit` attempts, refilled evenly over `period` seconds.
+Buckets that have refilled completely hold no information, so they are
+dropped whenever the table grows past `max_keys`, which keeps memory
+bounded under a burst from many addresses.
+"""
+import time
+
+
+class RateLimiter:
+    def __init__(self, limit, period, max_keys=100000):
+        self.limit = limit
+        self.rate = limit / period  # Tokens per second
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> (tokens, last update)
+
+    def hit(self, key):
+        """Take one attempt for `key`; return False if it has none left."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.limit, now))
+        tokens = min(self.limit, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+        if len(self._buckets) >= self.max_keys and key not in self._buckets:
+            self._prune(now)
+        self._buckets[key] = (tokens - 1, now)
+        return True
+
+    def _prune(self, now):
+        full = [key for key, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.limit]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            # Still full of active keys: forget the oldest half
+            oldest = sorted(self._buckets, key=lambda key: self._buckets[key][1])
+            for key in oldest[:len(oldest) // 2]:
+                del self._buckets[key]
@@ -0,0 +1,49 @@
+"""Per-room seeded randomness and input logs, so a game can be played again.
+
+A room draws every random number (food, pieces, serves) from its own
+SeededRandom, and the engine appends each player input to the room's
+``inputs`` as one fixed-size record: the number of ticks run so far and an
+input code. Seed, inputs and tick count are then enough to re-run the game
+exactly (see replay.py).
+
+SeededRandom is SplitMix64 rather than random.Random: one int of state
+instead of 2.5 KB per room, and its output cannot change with the Python
+version, so old recordings stay valid.
+"""
+import random
+import struct
+
+MASK64 = (1 << 64) - 1
+
+# ticks run before the input (uint32), input code (uint8)
+RECORD = struct.Struct('<IB')
+
+
+def new_seed():
+    return random.getrandbits(64)
+
+
+class SeededRandom:
+    __slots__ = ('state',)
+
+    def __init__(self, seed):
+        self.state = seed & MASK64
+
+    def next64(self):
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def randbelow(self, n):
+        """An int in [0, n); the bias is below n / 2**64."""
+        return (self.next64() * n) >> 64
+
+
+def record(game, code):
+    game.inputs += RECORD.pack(game.ticks, code)
+
+
+def iter_records(inputs):
+    """(ticks, code) for each input, in the order they were played."""
+    return RECORD.iter_unpack(inputs)
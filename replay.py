@@ -0,0 +1,105 @@
+"""Headless replay of recorded snake and tetris games.
+
+A recording is what a room keeps anyway: its seed, the number of ticks run
+and its input log (see recording.py). Replaying steps the engine straight
+through, with no clock to wait for and nothing sent, so a game that took
+minutes to play re-runs in milliseconds. The server replays a game before
+recording its score; benchmarks/replay_games.py re-runs saved recordings to
+check that engine changes keep every game's outcome.
+
+Saved recordings are a fixed header followed by the input log:
+
+    magic b'GHR2', game (uint8), seed (uint64), ticks, score and state
+    digest (uint32 each), then RECORD entries to the end of the file
+
+b'GHR1' recordings came from engines that placed snake food another way;
+their tetris games still replay, their snake games cannot.
+"""
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+from recording import RECORD, iter_records
+from snake import DIRECTIONS, SnakeRoom, advance_snake, turn
+from tetris import MOVES, TetrisRoom, apply_gravity, player_move
+
+MAGIC = b'GHR2'
+OLD_MAGIC = b'GHR1'
+HEADER = struct.Struct('<4sBQIII')
+GAME_TYPES = ('snake', 'tetris')  # Index is the game code in the header
+
+Recording = namedtuple('Recording', 'game_type seed ticks score digest inputs')
+
+
+def _run(game, inputs, ticks, step, apply):
+    # Inputs are stamped with the ticks run before them; a finished game
+    # takes no more steps, just as the server stops ticking it
+    for tick, code in iter_records(inputs):
+        while game.ticks < tick and not game.game_over:
+            step(game)
+        apply(game, code)
+    while game.ticks < ticks and not game.game_over:
+        step(game)
+    return game
+
+
+def replay_snake(seed, inputs, ticks):
+    return _run(SnakeRoom(seed=seed), inputs, ticks, advance_snake,
+                lambda game, code: turn(game, DIRECTIONS[code]))
+
+
+def replay_tetris(seed, inputs, ticks):
+    return _run(TetrisRoom(seed=seed), inputs, ticks, apply_gravity,
+                lambda game, code: player_move(game, MOVES[code]))
+
+
+REPLAYS = {
+    'snake': replay_snake,
+    'tetris': replay_tetris
+}
+
+
+def replay(game_type, seed, inputs, ticks):
+    """Play a game again from its seed and inputs; return the final room state."""
+    return REPLAYS[game_type](seed, inputs, ticks)
+
+
+def digest(game_type, game):
+    """A checksum of everything that decides how the game goes on from here."""
+    if game_type == 'snake':
+        state = (list(game.snake), game.food, game.direction, game.score, game.game_over)
+    else:
+        state = (bytes(game.board), game.piece, game.rotation, game.row, game.col,
+                 game.next_piece, game.score, game.level, game.game_over)
+    return zlib.crc32(repr(state).encode())
+
+
+def dumps(game_type, game):
+    header = HEADER.pack(MAGIC, GAME_TYPES.index(game_type), game.seed, game.ticks,
+                         game.score, digest(game_type, game))
+    return header + bytes(game.inputs)
+
+
+def loads(data):
+    if len(data) < HEADER.size or (len(data) - HEADER.size) % RECORD.size:
+        raise ValueError('not a GameHub recording')
+    magic, game, seed, ticks, score, state = HEADER.unpack_from(data)
+    if magic not in (MAGIC, OLD_MAGIC) or game >= len(GAME_TYPES):
+        raise ValueError('not a GameHub recording')
+    if magic == OLD_MAGIC and GAME_TYPES[game] == 'snake':
+        raise ValueError('a snake recording from before food placement changed')
+    return Recording(GAME_TYPES[game], seed, ticks, score, state, data[HEADER.size:])
+
+
+def save_recording(directory, game_type, game):
+    """Write a finished game to `directory` and return the file's path."""
+    path = os.path.join(directory, f'{game_type}-{game.seed:016x}.replay')
+    with open(path, 'wb') as f:
+        f.write(dumps(game_type, game))
+    return path
+
+
+def load_recording(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -0,0 +1,429 @@
+"""Room-state backends behind the `games` registry.
+
+``games[game_type]`` is a mapping of room id -> room state with the same
+interface whichever backend is in use, so handlers and the tick scheduler
+read and mutate rooms in place.
+
+InProcessRoomStore keeps every room in this process; it is the default.
+
+Both backends keep rooms in least-recently-active order, track the sockets
+in each room, and can cap the number of rooms per game type: adding a room
+past the cap evicts the least recently active one, or hands it to
+`on_over_limit` to evict later (the server evicts it on its own shard).
+Spectators are tracked apart from members: they get their own frames and do
+not keep a room open. Eviction (whether by the cap or by the server's idle
+reaper) is reported through `on_evict`.
+
+RedisRoomStore lets several worker processes share rooms. Every room is
+owned by exactly one worker: the first worker to create it, recorded in
+Redis under a lease. The owner keeps the live state in memory, runs its
+ticks and checkpoints it to Redis every few seconds. Events for a room that
+another worker owns are forwarded to the owner over Redis pub/sub, and a
+room whose owner stops renewing its lease is taken over from its last
+checkpoint by the next worker that needs it.
+"""
+import logging
+import os
+import pickle
+import socket
+import time
+import sys
+import uuid
+from collections import OrderedDict, deque
+from itertools import islice
+from collections.abc import MutableMapping
+
+logger = logging.getLogger(__name__)
+
+
+class RoomOwnedElsewhere(Exception):
+    """Another worker claimed the room first; its events belong with `owner`."""
+
+    def __init__(self, game_type, room, owner):
+        super().__init__(f'{game_type} room {room} is owned by {owner}')
+        self.owner = owner
+
+
+class RoomStore:
+    """Behaviour shared by both backends; subclasses fill in self._rooms."""
+
+    def __init__(self, room_limit=None, on_evict=None, on_over_limit=None):
+        self.room_limit = room_limit
+        self.on_evict = on_evict
+        self.on_over_limit = on_over_limit
+        self.evicted = {}
+
+    def __getitem__(self, game_type):
+        return self._rooms[game_type]
+
+    def __contains__(self, game_type):
+        return game_type in self._rooms
+
+    def __iter__(self):
+        return iter(self._rooms)
+
+    def evict(self, game_type, room, reason):
+        """Remove a room and tell `on_evict` why it went."""
+        rooms = self._rooms[game_type]
+        if room not in rooms._local:
+            return
+        del rooms[room]
+        counts = self.evicted.setdefault(game_type, {})
+        counts[reason] = counts.get(reason, 0) + 1
+        if self.on_evict:
+            self.on_evict(game_type, room, reason)
+
+    def listing(self, game_type):
+        """(room, state, spectators, last active as wall-clock time) for each room."""
+        return self._rooms[game_type].listing()
+
+    def stats(self):
+        """Live rooms, connected sockets and approximate memory per game type."""
+        return {
+            game_type: {
+                'rooms': len(rooms),
+                'members': sum(len(sids) for sids in rooms.members.values()),
+                'spectators': sum(len(sids) for sids in rooms.spectators.values()),
+                'bytes': sum(deep_sizeof(game) for game in rooms._local.values()),
+                'evicted': self.evicted.get(game_type, {})
+            }
+            for game_type, rooms in self._rooms.items()
+        }
+
+
+class LocalRooms(MutableMapping):
+    """Rooms of one game type held by this process, least recently active first."""
+
+    def __init__(self, store, game_type):
+        self._store = store
+        self._game_type = game_type
+        self._local = OrderedDict()
+        self.last_active = {}
+        self.members = {}  # room -> {sid: wire format}
+        self.spectators = {}  # room -> {sid: wire format}
+
+    def __getitem__(self, room):
+        return self._local[room]
+
+    def __setitem__(self, room, game):
+        new = room not in self._local
+        self._local[room] = game
+        self.touch(room)
+        if new:
+            self._make_space()
+
+    def __delitem__(self, room):
+        del self._local[room]
+        self.last_active.pop(room, None)
+        self.members.pop(room, None)
+        self.spectators.pop(room, None)
+
+    def __iter__(self):
+        return iter(self._local)
+
+    def __len__(self):
+        return len(self._local)
+
+    def _make_space(self):
+        for room in self.over_limit():
+            if self._store.on_over_limit:
+                self._store.on_over_limit(self._game_type, room)
+            else:
+                self._store.evict(self._game_type, room, 'limit')
+
+    def over_limit(self):
+        """The least recently active rooms past the room limit, oldest first."""
+        limit = self._store.room_limit
+        if not limit or len(self._local) <= limit:
+            return []
+        return list(islice(self._local, len(self._local) - limit))
+
+    def peek(self, room):
+        """The room's state if this process holds it, else None; never takes it over."""
+        return self._local.get(room)
+
+    def touch(self, room):
+        if room in self._local:
+            self._local.move_to_end(room)
+            self.last_active[room] = time.monotonic()
+
+    def add_member(self, room, sid, wire='json'):
+        self.members.setdefault(room, {})[sid] = wire
+
+    def add_spectator(self, room, sid, wire='json'):
+        self.spectators.setdefault(room, {})[sid] = wire
+
+    def remove_member(self, room, sid):
+        """Forget `sid` in `room`, as member or spectator; return how many members are left."""
+        sids = self.members.get(room, {})
+        sids.pop(sid, None)
+        self.spectators.get(room, {}).pop(sid, None)
+        return len(sids)
+
+    def wire_formats(self, room):
+        """Wire formats the sockets in `room` asked for."""
+        return set(self.members.get(room, {}).values())
+
+    def spectator_count(self, room):
+        return len(self.spectators.get(room, ()))
+
+    def spectator_formats(self, room):
+        return set(self.spectators.get(room, {}).values())
+
+    def active_at(self, room):
+        # last_active is monotonic; other workers need the wall-clock time
+        return time.time() - (time.monotonic() - self.last_active[room])
+
+    def listing(self):
+        return [(room, game, self.spectator_count(room), self.active_at(room)) for room, game in self._local.items()]
+
+
+class InProcessRoomStore(RoomStore):
+    shared = False
+
+    def __init__(self, game_types, room_limit=None, on_evict=None, on_over_limit=None):
+        super().__init__(room_limit, on_evict, on_over_limit)
+        self.worker_id = None
+        self._rooms = {game_type: LocalRooms(self, game_type) for game_type in game_types}
+
+    def owner_of(self, game_type, room):
+        # Every room is local
+        return None
+
+    def publish_all(self, message):
+        # No other workers to tell
+        pass
+
+    def start(self, start_background_task, dispatch):
+        pass
+
+
+class SharedRooms(LocalRooms):
+    """Rooms of one game type: the ones this worker owns, backed by Redis."""
+
+    def __getitem__(self, room):
+        game = self._local.get(room)
+        if game is None:
+            game = self._store.take_over(self._game_type, room)
+            if game is None:
+                raise KeyError(room)
+            super().__setitem__(room, game)
+        return game
+
+    def __setitem__(self, room, game):
+        # Two workers may both see no owner; only the one whose claim wins keeps a copy
+        if room not in self._local and not self._store.claim(self._game_type, room):
+            raise RoomOwnedElsewhere(self._game_type, room, self._store.owner_of(self._game_type, room))
+        super().__setitem__(room, game)
+        self._store.checkpoint(self._game_type, room, game)
+
+    def __delitem__(self, room):
+        super().__delitem__(room)
+        self._store.release(self._game_type, room)
+
+    def drop(self, room):
+        # Ownership moved elsewhere; forget the local copy without touching Redis
+        if room in self._local:
+            super().__delitem__(room)
+
+
+class RedisRoomStore(RoomStore):
+    shared = True
+
+    def __init__(self, game_types, url, prefix='gamehub', lease_ttl=15, checkpoint_interval=2.0,
+                 room_limit=None, on_evict=None, on_over_limit=None):
+        import redis
+
+        super().__init__(room_limit, on_evict, on_over_limit)
+        self.redis = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+        self.prefix = prefix
+        self.lease_ttl = lease_ttl
+        self.checkpoint_interval = checkpoint_interval
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._rooms = {game_type: SharedRooms(self, game_type) for game_type in game_types}
+        # (game_type, room) -> (owner, expires_at) for rooms owned elsewhere
+        self._remote_owners = {}
+
+    def _owner_key(self, game_type, room):
+        return f'{self.prefix}:owner:{game_type}:{room}'
+
+    def _state_key(self, game_type):
+        return f'{self.prefix}:rooms:{game_type}'
+
+    def _listing_key(self, game_type):
+        return f'{self.prefix}:listing:{game_type}'
+
+    def _checkpoint_of(self, game_type, room, game):
+        # The room's state, and what listing() shows other workers about it;
+        # taken before the transaction, which may yield while the room closes
+        rooms = self._rooms[game_type]
+        return pickle.dumps(game), f'{rooms.spectator_count(room)}:{rooms.active_at(room)}:{time.time()}'
+
+    def _queue_checkpoint(self, pipe, game_type, room, checkpoint):
+        state, entry = checkpoint
+        pipe.hset(self._state_key(game_type), room, state)
+        pipe.hset(self._listing_key(game_type), room, entry)
+
+    def _channel(self, worker_id):
+        return f'{self.prefix}:worker:{worker_id}'
+
+    def owner_of(self, game_type, room):
+        """Return the worker that owns `room` if it is not this one, else None."""
+        if room in self._rooms[game_type]._local:
+            return None
+        cached = self._remote_owners.get((game_type, room))
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        owner = self.redis.get(self._owner_key(game_type, room))
+        if owner is None:
+            return None
+        owner = owner.decode()
+        if owner == self.worker_id:
+            return None
+        self._remote_owners[(game_type, room)] = (owner, time.monotonic() + 1.0)
+        return owner
+
+    def claim(self, game_type, room):
+        key = self._owner_key(game_type, room)
+        if self.redis.set(key, self.worker_id, nx=True, ex=self.lease_ttl):
+            return True
+        # Already ours, e.g. a room closed here whose lease is still being released
+        return self._while_owner(game_type, room, lambda pipe: pipe.expire(key, self.lease_ttl))
+
+    def _while_owner(self, game_type, room, queue, unowned=False):
+        # Run the commands `queue` adds to a transaction, only while this worker
+        # holds the room's lease (or, with `unowned`, nobody does); True if they ran
+        key = self._owner_key(game_type, room)
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    owner = pipe.get(key)
+                    if owner is None and not unowned or owner is not None and owner.decode() != self.worker_id:
+                        return False
+                    pipe.multi()
+                    queue(pipe)
+                    pipe.execute()
+                    return True
+                except self._watch_error:
+                    continue  # The lease changed while we looked; look again
+
+    def take_over(self, game_type, room):
+        # Load a room whose owner is gone (its lease expired) from its checkpoint
+        state = self.redis.hget(self._state_key(game_type), room)
+        if state is None or not self.claim(game_type, room):
+            return None
+        return pickle.loads(state)
+
+    def checkpoint(self, game_type, room, game):
+        checkpoint = self._checkpoint_of(game_type, room, game)
+        self._while_owner(game_type, room, lambda pipe: self._queue_checkpoint(pipe, game_type, room, checkpoint))
+
+    def release(self, game_type, room):
+        # A worker that took the room over after our lease lapsed keeps its state
+        def queue(pipe):
+            pipe.hdel(self._state_key(game_type), room)
+            pipe.hdel(self._listing_key(game_type), room)
+            pipe.delete(self._owner_key(game_type, room))
+        self._while_owner(game_type, room, queue, unowned=True)
+
+    def listing(self, game_type):
+        """Rooms of every worker: this one's live, the others' as last checkpointed."""
+        listed = super().listing(game_type)
+        local = self._rooms[game_type]._local
+        with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._listing_key(game_type))
+            pipe.hgetall(self._state_key(game_type))
+            entries, states = pipe.execute()
+        now = time.time()
+        for room, entry in entries.items():
+            spectators, active_at, checkpointed_at = entry.decode().split(':')
+            # A room whose owner stopped checkpointing waits for a take-over
+            if room.decode() in local or room not in states or now - float(checkpointed_at) > self.lease_ttl:
+                continue
+            listed.append((room.decode(), pickle.loads(states[room]), int(spectators), float(active_at)))
+        return listed
+
+    def forward(self, worker_id, message):
+        self.redis.publish(self._channel(worker_id), pickle.dumps(message))
+
+    def publish_all(self, message):
+        """Send a message to every other worker."""
+        message = dict(message, origin=self.worker_id)
+        self.redis.publish(self._channel('all'), pickle.dumps(message))
+
+    def start(self, start_background_task, dispatch):
+        start_background_task(self._checkpoint_loop)
+        start_background_task(self._listen, dispatch)
+
+    def _checkpoint_loop(self):
+        while True:
+            time.sleep(self.checkpoint_interval)
+            try:
+                self.checkpoint_all()
+            except Exception:
+                logger.exception('Room checkpoint failed')
+
+    def checkpoint_all(self):
+        """Renew the lease on every owned room and save its state."""
+        for game_type, rooms in self._rooms.items():
+            for room, game in list(rooms._local.items()):
+                if rooms._local.get(room) is not game:
+                    continue  # Closed or replaced since the sweep started
+                checkpoint = self._checkpoint_of(game_type, room, game)
+
+                def queue(pipe, room=room, checkpoint=checkpoint):
+                    pipe.set(self._owner_key(game_type, room), self.worker_id, ex=self.lease_ttl)
+                    self._queue_checkpoint(pipe, game_type, room, checkpoint)
+                # One transaction per room, so a worker that claims a lapsed
+                # lease between our look and our write keeps it
+                if not self._while_owner(game_type, room, queue, unowned=True):
+                    # Another worker took the room over while we stalled
+                    rooms.drop(room)
+
+    def _listen(self, dispatch):
+        # Without this loop, forwarded events would silently stop for good
+        # after one lost connection
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel(self.worker_id), self._channel('all'))
+                for message in pubsub.listen():
+                    try:
+                        message = pickle.loads(message['data'])
+                    except Exception:
+                        logger.exception('Unreadable message from another worker')
+                        continue
+                    if message.get('origin') != self.worker_id:
+                        dispatch(message)
+            except Exception:
+                logger.exception('Lost the worker channel; subscribing again')
+            finally:
+                pubsub.close()
+            time.sleep(1)
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by `obj` and everything it references."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(type(obj), '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, name), seen)
+                    for name in type(obj).__slots__ if hasattr(obj, name))
+    return size
+
+
+def create_room_store(game_types, url=None, room_limit=None, on_evict=None, on_over_limit=None):
+    if url:
+        return RedisRoomStore(game_types, url, room_limit=room_limit, on_evict=on_evict,
+                              on_over_limit=on_over_limit)
+    return InProcessRoomStore(game_types, room_limit=room_limit, on_evict=on_evict, on_over_limit=on_over_limit)
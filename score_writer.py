@@ -0,0 +1,106 @@
+"""Write-behind persistence for Score rows.
+
+Socket.IO handlers enqueue scores and return at once; a background task
+inserts them in batches, one transaction per batch, when a batch fills up
+or the flush interval passes, and once more at shutdown. After each batch
+is committed, `on_flush` (if given) is called with the game types in it.
+"""
+import atexit
+import queue
+import time
+from threading import Lock
+
+from models import db, Score
+
+
+class ScoreWriter:
+    def __init__(self, app, start_background_task, batch_size=100, flush_interval=1.0, max_queue=10000,
+                 on_flush=None):
+        self.app = app
+        self.on_flush = on_flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._start_background_task = start_background_task
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._task = None
+        self._pending = []  # Batch taken off the queue but not written yet
+        self._lock = Lock()
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        atexit.register(self.flush)
+
+    def put(self, user_id, game_type, score, date):
+        self._ensure_started()
+        # Blocks (yielding to other greenlets) only when the queue is full
+        self._queue.put({
+            'user_id': user_id,
+            'game_type': game_type,
+            'score': score,
+            'date': date
+        })
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._task is None:
+                self._task = self._start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            batch = self._pending = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._pending = []
+            self._write(batch)
+
+    def flush(self):
+        """Write everything still queued; used at shutdown."""
+        batch, self._pending = self._pending, []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) == self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        with self.app.app_context():
+            try:
+                db.session.execute(db.insert(Score), batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.failed += len(batch)
+                self.app.logger.exception('Failed to write %d scores', len(batch))
+                return
+        elapsed = (time.perf_counter() - start) * 1000
+        self.flushed += len(batch)
+        self.batches += 1
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        if self.on_flush is not None:
+            self.on_flush({row['game_type'] for row in batch})
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'flushed': self.flushed,
+            'failed': self.failed,
+            'batches': self.batches,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3)
+        }
@@ -1,59 +1,419 @@
-from gevent import monkey
-monkey.patch_all()
-
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_from_directory
-from flask_socketio import SocketIO, emit, join_room, leave_room
+"""GameHub server: the application factory and what every game shares.
+
+create_app() builds the Flask app, its extensions and the room runtime
+(room store, shards, outbound queues, score writer) and binds them to this
+module's names, which the handlers use, so a process runs one app. Each
+game's Socket.IO handlers live in their own module (GAME_MODULES), imported
+the first time one of its events reaches the worker.
+
+Importing this module builds nothing and leaves the standard library alone:
+wsgi.py patches it for gevent before anything else is imported.
+"""
+from flask import Flask, Response, abort, copy_current_request_context, has_request_context, make_response, render_template, request, jsonify, redirect, url_for, flash
+from flask.cli import with_appcontext
+from flask_socketio import SocketIO, emit, join_room, rooms
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from models import db, User, Score
-import random
+from models import db, User, Score, score_leaderboard_index, enable_sqlite_pragmas
+from leaderboard import LeaderboardCache, LeaderboardPages
+from score_writer import ScoreWriter
+from replay import REPLAYS, replay, save_recording
+from rooms import RoomOwnedElsewhere, create_room_store
+from shards import RoomShards
+from wire import WIRE_FORMATS, ENCODERS, PacketJSON, spectator_room, stream_room
+from metrics import Metrics
+from assets import StaticAssets
+from outbound import OutboundQueues
+from passwords import PasswordHasher, HasherBusy
+from ratelimit import RateLimiter
+from user_cache import UserCache
+from threading import Lock
+from functools import wraps
+from datetime import datetime
+import importlib
+import math
+import time
 import os
+import click
+import config
+
+# Game type -> module with its Socket.IO handlers, its tick (for games the
+# server clocks), finished(game) and optionally player_left(game, sid).
+# Every event of a game has the game type in its name.
+GAME_MODULES = {
+    'snake': 'snake_handlers',
+    'tetris': 'tetris_handlers',
+    'pong': 'pong_handlers',
+    'tictactoe': 'tictactoe_handlers'
+}
 
-app = Flask(__name__, static_url_path='/static', static_folder='static')
-app.config['SECRET_KEY'] = 'your-secret-key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///gameplatform.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Games whose clients apply deltas and may ask for the full state again
+# after detecting a gap in the update sequence
+RESYNC_GAMES = ('snake', 'tetris')
 
-# Initialize extensions
-socketio = SocketIO(app, async_mode='gevent')
-db.init_app(app)
+# Key in a socket's environ for the user it connected as
+SOCKET_USER = 'gamehub.user'
+
+socketio = SocketIO()
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Top scores per game type, served from memory
+leaderboards = LeaderboardCache()
+
+# Room event handlers by name, for events forwarded from other workers
+room_handlers = {}
+# Game type -> its handler module, once imported
+loaded_games = {}
+
+tick_thread = None
+tick_thread_lock = Lock()
+
+# The rest is built by create_app()
+app = None
+metrics = None
+passwords = ip_limiter = username_limiter = refused_logins = None
+assets = outbound = user_cache = None
+games = shards = None
+leaderboard_pages = score_writer = rejected_scores = None
+TICK_INTERVALS = {}
+
+def create_app(overrides=None):
+    """Build the app; `overrides` are app.config values to use instead of the defaults."""
+    global app, metrics, passwords, ip_limiter, username_limiter, refused_logins, assets, outbound
+    global user_cache, games, shards, leaderboard_pages, score_writer, rejected_scores, TICK_INTERVALS
+
+    # Static files are served by serve_static from StaticAssets instead
+    app = Flask(__name__, static_folder=None)
+    app.config['SECRET_KEY'] = 'your-secret-key'
+    app.config['SQLALCHEMY_DATABASE_URI'] = config.DATABASE_URI
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = config.engine_options(config.DATABASE_URI)
+    if config.READ_DATABASE_URI:
+        app.config['SQLALCHEMY_BINDS'] = {
+            'read': {'url': config.READ_DATABASE_URI, **config.engine_options(config.READ_DATABASE_URI)}
+        }
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Scores are written behind in batches of up to this size, or at this interval
+    app.config['SCORE_BATCH_SIZE'] = 100
+    app.config['SCORE_FLUSH_INTERVAL'] = 1.0
+    # Rooms with no player input for this long (seconds) are closed; finished
+    # games sooner. The reaper checks every ROOM_REAP_INTERVAL seconds.
+    app.config['ROOM_IDLE_TTL'] = 600
+    app.config['ROOM_FINISHED_TTL'] = 60
+    app.config['ROOM_REAP_INTERVAL'] = 30
+    # Scores per leaderboard page, and rendered pages kept in memory
+    app.config['LEADERBOARD_PAGE_SIZE'] = 10
+    app.config['LEADERBOARD_PAGE_CACHE_SIZE'] = 1000
+    # Optional cap on live rooms per game type; the least recently active go first
+    app.config['ROOM_LIMIT'] = None
+    # Rooms are spread over this many shards, each handling its rooms' events,
+    # ticks and evictions one at a time; a shard queues at most
+    # ROOM_SHARD_QUEUE items before senders wait
+    app.config['ROOM_SHARDS'] = 8
+    app.config['ROOM_SHARD_QUEUE'] = 1000
+    # Pong state snapshots per second; physics runs at pong.PHYSICS_RATE regardless
+    app.config['PONG_SNAPSHOT_RATE'] = 20
+    # Spectators get every snapshot only up to this rate, and a match takes at
+    # most PONG_SPECTATOR_LIMIT of them
+    app.config['PONG_SPECTATOR_RATE'] = 10
+    app.config['PONG_SPECTATOR_LIMIT'] = 100
+    # Most recently active pong rooms listed by /pong/rooms
+    app.config['PONG_ROOM_LIST_SIZE'] = 50
+    # A socket with OUTBOUND_WINDOW packets waiting to be written falls behind:
+    # its state frames are coalesced (see outbound.py), and it is disconnected
+    # once it has read nothing for OUTBOUND_MAX_LAG seconds or has more than
+    # OUTBOUND_MAX_PENDING other events waiting
+    app.config['OUTBOUND_WINDOW'] = 16
+    app.config['OUTBOUND_MAX_PENDING'] = 256
+    app.config['OUTBOUND_MAX_LAG'] = 10.0
+    # Share of Socket.IO events whose handler time is measured for /metrics
+    app.config['METRICS_SAMPLE_RATE'] = 0.1
+    # Password hashes run in this many OS threads, with at most
+    # PASSWORD_HASH_MAX_PENDING waiting; beyond that logins get a 503
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt:32768:8:1'
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    app.config['PASSWORD_HASH_MAX_PENDING'] = 32
+    # Re-hash a password on login when it was stored with another method
+    app.config['PASSWORD_REHASH'] = True
+    # Login and registration attempts allowed per (attempts, seconds)
+    app.config['LOGIN_RATE_LIMIT_PER_IP'] = (20, 60)
+    app.config['LOGIN_RATE_LIMIT_PER_USERNAME'] = (5, 60)
+    # Logged-in user records kept in memory (see user_cache.py)
+    app.config['USER_CACHE_SIZE'] = 10000
+    app.config['USER_CACHE_TTL'] = 300
+    app.config.update(overrides or {})
+
+    metrics = Metrics(sample_rate=app.config['METRICS_SAMPLE_RATE'])
+    metrics.instrument_app(app)
+
+    passwords = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING']
+    )
+    ip_limiter = RateLimiter(*app.config['LOGIN_RATE_LIMIT_PER_IP'])
+    username_limiter = RateLimiter(*app.config['LOGIN_RATE_LIMIT_PER_USERNAME'])
+    refused_logins = metrics.counter(
+        'gamehub_login_refused_total', 'Login and registration attempts refused before checking.', ('reason',))
+    metrics.gauge('gamehub_password_hashes_pending', 'Password hashes running or waiting.', (),
+                  lambda: {(): passwords.pending})
+
+    # Fingerprinted, precompressed static files (see assets.py)
+    assets = StaticAssets(os.path.join(app.root_path, 'static'))
+    app.jinja_env.globals['asset_url'] = assets.url
+
+    socketio.init_app(app, async_mode='gevent', message_queue=config.MESSAGE_QUEUE_URI,
+                      json=metrics.counting_json(PacketJSON))
+
+    # Pong snapshots supersede each other. Snake and tetris deltas do not, so a
+    # slow reader gets a keyframe instead of them. Everything else, such as
+    # game_joined, tictactoe_update and leaderboard_update, is always delivered.
+    outbound = OutboundQueues(
+        socketio.server,
+        socketio.start_background_task,
+        socketio.sleep,
+        coalesce=('pong_game_update',),
+        resync={'game_update': delta_keyframes},
+        window=app.config['OUTBOUND_WINDOW'],
+        max_pending=app.config['OUTBOUND_MAX_PENDING'],
+        max_lag=app.config['OUTBOUND_MAX_LAG']
+    )
+    metrics.gauge('gamehub_outbound_sockets_behind', 'Sockets with events waiting for a slow reader.', (),
+                  lambda: {(): outbound.stats()['behind']})
+    metrics.gauge('gamehub_outbound_max_waiting', 'Most events waiting for any one slow reader.', (),
+                  lambda: {(): outbound.stats()['max_waiting']})
+    metrics.gauge('gamehub_outbound_coalesced_total', 'State frames replaced by a newer one or a keyframe before sending.', (),
+                  lambda: {(): outbound.coalesced}, kind='counter')
+    metrics.gauge('gamehub_outbound_disconnects_total', 'Sockets disconnected for falling behind.', (),
+                  lambda: {(): outbound.disconnected}, kind='counter')
+    db.init_app(app)
+    login_manager.init_app(app)
+
+    user_cache = UserCache(maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+    metrics.gauge('gamehub_user_cache_lookups_total', 'User cache lookups.', ('result',),
+                  lambda: {('hit',): user_cache.hits, ('miss',): user_cache.misses}, kind='counter')
+
+    # Game states: games[game_type][room] -> room state, in this process or
+    # shared between workers (see rooms.py)
+    games = create_room_store(
+        list(GAME_MODULES),
+        config.ROOM_STORE_URI,
+        room_limit=app.config['ROOM_LIMIT'],
+        on_evict=close_game_room,
+        on_over_limit=evict_over_limit
+    )
+    metrics.gauge('gamehub_rooms', 'Live rooms held by this process.', ('game',),
+                  lambda: {(game_type,): len(games[game_type]) for game_type in games})
+    metrics.gauge('gamehub_room_sockets', 'Sockets in live rooms held by this process.', ('game',),
+                  lambda: {(game_type,): sum(map(len, games[game_type].members.values())) for game_type in games})
+    metrics.gauge('gamehub_room_spectators', 'Spectators in live rooms held by this process.', ('game',),
+                  lambda: {(game_type,): sum(map(len, games[game_type].spectators.values())) for game_type in games})
+    metrics.gauge('gamehub_rooms_evicted_total', 'Rooms closed, by reason.', ('game', 'reason'),
+                  lambda: {(game_type, reason): count for game_type, counts in games.evicted.items()
+                           for reason, count in counts.items()},
+                  kind='counter')
+
+    # Serial execution per room, without locks (see shards.py)
+    shards = RoomShards(
+        socketio.start_background_task,
+        count=app.config['ROOM_SHARDS'],
+        maxsize=app.config['ROOM_SHARD_QUEUE'],
+        carry=carry_request_context
+    )
+    metrics.gauge('gamehub_shard_queue_depth', 'Items waiting on each room shard.', ('shard',),
+                  lambda: {(str(index),): shard['queued'] for index, shard in enumerate(shards.stats())})
+
+    # Rendered leaderboard pages, dropped when scores for their game type are written
+    leaderboard_pages = LeaderboardPages(maxsize=app.config['LEADERBOARD_PAGE_CACHE_SIZE'])
+    metrics.gauge('gamehub_leaderboard_page_lookups_total', 'Leaderboard page cache lookups.', ('result',),
+                  lambda: {('hit',): leaderboard_pages.hits, ('miss',): leaderboard_pages.misses}, kind='counter')
+
+    # Batched background persistence for new scores
+    score_writer = ScoreWriter(
+        app,
+        socketio.start_background_task,
+        batch_size=app.config['SCORE_BATCH_SIZE'],
+        flush_interval=app.config['SCORE_FLUSH_INTERVAL'],
+        on_flush=scores_written
+    )
+    metrics.gauge('gamehub_score_queue_depth', 'Scores waiting to be written.', (),
+                  lambda: {(): score_writer.stats()['queue_depth']})
+    rejected_scores = metrics.counter(
+        'gamehub_scores_rejected_total', 'Submitted scores not recorded, by reason.', ('game', 'reason'))
+
+    with app.app_context():
+        for engine in db.engines.values():
+            enable_sqlite_pragmas(engine, config.SQLITE_PRAGMAS)
+            metrics.instrument_engine(engine)
+        metrics.instrument_session(db.session)
+
+    # Server-side tick interval (seconds) per game type; clients only send input
+    TICK_INTERVALS = {
+        'snake': 0.2,
+        'tetris': 1.0,
+        'pong': 1 / app.config['PONG_SNAPSHOT_RATE']
+    }
+
+    app.add_url_rule('/', view_func=index)
+    app.add_url_rule('/login', view_func=login, methods=['GET', 'POST'])
+    app.add_url_rule('/register', view_func=register, methods=['GET', 'POST'])
+    app.add_url_rule('/logout', view_func=logout)
+    app.add_url_rule('/leaderboard/<game_type>', view_func=leaderboard)
+    app.add_url_rule('/leaderboard/<game_type>.json', view_func=leaderboard_json)
+    app.add_url_rule('/pong/rooms', view_func=pong_rooms)
+    app.add_url_rule('/stats', view_func=stats)
+    app.add_url_rule('/metrics', view_func=metrics_endpoint)
+    app.add_url_rule('/static/<path:filename>', view_func=serve_static)
+    app.cli.add_command(init_db_command)
+
+    # Rooms and events can arrive from other workers at any time
+    if games.shared:
+        start_tick_scheduler()
+        games.start(socketio.start_background_task, dispatch_worker_message)
+
+    # The shared handlers; each game's are counted as its module loads
+    metrics.instrument_socketio(socketio.server)
+    return app
+
+def load_game(game_type):
+    # Importing a game's module registers its handlers with socketio
+    module = loaded_games.get(game_type)
+    if module is None:
+        module = loaded_games[game_type] = importlib.import_module(GAME_MODULES[game_type])
+        metrics.instrument_socketio(socketio.server)
+    return module
+
+@socketio.on('*')
+def handle_unloaded_event(event, *args):
+    # Only events without a handler get here: a game's first event on this
+    # worker loads the game, then goes to the handler it registered
+    game_type = next((game_type for game_type in GAME_MODULES if game_type in event.split('_')), None)
+    if game_type is None or game_type in loaded_games:
+        return
+    load_game(game_type)
+    handler = socketio.server.handlers['/'].get(event)
+    if handler is not None:
+        return handler(request.sid, *args)
+
+def delta_keyframes(eio_sid):
+    # Sent to a slow reader in place of the snake and tetris deltas it fell
+    # behind on: the full state of its rooms that this worker holds. For a
+    # room held elsewhere the client sees the seq gap and asks for one.
+    sid = socketio.server.manager.sid_from_eio_sid(eio_sid, '/')
+    frames = []
+    for room in socketio.server.rooms(sid) if sid else ():
+        for game_type in RESYNC_GAMES:
+            game = games[game_type].peek(room)
+            if game is not None and sid in games[game_type].members.get(room, ()):
+                frames.append(('game_keyframe', {'game': game_type, 'gameState': game.to_wire()}))
+    return frames
+
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
-
-# Create database tables
-with app.app_context():
-    db.create_all()
-
-# Game states
-games = {
-    'snake': {},
-    'tetris': {},
-    'pong': {},
-    'tictactoe': {}
-}
+    return user_cache.get(int(user_id))
+
+def socket_user(sid=None):
+    """The user a socket connected as (this one by default), or None if anonymous."""
+    if sid is None:
+        return request.environ.get(SOCKET_USER)
+    environ = socketio.server.get_environ(sid)
+    return environ.get(SOCKET_USER) if environ else None
+
+def close_game_room(game_type, room, reason):
+    # The room's state is gone; take its sockets out of the Socket.IO rooms too
+    socketio.close_room(room)
+    for wire in WIRE_FORMATS:
+        socketio.close_room(stream_room(room, wire))
+        socketio.close_room(spectator_room(room, wire))
+
+def evict_over_limit(game_type, room):
+    # A new room pushed this one past ROOM_LIMIT; close it on its own shard,
+    # not on the shard that is adding the new room
+    shards.submit(game_type, room, evict_if_over_limit, game_type, room)
+
+def evict_if_over_limit(game_type, room):
+    # Other rooms may have closed, or this one seen input, since it was picked
+    if room in games[game_type].over_limit():
+        games.evict(game_type, room, 'limit')
+
+def carry_request_context(fn):
+    # Queued room events still need request.sid and friends on the shard's greenlet
+    return copy_current_request_context(fn) if has_request_context() else fn
+
+def routed(game_type=None):
+    # Run the handler on the worker that owns the room; forward it there otherwise.
+    # Without a game_type the handler's data names it under 'game'.
+    def decorator(handler):
+        def handle(data, room_type):
+            result = handler(data)
+            # Player input keeps the room alive (see reap_rooms)
+            if room_type in games:
+                games[room_type].touch(data['room'])
+            return result
+
+        def run(data):
+            # On the room's shard, after anything already queued for it
+            room_type = game_type or data.get('game')
+            if room_type not in games:
+                return handle(data, room_type)
+            return shards.call(room_type, data['room'], handle, data, room_type)
+        room_handlers[handler.__name__] = run
+
+        def forward(owner, data, room_type):
+            games.forward(owner, {
+                'kind': 'event',
+                'game': room_type,
+                'handler': handler.__name__,
+                'data': data,
+                'sid': request.sid,
+                'user_id': getattr(socket_user(), 'id', None)
+            })
+
+        @wraps(handler)
+        def wrapper(data):
+            room_type = game_type or data.get('game')
+            owner = games.owner_of(room_type, data['room']) if room_type in games else None
+            if owner is not None:
+                forward(owner, data, room_type)
+                return
+            try:
+                return run(data)
+            except RoomOwnedElsewhere as claimed:
+                # Another worker created the room at the same moment and won it
+                if claimed.owner is not None:
+                    forward(claimed.owner, data, room_type)
+        return wrapper
+    return decorator
+
+def scores_written(game_types):
+    for game_type in game_types:
+        leaderboard_pages.invalidate(game_type)
+    # Other workers cache pages of the same database
+    games.publish_all({'kind': 'scores_written', 'game_types': sorted(game_types)})
+
+# Schema setup is a deploy step (flask --app server init-db), so building
+# the app, as every worker and script does, never touches the database
+def init_db():
+    with app.app_context():
+        db.create_all()
+        # create_all only builds indexes along with new tables
+        score_leaderboard_index.create(db.engine, checkfirst=True)
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the database tables and indexes."""
+    init_db()
 
-# Tetris piece definitions
-TETRIS_PIECES = [
-    [[1, 1, 1, 1]],  # I
-    [[1, 1], [1, 1]],  # O
-    [[1, 1, 1], [0, 1, 0]],  # T
-    [[1, 1, 1], [1, 0, 0]],  # L
-    [[1, 1, 1], [0, 0, 1]],  # J
-    [[1, 1, 0], [0, 1, 1]],  # S
-    [[0, 1, 1], [1, 1, 0]]   # Z
-]
-
-@app.route('/')
 def index():
     if not current_user.is_authenticated:
         return redirect(url_for('login'))
-    return render_template('index.html')
+    # The page is small and the assets it links are cached, so a repeat
+    # visit is a 304 unless the page itself changed
+    response = make_response(render_template('index.html'))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
 
-@app.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -61,16 +421,34 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        user = User.query.filter_by(username=username).first()
+        if not (ip_limiter.hit(request.remote_addr) and username_limiter.hit(username)):
+            refused_logins.inc(('rate_limited',))
+            return render_template('login.html', error='Too many attempts, please wait a minute and try again'), 429
+        user = User.find_by_username(username)
         
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and passwords.verify(user.password_hash, password)
+        except HasherBusy:
+            refused_logins.inc(('busy',))
+            return render_template('login.html', error='The server is busy, please try again'), 503
+        if valid:
+            if app.config['PASSWORD_REHASH'] and passwords.needs_rehash(user.password_hash):
+                rehash_password(user, password)
             login_user(user)
             return redirect(url_for('index'))
-        flash('Invalid username or password')
+        return render_template('login.html', error='Invalid username or password')
     
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+def rehash_password(user, password):
+    # Best effort: the old hash still works if this is skipped
+    try:
+        user.password_hash = passwords.hash(password)
+    except HasherBusy:
+        return
+    db.session.commit()
+    user_cache.invalidate(user.id)
+
 def register():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -78,13 +456,22 @@ def register():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        if not ip_limiter.hit(request.remote_addr):
+            refused_logins.inc(('rate_limited',))
+            flash('Too many attempts, please wait a minute and try again')
+            return render_template('register.html'), 429
         
         if User.query.filter_by(username=username).first():
             flash('Username already exists')
             return redirect(url_for('register'))
         
         user = User(username=username)
-        user.set_password(password)
+        try:
+            user.password_hash = passwords.hash(password)
+        except HasherBusy:
+            refused_logins.inc(('busy',))
+            flash('The server is busy, please try again')
+            return render_template('register.html'), 503
         db.session.add(user)
         db.session.commit()
         
@@ -93,567 +480,355 @@ def register():
     
     return render_template('register.html')
 
-@app.route('/logout')
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     return redirect(url_for('login'))
 
-@app.route('/leaderboard/<game_type>')
 def leaderboard(game_type):
-    scores = Score.get_leaderboard(game_type)
-    return render_template('leaderboard.html', scores=scores, game_type=game_type)
+    after = leaderboard_cursor(game_type)
+    return leaderboard_pages.get(
+        (game_type, 'html', after),
+        lambda: render_template('leaderboard.html', game_type=game_type, **leaderboard_page(game_type, after))
+    )
 
-@app.route('/static/<path:filename>')
-def serve_static(filename):
-    return send_from_directory('static', filename)
+def leaderboard_json(game_type):
+    after = leaderboard_cursor(game_type)
+    body = leaderboard_pages.get((game_type, 'json', after), lambda: app.json.dumps(leaderboard_page_wire(game_type, after)))
+    return Response(body, mimetype='application/json')
+
+def leaderboard_cursor(game_type):
+    # Unknown game types and malformed cursors would each cost a query and a
+    # cache entry, so they are refused up front
+    if game_type not in games:
+        abort(404)
+    after = request.args.get('after')
+    if after is None:
+        return None
+    # score:id of the last row of the previous page
+    try:
+        score, score_id = after.split(':')
+        score = int(score) if score.lstrip('-').isdigit() else float(score)
+        score_id = int(score_id)
+    except ValueError:
+        abort(400)
+    if not math.isfinite(score) or score_id < 1:
+        abort(400)
+    return score, score_id
+
+def leaderboard_page(game_type, after):
+    size = app.config['LEADERBOARD_PAGE_SIZE']
+    # Ranks come from the database, not the cursor, so a made-up cursor can
+    # only pick where the page starts
+    rank = Score.count_through(game_type, after) if after else 0
+    # One row more than the page shows, to know whether another page follows
+    rows = Score.get_leaderboard_page(game_type, limit=size + 1, after=after)
+    scores = rows[:size]
+    next_after = f'{scores[-1].score}:{scores[-1].id}' if len(rows) > size else None
+    return {'scores': scores, 'first_rank': rank + 1, 'next_after': next_after}
+
+def leaderboard_page_wire(game_type, after):
+    page = leaderboard_page(game_type, after)
+    return {
+        'game_type': game_type,
+        'scores': [{'rank': page['first_rank'] + index, 'username': row.username, 'score': row.score,
+                    'date': row.date.isoformat()}
+                   for index, row in enumerate(page['scores'])],
+        'next': url_for('leaderboard_json', game_type=game_type, after=page['next_after'])
+                if page['next_after'] else None
+    }
 
-# Snake Game Logic
-@socketio.on('join_snake')
-def handle_snake_join(data):
-    room = data['room']
-    join_room(room)
-    if room not in games['snake']:
-        games['snake'][room] = {
-            'snake': [[20, 15]],  # Center of 40x30 grid
-            'food': {'x': random.randint(0, 39), 'y': random.randint(0, 29)},
-            'score': 0,
-            'direction': 'RIGHT',
-            'last_direction': 'RIGHT',  # Track the last processed direction
-            'game_over': False
-        }
-    emit('game_joined', {
-        'game': 'snake',
-        'gameState': games['snake'][room]
+def pong_rooms():
+    # Matches that can be watched, on any worker, most recently active first.
+    # Other workers' rooms are as of their last checkpoint (see rooms.py).
+    limit = app.config['PONG_SPECTATOR_LIMIT']
+    listed = []
+    for room, game, spectators, _ in sorted(games.listing('pong'), key=lambda entry: entry[3], reverse=True):
+        if len(listed) >= app.config['PONG_ROOM_LIST_SIZE']:
+            break
+        if game.seated() < 2 or game.winner is not None:
+            continue
+        listed.append({
+            'room': room,
+            'scores': game.scores_wire(),
+            'in_progress': game.in_progress,
+            'spectators': spectators,
+            'full': spectators >= limit
+        })
+    return jsonify({'rooms': listed})
+
+def stats():
+    return jsonify({
+        'score_writer': score_writer.stats(),
+        'rooms': games.stats(),
+        'shards': shards.stats(),
+        'outbound': outbound.stats(),
+        'user_cache': user_cache.stats(),
+        'leaderboard_pages': leaderboard_pages.stats()
     })
 
-@socketio.on('snake_direction')
-def handle_snake_direction(data):
-    room = data['room']
-    direction = data['direction']
-    game = games['snake'].get(room)
-    
-    if game and not game['game_over']:
-        # Prevent 180-degree turns
-        opposite_directions = {
-            'UP': 'DOWN',
-            'DOWN': 'UP',
-            'LEFT': 'RIGHT',
-            'RIGHT': 'LEFT'
-        }
-        
-        # Only change direction if it's not opposite to the current direction
-        if direction != opposite_directions[game['direction']]:
-            game['direction'] = direction
-
-@socketio.on('snake_move')
-def handle_snake_move(data):
-    room = data['room']
-    game = games['snake'].get(room)
-    
-    if not game or game['game_over']:
-        return
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
-    # Get the head position
-    head = game['snake'][0].copy()
-    
-    # Update head position based on direction
-    if game['direction'] == 'UP':
-        head[1] -= 1
-    elif game['direction'] == 'DOWN':
-        head[1] += 1
-    elif game['direction'] == 'LEFT':
-        head[0] -= 1
-    elif game['direction'] == 'RIGHT':
-        head[0] += 1
-    
-    # Store last processed direction
-    game['last_direction'] = game['direction']
-
-    # Updated wall collision for 40x30 grid
-    if head[0] < 0 or head[0] >= 40 or head[1] < 0 or head[1] >= 30:
-        game['game_over'] = True
-    # Check for self-collision
-    elif head in game['snake'][:-1]:
-        game['game_over'] = True
-    else:
-        # Move snake
-        game['snake'].insert(0, head)
-        
-        # Check if food is eaten
-        if head[0] == game['food']['x'] and head[1] == game['food']['y']:
-            game['score'] += 1
-            # Generate new food position
-            while True:
-                new_food = {
-                    'x': random.randint(0, 39),
-                    'y': random.randint(0, 29)
-                }
-                if [new_food['x'], new_food['y']] not in game['snake']:
-                    game['food'] = new_food
-                    break
-        else:
-            game['snake'].pop()
-
-    # Send updated game state
-    emit('game_update', {
-        'snake': game['snake'],
-        'food': game['food'],
-        'score': game['score'],
-        'game_over': game['game_over']
-    }, room=room)
-
-@socketio.on('restart_snake')
-def handle_restart_snake(data):
-    room = data['room']
-    # Reset the snake game state
-    games['snake'][room] = {
-        'snake': [[20, 15]],  # Center of 40x30 grid
-        'food': {'x': random.randint(0, 39), 'y': random.randint(0, 29)},
-        'score': 0,
-        'direction': 'RIGHT',
-        'last_direction': 'RIGHT',
-        'game_over': False
-    }
-    # Send the reset game state
-    emit('game_joined', {
-        'game': 'snake',
-        'gameState': games['snake'][room]
-    })
+def serve_static(filename):
+    return assets.response(filename, request)
+
+# --- Scores ---
+def add_player(game):
+    # Joining a finished game only watches it; its score stays with those who played
+    user = socket_user()
+    if user is not None and not game.game_over and user.id not in game.player_ids:
+        game.player_ids += (user.id,)
+
+def game_finished(game_type, game):
+    if config.REPLAY_DIR:
+        try:
+            save_recording(config.REPLAY_DIR, game_type, game)
+        except OSError:
+            app.logger.exception('Could not save a %s recording', game_type)
 
 @socketio.on('update_score')
 def handle_score_update(data):
-    if not current_user.is_authenticated:
-        return
-    
     game_type = data['game_type']
-    score = data['score']
-    
-    new_score = Score(
-        user_id=current_user.id,
-        game_type=game_type,
-        score=score
-    )
-    db.session.add(new_score)
-    db.session.commit()
-    
-    # Emit updated leaderboard
-    scores = Score.get_leaderboard(game_type)
-    emit('leaderboard_update', {
-        'scores': [{'username': score.user.username, 'score': score.score} 
-                  for score in scores]
-    }, broadcast=True)
-
-@socketio.on('join_tetris')
-def handle_join_tetris(data):
-    room = data['room']
-    join_room(room)
-    # Only initialize if not already present
-    if room not in games['tetris']:
-        games['tetris'][room] = {
-            'board': [[0 for _ in range(10)] for _ in range(20)],  # 10x20 grid
-            'current_piece': generate_tetris_piece(),
-            'piece_position': [0, 3],  # row, col
-            'next_piece': generate_tetris_piece(),
-            'score': 0,
-            'level': 1,
-            'game_over': False
-        }
-    # Notify client game started
-    emit('game_joined', {
-        'game': 'tetris',
-        'gameState': games['tetris'][room]
-    })
+    if game_type not in REPLAYS:
+        # Pong and tic-tac-toe results are recorded by the server as a match ends
+        if game_type in games:
+            rejected_scores.inc((game_type, 'server_scored'))
+        return
+    # The room knows the score; the client's is only checked against it
+    if data.get('room') is None:
+        rejected_scores.inc((game_type, 'no_room'))
+        return
+    if type(data.get('score')) is not int:
+        rejected_scores.inc((game_type, 'bad_score'))
+        return
+    handle_replayed_score({'game': game_type, 'room': data['room'], 'score': data['score']})
 
-@socketio.on('tetris_move')
-def handle_tetris_move(data):
+@routed()
+def handle_replayed_score(data):
+    game_type = data['game']
     room = data['room']
-    move = data['move']
-    game = games['tetris'].get(room)
-    
-    if not game or game['game_over']:
+    user = socket_user()
+    game = games[game_type].get(room)
+    if user is None or game is None:
         return
-    
-    board = game['board']
-    current_piece = game['current_piece']
-    position = list(game['piece_position'])  # Create a copy to modify
-
-    def valid_position(piece, pos):
-        for row in range(len(piece)):
-            for col in range(len(piece[0])):
-                if piece[row][col]:
-                    new_row = pos[0] + row
-                    new_col = pos[1] + col
-                    if (new_row < 0 or new_row >= len(board) or
-                        new_col < 0 or new_col >= len(board[0]) or
-                        board[new_row][new_col]):
-                        return False
-        return True
-
-    placed = False
-    if move == 'left':
-        new_pos = [position[0], position[1] - 1]
-        if valid_position(current_piece, new_pos):
-            position = new_pos
-    elif move == 'right':
-        new_pos = [position[0], position[1] + 1]
-        if valid_position(current_piece, new_pos):
-            position = new_pos
-    elif move == 'rotate':
-        rotated = [list(row) for row in zip(*current_piece[::-1])]
-        if valid_position(rotated, position):
-            current_piece = rotated
-            game['current_piece'] = rotated
-    elif move == 'down':
-        new_pos = [position[0] + 1, position[1]]
-        if valid_position(current_piece, new_pos):
-            position = new_pos
-        else:
-            place_piece(game)
-            completed_lines = check_completed_lines(game)
-            if completed_lines > 0:
-                scores = [100, 300, 500, 800]
-                game['score'] += scores[completed_lines - 1] * game['level']
-                game['level'] = 1 + game['score'] // 1000
-            game['current_piece'] = game['next_piece']
-            game['next_piece'] = generate_tetris_piece()
-            game['piece_position'] = [0, 3]
-            # Check for game over
-            if not valid_position(game['current_piece'], game['piece_position']):
-                game['game_over'] = True
-            placed = True
-    # Update position if not placed and not game over
-    if not game['game_over'] and not placed:
-        game['piece_position'] = position
-    # Always emit game update after move
-    emit('game_update', {
-        'board': board,
-        'current_piece': game['current_piece'],
-        'piece_position': game['piece_position'],
-        'score': game['score'],
-        'game_over': game['game_over']
-    }, to=room)
-
-@socketio.on('restart_tetris')
-def handle_restart_tetris(data):
-    room = data['room']
-    games['tetris'][room] = {
-        'board': [[0 for _ in range(10)] for _ in range(20)],
-        'current_piece': generate_tetris_piece(),
-        'piece_position': [0, 3],
-        'next_piece': generate_tetris_piece(),
-        'score': 0,
-        'level': 1,
-        'game_over': False
-    }
-    emit('game_joined', {
-        'game': 'tetris',
-        'gameState': games['tetris'][room]
+    if user.id not in game.player_ids or request.sid not in games[game_type].members.get(room, {}):
+        rejected_scores.inc((game_type, 'not_player'))
+        return
+    if not game.game_over:
+        rejected_scores.inc((game_type, 'not_over'))
+        return
+    if user.id in game.scored:
+        rejected_scores.inc((game_type, 'duplicate'))
+        return
+    # A room whose inputs do not play back to its score cannot be trusted
+    replayed = replay(game_type, game.seed, game.inputs, game.ticks)
+    if replayed.score != game.score:
+        app.logger.error('%s room %s replays to %s points, not %s', game_type, room, replayed.score, game.score)
+        rejected_scores.inc((game_type, 'replay_mismatch'))
+        return
+    if data['score'] != game.score:
+        rejected_scores.inc((game_type, 'wrong_score'))
+        return
+    game.scored += (user.id,)
+    record_score(user, game_type, game.score)
+
+def record_score(user, game_type, score):
+    date = datetime.utcnow()
+    score_writer.put(user.id, game_type, score, date)
+    share_score(game_type, user.username, score, date)
+
+    # Emit updated leaderboard, only if the new score made the top N
+    if leaderboards.record(game_type, user.username, score, date):
+        socketio.emit('leaderboard_update', leaderboards.to_wire(game_type))
+
+def share_score(game_type, username, score, date):
+    # Keep other workers' leaderboard caches in step
+    games.publish_all({
+        'kind': 'score',
+        'game_type': game_type,
+        'username': username,
+        'score': score,
+        'date': date
     })
 
-def generate_tetris_piece():
-    # Define all tetris pieces
-    pieces = [
-        # I piece
-        [[1, 1, 1, 1]],
-        # O piece
-        [[1, 1], [1, 1]],
-        # T piece
-        [[0, 1, 0], [1, 1, 1]],
-        # S piece
-        [[0, 1, 1], [1, 1, 0]],
-        # Z piece
-        [[1, 1, 0], [0, 1, 1]],
-        # J piece
-        [[1, 0, 0], [1, 1, 1]],
-        # L piece
-        [[0, 0, 1], [1, 1, 1]]
-    ]
-    return random.choice(pieces)
-
-def place_piece(game):
-    board = game['board']
-    piece = game['current_piece']
-    position = game['piece_position']
-    
-    for row in range(len(piece)):
-        for col in range(len(piece[0])):
-            if piece[row][col]:
-                if 0 <= position[0] + row < len(board) and 0 <= position[1] + col < len(board[0]):
-                    board[position[0] + row][position[1] + col] = 1
-
-def check_completed_lines(game):
-    board = game['board']
-    completed_lines = 0
-    rows_to_remove = []
-    
-    # Check each row
-    for i, row in enumerate(board):
-        if all(cell for cell in row):
-            rows_to_remove.append(i)
-            completed_lines += 1
-    
-    # Remove completed lines
-    for row_idx in sorted(rows_to_remove, reverse=True):
-        board.pop(row_idx)
-        board.insert(0, [0 for _ in range(10)])
-    
-    return completed_lines
-
-def is_collision(game):
-    board = game['board']
-    piece = game['current_piece']
-    position = game['piece_position']
-    
-    for row in range(len(piece)):
-        for col in range(len(piece[0])):
-            if piece[row][col]:
-                if (position[0] + row >= len(board) or
-                    position[1] + col < 0 or
-                    position[1] + col >= len(board[0]) or
-                    board[position[0] + row][position[1] + col]):
-                    return True
-    return False
-
-# Pong Game Logic
-@socketio.on('join_pong')
-def handle_pong_join(data):
+@socketio.on('resync')
+@routed()
+def handle_resync(data):
     room = data['room']
-    join_room(room)
-    
-    # Initialize game state if it doesn't exist
-    if room not in games['pong']:
-        games['pong'][room] = {
-            'players': [],
-            'ball': {
-                'x': 400,  # Center of the canvas
-                'y': 300,
-                'dx': 5,   # Initial ball direction and speed
-                'dy': 5,
-                'radius': 10
-            },
-            'paddles': {
-                'left': {'y': 250, 'height': 100},   # Left paddle
-                'right': {'y': 250, 'height': 100}   # Right paddle
-            },
-            'scores': {'left': 0, 'right': 0},
-            'ready': 0,    # Number of players ready
-            'in_progress': False
-        }
-        
-    # Add player to the game
-    player_id = request.sid
-    player_num = len(games['pong'][room]['players'])
-    
-    # Only allow 2 players max
-    if player_num < 2:
-        games['pong'][room]['players'].append(player_id)
-        player_side = 'left' if player_num == 0 else 'right'
-        
-        emit('pong_joined', {
-            'side': player_side,
-            'gameState': games['pong'][room]
-        })
-        
-        # If two players have joined, start the game
-        if len(games['pong'][room]['players']) == 2:
-            emit('pong_ready', room=room)
-    else:
-        # Allow spectators
-        emit('pong_spectate', {'gameState': games['pong'][room]})
-
-@socketio.on('pong_player_ready')
-def handle_pong_ready(data):
-    room = data['room']
-    game = games['pong'].get(room)
-    
+    game_type = data['game']
+    if game_type not in RESYNC_GAMES:
+        return
+    game = games[game_type].get(room)
     if game:
-        game['ready'] += 1
-        if game['ready'] == 2:
-            game['in_progress'] = True
-            emit('pong_game_start', room=room)
+        emit('game_keyframe', {
+            'game': game_type,
+            'gameState': game.to_wire()
+        })
 
-@socketio.on('pong_paddle_move')
-def handle_pong_paddle_move(data):
-    room = data['room']
-    side = data['side']  # 'left' or 'right'
-    position = data['position']
-    game = games['pong'].get(room)
-    
-    if game and game['in_progress']:
-        game['paddles'][side]['y'] = position
-        
-        # Broadcast paddle position to other player
-        emit('pong_paddle_update', {
-            'side': side,
-            'position': position
-        }, room=room)
-
-@socketio.on('pong_update')
-def handle_pong_update(data):
+# --- Room membership and frames ---
+def wire_format(data):
+    # High-frequency frames go out per wire format; the client picks one on join
+    wire = data.get('wire')
+    return wire if wire in WIRE_FORMATS else 'json'
+
+def add_room_member(game_type, room, data):
+    wire = wire_format(data)
+    join_room(stream_room(room, wire))
+    games[game_type].add_member(room, request.sid, wire)
+
+def emit_frame(game_type, room, event, payload, spectators=False):
+    # Encode once per format in use. Members are unknown after a room moved
+    # to this worker, so then send every format. With `spectators` the same
+    # emit reaches the room's spectators too, so Socket.IO builds the packet
+    # once for players and spectators alike.
+    game_rooms = games[game_type]
+    formats = game_rooms.wire_formats(room) or set(WIRE_FORMATS)
+    watching = game_rooms.spectator_formats(room) if spectators else set()
+    for wire in formats | watching:
+        if wire == 'binary':
+            frame = ENCODERS[game_type, event](payload)
+            # Attachments are not part of the JSON that metrics count
+            metrics.emitted_bytes.inc((event,), len(frame))
+        else:
+            frame = payload
+        to = []
+        if wire in formats:
+            to.append(stream_room(room, wire))
+        if wire in watching:
+            to.append(spectator_room(room, wire))
+        socketio.emit(event, frame, to=to)
+
+# --- Room lifecycle ---
+@socketio.on('connect')
+def handle_connect(auth=None):
+    # Look the user up once per socket; handlers read it with socket_user()
+    request.environ[SOCKET_USER] = current_user._get_current_object() if current_user.is_authenticated else None
+
+@socketio.on('disconnect')
+def handle_disconnect(reason=None):
+    for room in rooms():
+        if room == request.sid:
+            continue
+        for game_type in games:
+            handle_player_left({'game': game_type, 'room': room})
+
+@routed()
+def handle_player_left(data):
+    game_type = data['game']
     room = data['room']
-    game = games['pong'].get(room)
-    
-    if not game or not game['in_progress']:
+    game = games[game_type].get(room)
+    if game is None:
         return
-    
-    # Update ball position
-    ball = game['ball']
-    ball['x'] += ball['dx']
-    ball['y'] += ball['dy']
-    
-    # Handle collisions with top and bottom walls
-    if ball['y'] - ball['radius'] <= 0 or ball['y'] + ball['radius'] >= 600:
-        ball['dy'] = -ball['dy']
-    
-    # Handle collisions with paddles
-    left_paddle = game['paddles']['left']
-    right_paddle = game['paddles']['right']
-    
-    # Left paddle collision
-    if (ball['x'] - ball['radius'] <= 20 and  # Paddle width is 20px
-        ball['y'] >= left_paddle['y'] and 
-        ball['y'] <= left_paddle['y'] + left_paddle['height']):
-        ball['dx'] = -ball['dx']
-        # Adjust angle based on where the ball hits the paddle
-        ball['dy'] += (ball['y'] - (left_paddle['y'] + left_paddle['height'] / 2)) * 0.1
-    
-    # Right paddle collision
-    if (ball['x'] + ball['radius'] >= 780 and  # Canvas width (800) - paddle width
-        ball['y'] >= right_paddle['y'] and 
-        ball['y'] <= right_paddle['y'] + right_paddle['height']):
-        ball['dx'] = -ball['dx']
-        # Adjust angle based on where the ball hits the paddle
-        ball['dy'] += (ball['y'] - (right_paddle['y'] + right_paddle['height'] / 2)) * 0.1
-    
-    # Check for scoring
-    if ball['x'] - ball['radius'] <= 0:
-        # Right player scores
-        game['scores']['right'] += 1
-        reset_ball(ball)
-    elif ball['x'] + ball['radius'] >= 800:
-        # Left player scores
-        game['scores']['left'] += 1
-        reset_ball(ball)
-    
-    # Send updated game state
-    emit('pong_game_update', {
-        'ball': ball,
-        'scores': game['scores']
-    }, room=room)
-
-def reset_ball(ball):
-    # Reset ball to center with random direction
-    ball['x'] = 400
-    ball['y'] = 300
-    ball['dx'] = 5 if random.random() > 0.5 else -5
-    ball['dy'] = 5 if random.random() > 0.5 else -5
-
-# --- Tic Tac Toe Game Logic ---
-@socketio.on('join_tictactoe')
-def handle_tictactoe_join(data):
-    room = data['room']
-    join_room(room)
-    if room not in games['tictactoe']:
-        games['tictactoe'][room] = {
-            'board': [[None for _ in range(3)] for _ in range(3)],
-            'players': [],
-            'turn': 0,  # 0 for X, 1 for O
-            'winner': None,
-            'draw': False
-        }
-    player_id = request.sid
-    if player_id not in games['tictactoe'][room]['players'] and len(games['tictactoe'][room]['players']) < 2:
-        games['tictactoe'][room]['players'].append(player_id)
-    # Send game state and playerIndex to all players in the room
-    for idx, pid in enumerate(games['tictactoe'][room]['players']):
-        emit('tictactoe_joined', {
-            'game': 'tictactoe',
-            'gameState': games['tictactoe'][room],
-            'playerIndex': idx
-        }, room=pid)
-    if len(games['tictactoe'][room]['players']) == 2:
-        emit('tictactoe_start', room=room)
-
-@socketio.on('tictactoe_move')
-def handle_tictactoe_move(data):
-    room = data['room']
-    row = data['row']
-    col = data['col']
-    player_id = request.sid
-    game = games['tictactoe'].get(room)
-    if not game or game['winner'] or game['draw']:
+    player_left = getattr(load_game(game_type), 'player_left', None)
+    if player_left is not None:
+        player_left(game, request.sid)
+    if games[game_type].remove_member(room, request.sid) == 0:
+        games.evict(game_type, room, 'empty')
+
+def reap_rooms():
+    now = time.monotonic()
+    pending = []
+    for game_type in games:
+        for room, last_active in list(games[game_type].last_active.items()):
+            if now - last_active >= min(app.config['ROOM_IDLE_TTL'], app.config['ROOM_FINISHED_TTL']):
+                pending.append(shards.submit(game_type, room, reap_room, game_type, room))
+    for result in pending:
+        result.get()
+
+def reap_room(game_type, room):
+    # On the room's shard: an event may have touched it since reap_rooms looked
+    game_rooms = games[game_type]
+    game = game_rooms.peek(room)
+    if game is None:
         return
-    player_index = game['players'].index(player_id) if player_id in game['players'] else -1
-    if player_index != game['turn']:
-        return  # Not this player's turn
-    if game['board'][row][col] is not None:
-        return  # Cell already taken
-    symbol = 'X' if game['turn'] == 0 else 'O'
-    game['board'][row][col] = symbol
-    # Check win/draw
-    winner = check_tictactoe_winner(game['board'])
-    if winner:
-        game['winner'] = winner
-    elif all(cell is not None for row_ in game['board'] for cell in row_):
-        game['draw'] = True
-    else:
-        game['turn'] = 1 - game['turn']
-    emit('tictactoe_update', {
-        'board': game['board'],
-        'turn': game['turn'],
-        'winner': game['winner'],
-        'draw': game['draw']
-    }, room=room)
-    # Leaderboard update if game ended
-    if game['winner'] or game['draw']:
-        for idx, pid in enumerate(game['players']):
-            if game['winner']:
-                score = 1 if (game['winner'] == ('X' if idx == 0 else 'O')) else 0
-            else:
-                score = 0.5  # Draw
-            if current_user.is_authenticated:
-                new_score = Score(user_id=current_user.id, game_type='tictactoe', score=score)
-                db.session.add(new_score)
-        db.session.commit()
-        scores = Score.get_leaderboard('tictactoe')
-        emit('leaderboard_update', {
-            'scores': [{'username': score.user.username, 'score': score.score} for score in scores]
-        }, broadcast=True)
-
-def check_tictactoe_winner(board):
-    # Rows, columns, diagonals
-    for i in range(3):
-        if board[i][0] and board[i][0] == board[i][1] == board[i][2]:
-            return board[i][0]
-        if board[0][i] and board[0][i] == board[1][i] == board[2][i]:
-            return board[0][i]
-    if board[0][0] and board[0][0] == board[1][1] == board[2][2]:
-        return board[0][0]
-    if board[0][2] and board[0][2] == board[1][1] == board[2][0]:
-        return board[0][2]
-    return None
-
-@socketio.on('restart_tictactoe')
-def handle_restart_tictactoe(data):
-    room = data['room']
-    if room in games['tictactoe']:
-        players = games['tictactoe'][room]['players']
-        games['tictactoe'][room] = {
-            'board': [[None for _ in range(3)] for _ in range(3)],
-            'players': players,
-            'turn': 0,
-            'winner': None,
-            'draw': False
-        }
-        # Send updated game state and playerIndex to all players
-        for idx, pid in enumerate(players):
-            emit('tictactoe_joined', {
-                'game': 'tictactoe',
-                'gameState': games['tictactoe'][room],
-                'playerIndex': idx
-            }, room=pid)
-
-if __name__ == '__main__':
-    socketio.run(app, debug=True)
-
+    idle = time.monotonic() - game_rooms.last_active[room]
+    if idle >= app.config['ROOM_IDLE_TTL']:
+        games.evict(game_type, room, 'idle')
+    elif idle >= app.config['ROOM_FINISHED_TTL'] and load_game(game_type).finished(game):
+        games.evict(game_type, room, 'finished')
+
+# --- Server-side tick scheduler ---
+def start_tick_scheduler():
+    # Started lazily by the first join so building the app stays side-effect free.
+    # It also runs the idle room reaper.
+    global tick_thread
+    with tick_thread_lock:
+        if tick_thread is None:
+            tick_thread = socketio.start_background_task(tick_scheduler)
+
+def tick_scheduler():
+    next_tick = dict.fromkeys(TICK_INTERVALS, time.monotonic())
+    next_reap = time.monotonic() + app.config['ROOM_REAP_INTERVAL']
+    while True:
+        now = time.monotonic()
+        for game_type, interval in TICK_INTERVALS.items():
+            if now >= next_tick[game_type]:
+                try:
+                    tick_rooms(game_type)
+                except Exception:
+                    app.logger.exception('%s tick sweep failed', game_type)
+                next_tick[game_type] += interval
+                # Fell behind: skip the missed ticks instead of bursting
+                if next_tick[game_type] <= now:
+                    next_tick[game_type] = now + interval
+        if now >= next_reap:
+            try:
+                reap_rooms()
+            except Exception:
+                app.logger.exception('Room reaper failed')
+            next_reap = now + app.config['ROOM_REAP_INTERVAL']
+        socketio.sleep(max(0, min(*next_tick.values(), next_reap) - time.monotonic()))
+
+def tick_rooms(game_type):
+    # Each shard ticks its own rooms; the sweep ends when every shard is done
+    start = time.perf_counter()
+    batches = {}
+    for room in list(games[game_type]):
+        batches.setdefault(shards.index(game_type, room), []).append(room)
+    pending = [shards.submit_to(index, tick_batch, game_type, batch) for index, batch in batches.items()]
+    for result in pending:
+        result.get()
+    metrics.tick_seconds.observe((game_type,), time.perf_counter() - start)
+
+def tick_batch(game_type, batch):
+    tick = load_game(game_type).tick
+    game_rooms = games[game_type]
+    for room in batch:
+        game = game_rooms.peek(room)
+        if game is None:
+            continue  # Closed since the sweep started
+        try:
+            update = tick(game)
+            if update is not None:
+                # (event, payload), or (event, payload, spectators)
+                emit_frame(game_type, room, *update)
+        except Exception:
+            app.logger.exception('%s tick failed for room %s', game_type, room)
+
+# --- Messages from other workers ---
+def dispatch_worker_message(message):
+    try:
+        if message['kind'] == 'score':
+            # The first score for a game type loads its board from the database
+            with app.app_context():
+                leaderboards.record(message['game_type'], message['username'], message['score'], message['date'])
+        elif message['kind'] == 'scores_written':
+            for game_type in message['game_types']:
+                leaderboard_pages.invalidate(game_type)
+        elif message['kind'] == 'event':
+            run_forwarded_event(message)
+    except Exception:
+        app.logger.exception('Failed to handle %s message from another worker', message.get('kind'))
+
+def run_forwarded_event(message):
+    # Replay a room event here, as if the socket were connected to this worker
+    if message['game'] in GAME_MODULES:
+        load_game(message['game'])
+    with app.test_request_context('/'):
+        request.sid = message['sid']
+        request.namespace = '/'
+        if message['user_id'] is not None:
+            request.environ[SOCKET_USER] = user_cache.get(message['user_id'])
+        room_handlers[message['handler']](message['data'])
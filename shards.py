@@ -0,0 +1,107 @@
+"""Room shards: each room's work runs one item at a time on its shard.
+
+Rooms are partitioned over a fixed number of shards by a stable hash of
+(game type, room). Each shard has its own queue, drained in order by one
+background greenlet, so everything that touches a room (its Socket.IO
+events, its ticks, its eviction) runs serially, in arrival order, without
+locks. A handler
+that yields halfway (an emit, a database write) holds up only its own
+shard; rooms on other shards carry on.
+
+A shard's work is never run by two greenlets at once. When the shard is
+idle and nothing is queued, the submitting greenlet runs the item itself
+rather than handing it over and waiting for a switch; otherwise the item
+waits in the queue for the shard's greenlet. Work submitted from whichever
+greenlet is running the shard's work runs inline, so a handler can reach
+other rooms on the same shard without waiting on itself. Queued work runs
+in another greenlet, so `carry` (if given) wraps it first to bring along
+whatever context the submitter had, such as a Flask request context.
+"""
+import sys
+import zlib
+
+from gevent import getcurrent
+from gevent.event import AsyncResult, Event
+from gevent.queue import Queue
+
+
+class Shard:
+    def __init__(self, start_background_task, maxsize, carry=None):
+        self._start_background_task = start_background_task
+        self._carry = carry
+        self._queue = Queue(maxsize)
+        self._owner = None  # The greenlet running this shard's work, if any
+        self._idle = Event()
+        self._idle.set()
+        self._task = None
+        self.handled = 0
+
+    def submit(self, fn, *args):
+        result = AsyncResult()
+        current = getcurrent()
+        if self._owner is current:
+            self._call(fn, args, result)
+        elif self._owner is None and self._queue.empty():
+            self._run_as(current, fn, args, result)
+        else:
+            if self._task is None:
+                self._task = self._start_background_task(self._run)
+            if self._carry is not None:
+                fn = self._carry(fn)
+            # Blocks (yielding) only when the shard is this far behind
+            self._queue.put((fn, args, result))
+        return result
+
+    def _run(self):
+        while True:
+            # Leave the item queued while waiting, so no one runs ahead of it
+            self._queue.peek()
+            self._idle.wait()
+            fn, args, result = self._queue.get()
+            self._run_as(getcurrent(), fn, args, result)
+
+    def _run_as(self, greenlet, fn, args, result):
+        self._owner = greenlet
+        self._idle.clear()
+        try:
+            self._call(fn, args, result)
+        finally:
+            self._owner = None
+            self._idle.set()
+
+    def _call(self, fn, args, result):
+        try:
+            result.set(fn(*args))
+        except Exception as exc:
+            # Raised again in whoever waits on the result
+            result.set_exception(exc, exc_info=sys.exc_info())
+        self.handled += 1
+
+    def queued(self):
+        return self._queue.qsize()
+
+
+class RoomShards:
+    def __init__(self, start_background_task, count=8, maxsize=1000, carry=None):
+        self._shards = [Shard(start_background_task, maxsize, carry) for _ in range(count)]
+
+    def __len__(self):
+        return len(self._shards)
+
+    def index(self, game_type, room):
+        # crc32 rather than hash(): the same in every process
+        return zlib.crc32(f'{game_type}:{room}'.encode()) % len(self._shards)
+
+    def submit(self, game_type, room, fn, *args):
+        """Queue fn(*args) on the room's shard; return an AsyncResult."""
+        return self._shards[self.index(game_type, room)].submit(fn, *args)
+
+    def submit_to(self, index, fn, *args):
+        return self._shards[index].submit(fn, *args)
+
+    def call(self, game_type, room, fn, *args):
+        """Run fn(*args) on the room's shard and wait for its result."""
+        return self.submit(game_type, room, fn, *args).get()
+
+    def stats(self):
+        return [{'queued': shard.queued(), 'handled': shard.handled} for shard in self._shards]
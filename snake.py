@@ -0,0 +1,174 @@
+"""Snake engine: room state and the per-tick step, independent of Socket.IO.
+
+Cells are packed as ``y * GRID_WIDTH + x``. The body is a deque of packed
+cells, head first. Board occupancy is kept in step with it as a bitmap of
+one bit per cell (150 bytes), so collision checks and moves are O(1)
+whatever the snake's length. Food goes on a random free cell: drawn until
+one is free while most of the board is, and counted out of the bitmap
+once the snake covers most of it.
+
+Food is placed by the room's own seeded generator and accepted turns are
+logged as inputs, so a game can be replayed from its seed (see replay.py).
+"""
+from collections import deque
+
+from recording import SeededRandom, new_seed, record
+
+GRID_WIDTH = 40
+GRID_HEIGHT = 30
+
+# Head offset per direction
+MOVES = {
+    'UP': (0, -1),
+    'DOWN': (0, 1),
+    'LEFT': (-1, 0),
+    'RIGHT': (1, 0)
+}
+
+OPPOSITE_DIRECTIONS = {
+    'UP': 'DOWN',
+    'DOWN': 'UP',
+    'LEFT': 'RIGHT',
+    'RIGHT': 'LEFT'
+}
+
+# Input codes in recorded games
+DIRECTIONS = ('UP', 'DOWN', 'LEFT', 'RIGHT')
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+CELLS = GRID_WIDTH * GRID_HEIGHT
+# Free cells among the 8 that each bitmap byte covers
+_FREE_BITS = bytes(8 - bin(byte).count('1') for byte in range(256))
+
+
+class SnakeRoom:
+    __slots__ = ('snake', 'occupied', 'food', 'score', 'direction',
+                 'last_direction', 'game_over', 'seq', 'seed', 'rng', 'ticks', 'inputs',
+                 'player_ids', 'scored')
+
+    def __init__(self, body=((20, 15),), direction='RIGHT', seed=None):
+        self.snake = deque()  # Packed cells, head first
+        self.occupied = bytearray(CELLS // 8)  # Bit `cell` is set while the snake covers it
+        self.food = None  # Packed cell
+        self.score = 0
+        self.direction = direction
+        self.last_direction = direction  # Track the last processed direction
+        self.game_over = False
+        self.seq = 0  # Sequence number of the last update sent to the room
+        self.seed = new_seed() if seed is None else seed
+        self.rng = SeededRandom(self.seed)
+        self.ticks = 0  # Steps run so far
+        self.inputs = bytearray()  # Accepted turns (see recording.py)
+        self.player_ids = ()  # Users who joined while the game was on; only they may score it
+        self.scored = ()  # Users whose score for this game was recorded
+        for x, y in body:
+            cell = y * GRID_WIDTH + x
+            self.snake.append(cell)
+            _occupy(self, cell)
+        spawn_food(self)
+
+    def to_wire(self):
+        return {
+            'snake': [(cell % GRID_WIDTH, cell // GRID_WIDTH) for cell in self.snake],
+            'food': food_wire(self.food),
+            'score': self.score,
+            'direction': self.direction,
+            'game_over': self.game_over,
+            'seq': self.seq
+        }
+
+
+def is_occupied(game, cell):
+    return game.occupied[cell >> 3] >> (cell & 7) & 1
+
+
+def _occupy(game, cell):
+    game.occupied[cell >> 3] |= 1 << (cell & 7)
+
+
+def _release(game, cell):
+    game.occupied[cell >> 3] &= ~(1 << (cell & 7))
+
+
+def spawn_food(game):
+    free = CELLS - len(game.snake)
+    if not free:
+        game.food = None  # The snake fills the board
+        return
+    rng = game.rng
+    if free * 4 > CELLS:
+        # Under 4 draws on average
+        while True:
+            cell = rng.randbelow(CELLS)
+            if not is_occupied(game, cell):
+                game.food = cell
+                return
+    # A dense board: count out the n-th free cell, skipping whole bytes
+    n = rng.randbelow(free)
+    for index, byte in enumerate(game.occupied):
+        if n >= _FREE_BITS[byte]:
+            n -= _FREE_BITS[byte]
+            continue
+        for bit in range(8):
+            if not byte >> bit & 1:
+                if not n:
+                    game.food = index * 8 + bit
+                    return
+                n -= 1
+
+
+def food_wire(food):
+    return None if food is None else {'x': food % GRID_WIDTH, 'y': food // GRID_WIDTH}
+
+
+def turn(game, direction):
+    """Turn the snake for its next step; reversing onto itself is ignored."""
+    if direction not in OPPOSITE_DIRECTIONS:
+        return False
+    if direction == game.direction or direction == OPPOSITE_DIRECTIONS[game.direction]:
+        return False
+    game.direction = direction
+    record(game, DIRECTION_CODES[direction])
+    return True
+
+
+def advance_snake(game):
+    """Advance the snake one step and return what changed as a delta."""
+    game.ticks += 1
+    dx, dy = MOVES[game.direction]
+    snake = game.snake
+    head = snake[0]
+    x = head % GRID_WIDTH + dx
+    y = head // GRID_WIDTH + dy
+
+    # Store last processed direction
+    game.last_direction = game.direction
+
+    # Wall collision
+    if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
+        game.game_over = True
+        return {'game_over': True}
+
+    cell = y * GRID_WIDTH + x
+    # Self-collision; the tail moves out of the way this tick, so it is allowed
+    if is_occupied(game, cell) and cell != snake[-1]:
+        game.game_over = True
+        return {'game_over': True}
+
+    delta = {'head': (x, y)}
+    if cell == game.food:
+        snake.appendleft(cell)
+        _occupy(game, cell)
+        game.score += 1
+        spawn_food(game)
+        delta['food'] = food_wire(game.food)
+        delta['score'] = game.score
+        if game.food is None:
+            game.game_over = True
+            delta['game_over'] = True
+    else:
+        _release(game, snake.pop())
+        snake.appendleft(cell)
+        _occupy(game, cell)
+        delta['drop_tail'] = True
+    return delta
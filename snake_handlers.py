@@ -0,0 +1,64 @@
+"""Snake's Socket.IO handlers and server tick, loaded by server.load_game."""
+from flask_socketio import emit, join_room
+
+from server import add_player, add_room_member, game_finished, games, routed, socketio, start_tick_scheduler
+from snake import SnakeRoom, advance_snake, turn
+
+
+@socketio.on('join_snake')
+@routed('snake')
+def handle_snake_join(data):
+    room = data['room']
+    join_room(room)
+    start_tick_scheduler()
+    if room not in games['snake']:
+        games['snake'][room] = SnakeRoom()
+    add_room_member('snake', room, data)
+    add_player(games['snake'][room])
+    emit('game_joined', {
+        'game': 'snake',
+        'gameState': games['snake'][room].to_wire()
+    })
+
+
+@socketio.on('snake_direction')
+@routed('snake')
+def handle_snake_direction(data):
+    room = data['room']
+    direction = data['direction']
+    game = games['snake'].get(room)
+
+    if game and not game.game_over:
+        # Ignored if it would reverse the snake onto itself
+        turn(game, direction)
+
+
+@socketio.on('restart_snake')
+@routed('snake')
+def handle_restart_snake(data):
+    room = data['room']
+    # Reset the snake game state; the room may have been reaped meanwhile
+    join_room(room)
+    games['snake'][room] = SnakeRoom()
+    add_room_member('snake', room, data)
+    add_player(games['snake'][room])
+    # Send the reset game state
+    emit('game_joined', {
+        'game': 'snake',
+        'gameState': games['snake'][room].to_wire()
+    })
+
+
+def tick(game):
+    if game.game_over:
+        return None
+    delta = advance_snake(game)
+    if game.game_over:
+        game_finished('snake', game)
+    game.seq += 1
+    delta['seq'] = game.seq
+    return 'game_update', delta
+
+
+def finished(game):
+    return game.game_over
@@ -0,0 +1,1045 @@
+const socket = io();
+// Pong snapshots arrive as compact binary frames (see wire.py). Snake,
+// tetris and tic-tac-toe frames are no smaller in binary, so they stay JSON.
+// Open the page with ?wire=json or ?wire=binary to use one format everywhere.
+const WIRE_OVERRIDE = new URLSearchParams(location.search).get('wire');
+const BINARY_GAMES = new Set(['pong']);
+function wireFormat(game) {
+    if (WIRE_OVERRIDE === 'json' || WIRE_OVERRIDE === 'binary') return WIRE_OVERRIDE;
+    return BINARY_GAMES.has(game) ? 'binary' : 'json';
+}
+let currentGame = null;
+let playerRoom = null;
+let vsComputer = false;
+let gameInterval = null;
+let lastDirection = '';
+
+const MARKS = [null, 'X', 'O'];
+
+// Turn a binary frame back into the object the JSON format would carry
+function decodeFrame(data) {
+    if (!(data instanceof ArrayBuffer)) {
+        return data;
+    }
+    const view = new DataView(data);
+    let offset = 0;
+    const u8 = () => view.getUint8(offset++);
+    const i8 = () => view.getInt8(offset++);
+    const u16 = () => { const value = view.getUint16(offset, true); offset += 2; return value; };
+    const u32 = () => { const value = view.getUint32(offset, true); offset += 4; return value; };
+    const f32 = () => { const value = view.getFloat32(offset, true); offset += 4; return value; };
+    const frame = {};
+    const layout = u8();
+    if (layout === 1 || layout === 2) {
+        const flags = u8();
+        frame.seq = u32();
+        if (layout === 1) {
+            if (flags & 1) frame.head = [u8(), u8()];
+            if (flags & 2) frame.drop_tail = true;
+            if (flags & 4) frame.food = { x: u8(), y: u8() };
+            if (flags & 8) frame.score = u16();
+            if (flags & 16) frame.game_over = true;
+        } else {
+            if (flags & 1) frame.piece_position = [i8(), i8()];
+            if (flags & 2) {
+                const height = u8(), width = u8(), cells = u16();
+                frame.current_piece = Array.from({ length: height }, (_, row) =>
+                    Array.from({ length: width }, (_, col) => (cells >> (row * width + col)) & 1));
+            }
+            if (flags & 4) frame.placed = Array.from({ length: u8() }, () => [u8(), u8()]);
+            if (flags & 8) frame.cleared_rows = Array.from({ length: u8() }, () => u8());
+            if (flags & 16) frame.score = u32();
+            if (flags & 32) frame.game_over = true;
+        }
+    } else if (layout === 3) {
+        frame.step = u32();
+        frame.ball = { x: f32(), y: f32(), dx: f32(), dy: f32(), radius: u8() };
+        frame.paddles = { left: f32(), right: f32() };
+        frame.scores = { left: u16(), right: u16() };
+        frame.winner = [null, 'left', 'right'][u8()];
+    } else if (layout === 4) {
+        const cells = Array.from({ length: 9 }, () => MARKS[u8()]);
+        frame.board = [cells.slice(0, 3), cells.slice(3, 6), cells.slice(6, 9)];
+        frame.turn = u8();
+        frame.winner = MARKS[u8()];
+        frame.draw = Boolean(u8());
+    }
+    return frame;
+}
+
+// Game selection page logic
+document.getElementById('single-player-btn').addEventListener('click', () => {
+    showGameSelection('single-player');
+});
+
+document.getElementById('multiplayer-btn').addEventListener('click', () => {
+    showGameSelection('multiplayer');
+});
+
+document.getElementById('back-btn').addEventListener('click', () => {
+    document.getElementById('game-selection').style.display = 'none';
+    document.getElementById('main-menu').style.display = 'flex';
+});
+
+// Add event listeners for game over buttons
+document.getElementById('restart-btn').addEventListener('click', () => {
+    if (currentGame === 'snake') {
+        restartSnakeGame();
+    } else if (currentGame === 'tetris') {
+        restartTetrisGame();
+    } else if (currentGame === 'pong') {
+        resetGame(); // For pong, just reset to menu
+    }
+});
+
+document.getElementById('menu-btn').addEventListener('click', returnToMainMenu);
+
+function returnToMainMenu() {
+    // Hide game over screen
+    document.getElementById('game-over').style.display = 'none';
+
+    // Hide game containers
+    document.getElementById('snake-container').style.display = 'none';
+    document.getElementById('tetris-container').style.display = 'none';
+    document.getElementById('pong-container').style.display = 'none';
+    document.getElementById('tictactoe-container').style.display = 'none';
+
+    // Hide leaderboard links
+    document.querySelector('.leaderboard-links').style.display = 'none';
+
+    // Show main menu
+    document.getElementById('main-menu').style.display = 'flex';
+
+    // Clear any existing intervals
+    if (gameInterval) {
+        clearInterval(gameInterval);
+        gameInterval = null;
+    }
+}
+
+function showGameSelection(category) {
+    const gamesContainer = document.getElementById('games-container');
+    const categoryHeader = document.getElementById('category-header');
+
+    // Clear previous games
+    gamesContainer.innerHTML = '';
+
+    if (category === 'single-player') {
+        categoryHeader.textContent = 'Single Player Games';
+
+        // Add Snake game button
+        const snakeButton = createGameButton('snake', 'Snake', 'icon-snake');
+        gamesContainer.appendChild(snakeButton);
+
+        // Add Tetris game button
+        const tetrisButton = createGameButton('tetris', 'Tetris', 'icon-tetris');
+        gamesContainer.appendChild(tetrisButton);
+
+        // Add Tic Tac Toe against the server's computer player
+        const tttComputerButton = createGameButton('tictactoe', 'Tic Tac Toe vs Computer', '', true);
+        gamesContainer.appendChild(tttComputerButton);
+    } else {
+        categoryHeader.textContent = 'Multiplayer Games';
+
+        // Add Pong game button
+        const pongButton = createGameButton('pong', 'Pong', 'icon-pong');
+        gamesContainer.appendChild(pongButton);
+
+        // Add Tic Tac Toe game button
+        const tttButton = createGameButton('tictactoe', 'Tic Tac Toe', '');
+        gamesContainer.appendChild(tttButton);
+
+        // Watch someone else's Pong match
+        const watchButton = document.createElement('button');
+        watchButton.className = 'game-button';
+        watchButton.textContent = 'Watch Pong';
+        watchButton.addEventListener('click', showPongMatches);
+        gamesContainer.appendChild(watchButton);
+    }
+
+    // Show game selection
+    document.getElementById('main-menu').style.display = 'none';
+    document.getElementById('game-selection').style.display = 'flex';
+}
+
+// List the live Pong matches; picking one watches it
+function showPongMatches() {
+    const gamesContainer = document.getElementById('games-container');
+    document.getElementById('category-header').textContent = 'Live Pong Matches';
+    gamesContainer.innerHTML = '';
+
+    fetch('/pong/rooms')
+        .then(response => response.json())
+        .then(data => {
+            if (!data.rooms.length) {
+                gamesContainer.textContent = 'No matches to watch right now.';
+                return;
+            }
+            data.rooms.forEach(match => {
+                const button = document.createElement('button');
+                button.className = 'game-button';
+                button.disabled = match.full;
+                button.textContent = `${match.scores.left} - ${match.scores.right} (${match.spectators} watching)`;
+                button.addEventListener('click', () => startGame('pong', false, match.room));
+                gamesContainer.appendChild(button);
+            });
+        });
+}
+
+function createGameButton(gameId, gameName, iconClass, againstComputer = false) {
+    const button = document.createElement('button');
+    button.className = 'game-button';
+    button.dataset.game = gameId;
+
+    const icon = document.createElement('span');
+    icon.className = `game-icon ${iconClass}`;
+
+    button.appendChild(icon);
+    button.appendChild(document.createTextNode(gameName));
+
+    button.addEventListener('click', () => startGame(gameId, againstComputer));
+
+    return button;
+}
+
+// With a room, watch the match in it instead of starting one
+function startGame(gameId, againstComputer = false, watchRoom = null) {
+    currentGame = gameId;
+    vsComputer = againstComputer;
+    playerRoom = watchRoom || `${gameId}_${Date.now()}`;
+
+    // Hide menus
+    document.getElementById('game-selection').style.display = 'none';
+    document.getElementById('main-menu').style.display = 'none';
+
+    // Show leaderboard links
+    document.querySelector('.leaderboard-links').style.display = 'flex';
+
+    // Show relevant game container
+    document.getElementById(`${gameId}-container`).style.display = 'block';
+
+    // Start specific game
+    if (gameId === 'snake') {
+        initSnakeGame();
+    } else if (gameId === 'tetris') {
+        initTetrisGame();
+    } else if (gameId === 'pong') {
+        initPongGame(watchRoom !== null);
+    } else if (gameId === 'tictactoe') {
+        initTicTacToeGame();
+    }
+}
+
+// Snake Game Logic
+function initSnakeGame() {
+    const canvas = document.getElementById('snake-canvas');
+    const ctx = canvas.getContext('2d');
+
+    socket.emit('join_snake', { room: playerRoom, wire: wireFormat('snake') });
+
+    let snake = [];
+    let food = null;
+    let score = 0;
+    let gameOver = false;
+    let seq = 0;
+    let awaitingResync = false;
+    lastDirection = '';
+
+    // Remove any existing event listeners to prevent duplicates
+    document.removeEventListener('keydown', handleSnakeControls);
+    document.addEventListener('keydown', handleSnakeControls);
+
+    function handleSnakeControls(e) {
+        let direction = '';
+        switch(e.key) {
+            case 'ArrowUp':
+                direction = 'UP';
+                break;
+            case 'ArrowDown':
+                direction = 'DOWN';
+                break;
+            case 'ArrowLeft':
+                direction = 'LEFT';
+                break;
+            case 'ArrowRight':
+                direction = 'RIGHT';
+                break;
+        }
+
+        if (direction && !gameOver) {
+            // Prevent 180-degree turns
+            if ((lastDirection === 'UP' && direction === 'DOWN') ||
+                (lastDirection === 'DOWN' && direction === 'UP') ||
+                (lastDirection === 'LEFT' && direction === 'RIGHT') ||
+                (lastDirection === 'RIGHT' && direction === 'LEFT')) {
+                // Don't allow 180-degree turns
+                return;
+            }
+
+            lastDirection = direction;
+            socket.emit('snake_direction', {
+                room: playerRoom,
+                direction: direction
+            });
+        }
+    }
+
+    function applySnakeKeyframe(state) {
+        snake = state.snake;
+        food = state.food;
+        score = state.score;
+        gameOver = state.game_over;
+        seq = state.seq;
+        awaitingResync = false;
+    }
+
+    socket.on('game_keyframe', (data) => {
+        if (data.game === 'snake' && currentGame === 'snake') {
+            applySnakeKeyframe(data.gameState);
+            drawSnakeGame();
+        }
+    });
+
+    socket.on('game_joined', (data) => {
+        if (data.game === 'snake') {
+            applySnakeKeyframe(data.gameState);
+            lastDirection = data.gameState.direction;
+            gameOver = false;
+
+            // Clear any existing interval
+            if (gameInterval) {
+                clearInterval(gameInterval);
+                gameInterval = null;
+            }
+
+            // The server ticks the game; we only send direction changes
+            drawSnakeGame();
+        }
+    });
+
+    socket.on('game_update', (frame) => {
+        if (currentGame !== 'snake') {
+            return;
+        }
+        const data = decodeFrame(frame);
+        if (awaitingResync || data.seq <= seq) {
+            return;
+        }
+        // A missed update means our copy is stale: ask for a keyframe
+        if (data.seq !== seq + 1) {
+            awaitingResync = true;
+            socket.emit('resync', { room: playerRoom, game: 'snake' });
+            return;
+        }
+        seq = data.seq;
+
+        // Apply the delta: new head, dropped tail, food/score on eat
+        if (data.head) {
+            snake.unshift(data.head);
+        }
+        if (data.drop_tail) {
+            snake.pop();
+        }
+        if (data.food) {
+            food = data.food;
+        }
+        if (data.score !== undefined) {
+            score = data.score;
+        }
+        gameOver = Boolean(data.game_over);
+
+        // Draw game
+        drawSnakeGame();
+
+        if (gameOver) {
+            clearInterval(gameInterval);
+            socket.emit('update_score', {
+                game_type: 'snake',
+                room: playerRoom,
+                score: score
+            });
+            showGameOver(score);
+        }
+    });
+
+    function drawSnakeGame() {
+        // Clear canvas
+        ctx.fillStyle = 'black';
+        ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+        // Draw border
+        ctx.strokeStyle = 'white';
+        ctx.lineWidth = 2;
+        ctx.strokeRect(0, 0, canvas.width, canvas.height);
+
+        // Draw game grid (optional, for better visualization)
+        ctx.strokeStyle = '#333';
+        ctx.lineWidth = 0.5;
+        for (let x = 0; x < canvas.width; x += 20) {
+            ctx.beginPath();
+            ctx.moveTo(x, 0);
+            ctx.lineTo(x, canvas.height);
+            ctx.stroke();
+        }
+        for (let y = 0; y < canvas.height; y += 20) {
+            ctx.beginPath();
+            ctx.moveTo(0, y);
+            ctx.lineTo(canvas.width, y);
+            ctx.stroke();
+        }
+
+        // Draw snake
+        ctx.fillStyle = 'green';
+        snake.forEach(part => {
+            ctx.fillRect(part[0] * 20, part[1] * 20, 20, 20);
+        });
+
+        // Draw food
+        if (food) {
+            ctx.fillStyle = 'red';
+            ctx.beginPath();
+            ctx.arc((food.x * 20) + 10, (food.y * 20) + 10, 10, 0, Math.PI * 2);
+            ctx.fill();
+        }
+
+        // Draw score
+        ctx.fillStyle = 'white';
+        ctx.font = '20px Arial';
+        ctx.fillText(`Score: ${score}`, 10, 30);
+    }
+}
+
+function restartSnakeGame() {
+    // Hide game over screen
+    document.getElementById('game-over').style.display = 'none';
+
+    // Send restart signal to server
+    socket.emit('restart_snake', { room: playerRoom, wire: wireFormat('snake') });
+
+    // Game will be reinitialized with the game_joined event
+}
+
+// Tetris Game Logic
+function initTetrisGame() {
+    const canvas = document.getElementById('tetris-canvas');
+    const ctx = canvas.getContext('2d');
+
+    socket.emit('join_tetris', { room: playerRoom, wire: wireFormat('tetris') });
+
+    let board = [];
+    let currentPiece = null;
+    let piecePosition = [0, 0];
+    let score = 0;
+    let gameOver = false;
+    let seq = 0;
+    let awaitingResync = false;
+
+    // Remove any existing event listeners to prevent duplicates
+    document.removeEventListener('keydown', handleTetrisControls);
+
+    function handleTetrisControls(e) {
+        if (gameOver) return;
+
+        let move = '';
+        switch(e.key) {
+            case 'ArrowUp':
+                move = 'rotate';
+                break;
+            case 'ArrowDown':
+                move = 'down';
+                break;
+            case 'ArrowLeft':
+                move = 'left';
+                break;
+            case 'ArrowRight':
+                move = 'right';
+                break;
+            case ' ':  // Space bar for hard drop
+                move = 'down';
+                break;
+        }
+
+        if (move) {
+            socket.emit('tetris_move', {
+                room: playerRoom,
+                move: move
+            });
+        }
+    }
+
+    // Only add the event listener once per game session
+    setTimeout(() => {
+        document.removeEventListener('keydown', handleTetrisControls);
+        document.addEventListener('keydown', handleTetrisControls);
+    }, 100);
+
+    function applyTetrisKeyframe(state) {
+        board = state.board;
+        currentPiece = state.current_piece;
+        piecePosition = state.piece_position;
+        score = state.score;
+        gameOver = state.game_over;
+        seq = state.seq;
+        awaitingResync = false;
+    }
+
+    socket.on('game_keyframe', (data) => {
+        if (data.game === 'tetris' && currentGame === 'tetris') {
+            applyTetrisKeyframe(data.gameState);
+            drawTetrisGame();
+        }
+    });
+
+    socket.on('game_joined', (data) => {
+        if (data.game === 'tetris') {
+            applyTetrisKeyframe(data.gameState);
+            gameOver = false;
+
+            // Clear any existing interval
+            if (gameInterval) {
+                clearInterval(gameInterval);
+                gameInterval = null;
+            }
+
+            // Gravity is applied by the server tick
+
+            // Initial draw
+            drawTetrisGame();
+        }
+    });
+
+    socket.on('game_update', (frame) => {
+        if (currentGame !== 'tetris') {
+            return;
+        }
+        const data = decodeFrame(frame);
+        if (awaitingResync || data.seq <= seq) {
+            return;
+        }
+        // A missed update means our copy is stale: ask for a keyframe
+        if (data.seq !== seq + 1) {
+            awaitingResync = true;
+            socket.emit('resync', { room: playerRoom, game: 'tetris' });
+            return;
+        }
+        seq = data.seq;
+
+        // Apply the delta: locked cells, then cleared rows, then the new piece
+        if (data.placed) {
+            data.placed.forEach(([row, col]) => { board[row][col] = 1; });
+        }
+        if (data.cleared_rows) {
+            [...data.cleared_rows].reverse().forEach(row => board.splice(row, 1));
+            data.cleared_rows.forEach(() => board.unshift(new Array(10).fill(0)));
+        }
+        if (data.current_piece) {
+            currentPiece = data.current_piece;
+        }
+        if (data.piece_position) {
+            piecePosition = data.piece_position;
+        }
+        if (data.score !== undefined) {
+            score = data.score;
+        }
+        gameOver = Boolean(data.game_over);
+
+        // Draw game
+        drawTetrisGame();
+
+        if (gameOver) {
+            clearInterval(gameInterval);
+            socket.emit('update_score', {
+                game_type: 'tetris',
+                room: playerRoom,
+                score: score
+            });
+            showGameOver(score);
+        }
+    });
+
+    function drawTetrisGame() {
+        // Clear canvas
+        ctx.fillStyle = 'black';
+        ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+        // Draw board
+        const blockSize = 30;
+        const offsetX = (canvas.width - blockSize * 10) / 2;
+        const offsetY = 20;
+
+        // Draw grid
+        ctx.strokeStyle = '#333';
+        for (let row = 0; row < 20; row++) {
+            for (let col = 0; col < 10; col++) {
+                ctx.strokeRect(
+                    offsetX + col * blockSize,
+                    offsetY + row * blockSize,
+                    blockSize,
+                    blockSize
+                );
+            }
+        }
+
+        // Draw placed blocks
+        for (let row = 0; row < 20; row++) {
+            for (let col = 0; col < 10; col++) {
+                if (board[row] && board[row][col]) {
+                    ctx.fillStyle = '#607D8B';
+                    ctx.fillRect(
+                        offsetX + col * blockSize,
+                        offsetY + row * blockSize,
+                        blockSize,
+                        blockSize
+                    );
+                    // Draw border for the block
+                    ctx.strokeStyle = '#455A64';
+                    ctx.lineWidth = 2;
+                    ctx.strokeRect(
+                        offsetX + col * blockSize,
+                        offsetY + row * blockSize,
+                        blockSize,
+                        blockSize
+                    );
+                }
+            }
+        }
+
+        // Draw current piece
+        if (currentPiece && piecePosition) {
+            ctx.fillStyle = '#FF9800';
+            for (let row = 0; row < currentPiece.length; row++) {
+                for (let col = 0; col < currentPiece[0].length; col++) {
+                    if (currentPiece[row][col]) {
+                        ctx.fillRect(
+                            offsetX + (piecePosition[1] + col) * blockSize,
+                            offsetY + (piecePosition[0] + row) * blockSize,
+                            blockSize,
+                            blockSize
+                        );
+                        // Draw border for the block
+                        ctx.strokeStyle = '#E65100';
+                        ctx.lineWidth = 2;
+                        ctx.strokeRect(
+                            offsetX + (piecePosition[1] + col) * blockSize,
+                            offsetY + (piecePosition[0] + row) * blockSize,
+                            blockSize,
+                            blockSize
+                        );
+                    }
+                }
+            }
+        }
+
+        // Draw score
+        ctx.fillStyle = 'white';
+        ctx.font = '20px Arial';
+        ctx.fillText(`Score: ${score}`, 10, 30);
+    }
+}
+
+function restartTetrisGame() {
+    document.getElementById('game-over').style.display = 'none';
+    socket.emit('restart_tetris', { room: playerRoom, wire: wireFormat('tetris') });
+    // Game will be reinitialized with the game_joined event
+}
+
+// Pong Game Logic
+// The server runs the physics (see pong.py). We send paddle positions
+// and draw its snapshots, interpolating the ball between the last two.
+// Spectators get fewer snapshots and interpolate the paddles as well.
+const PONG_PHYSICS_RATE = 120;  // Server physics steps per second
+const PONG_PADDLE_SPEED = 10;   // Pixels per frame while a key is held
+const PONG_INPUT_INTERVAL = 50; // Milliseconds between paddle updates sent
+
+function initPongGame(spectating = false) {
+    const canvas = document.getElementById('pong-canvas');
+    const ctx = canvas.getContext('2d');
+
+    if (spectating) {
+        socket.emit('join_pong', { room: playerRoom, wire: wireFormat('pong'), spectate: true });
+    } else {
+        // Both players share this keyboard
+        socket.emit('join_pong', { room: playerRoom, wire: wireFormat('pong'), hotseat: true });
+    }
+
+    let ball = { x: 400, y: 300, radius: 10 };
+
+    let paddles = {
+        left: { y: 250, height: 100 },   // Left paddle
+        right: { y: 250, height: 100 }   // Right paddle
+    };
+
+    let scores = { left: 0, right: 0 };
+    let keysPressed = {};
+    let previous = null;    // Snapshot before the latest
+    let latest = null;
+    let latestAt = 0;       // When the latest snapshot arrived
+    let movedSides = new Set();
+    let lastInputAt = 0;
+
+    // Set up keyboard controls for both players; spectators only watch
+    document.addEventListener('keydown', function(e) {
+        if (!spectating) {
+            keysPressed[e.key] = true;
+        }
+    });
+
+    document.addEventListener('keyup', function(e) {
+        keysPressed[e.key] = false;
+    });
+
+    socket.off('pong_spectate');
+    socket.on('pong_spectate', (data) => {
+        paddles.left.y = data.gameState.paddles.left.y;
+        paddles.right.y = data.gameState.paddles.right.y;
+        scores = data.gameState.scores;
+    });
+
+    socket.off('pong_spectate_unavailable');
+    socket.on('pong_spectate_unavailable', (data) => {
+        alert(data.reason === 'full' ? 'That match has too many spectators.' : 'That match has ended.');
+        currentGame = null;
+        playerRoom = null;
+        returnToMainMenu();
+    });
+
+    socket.off('pong_game_update');
+    socket.on('pong_game_update', (frame) => {
+        if (currentGame !== 'pong') {
+            return;
+        }
+        previous = latest;
+        latest = decodeFrame(frame);
+        latestAt = performance.now();
+        scores = latest.scores;
+        if (latest.winner) {
+            clearInterval(gameInterval);
+            gameInterval = null;
+            ball.x = latest.ball.x;
+            ball.y = latest.ball.y;
+            if (spectating) {
+                paddles.left.y = latest.paddles.left;
+                paddles.right.y = latest.paddles.right;
+            }
+            drawPongGame();
+            showGameWin(latest.winner === 'left' ? "Player 1" : "Player 2", scores.left, scores.right);
+        }
+    });
+
+    // Render loop; the server's snapshots drive the ball
+    gameInterval = setInterval(updatePongGame, 16); // ~60fps
+
+    function movePaddle(side, delta) {
+        const paddle = paddles[side];
+        paddle.y = Math.min(canvas.height - paddle.height, Math.max(0, paddle.y + delta));
+        movedSides.add(side);
+    }
+
+    function updatePongGame() {
+        const now = performance.now();
+
+        // Process player inputs; our paddles move at once and the
+        // server takes the latest position on its next tick
+        // Player 1 (W and S)
+        if (keysPressed['w'] || keysPressed['W']) {
+            movePaddle('left', -PONG_PADDLE_SPEED);
+        }
+        if (keysPressed['s'] || keysPressed['S']) {
+            movePaddle('left', PONG_PADDLE_SPEED);
+        }
+
+        // Player 2 (Arrow Up and Down)
+        if (keysPressed['ArrowUp']) {
+            movePaddle('right', -PONG_PADDLE_SPEED);
+        }
+        if (keysPressed['ArrowDown']) {
+            movePaddle('right', PONG_PADDLE_SPEED);
+        }
+
+        if (movedSides.size && now - lastInputAt >= PONG_INPUT_INTERVAL) {
+            movedSides.forEach(side => {
+                socket.emit('pong_paddle_move', {
+                    room: playerRoom,
+                    side: side,
+                    position: paddles[side].y
+                });
+            });
+            movedSides.clear();
+            lastInputAt = now;
+        }
+
+        // Draw the ball one snapshot behind the server, moving from the
+        // previous snapshot to the latest; a point resets it, so jump
+        if (latest) {
+            const start = previous && previous.scores.left + previous.scores.right === scores.left + scores.right
+                ? previous : latest;
+            const interval = (latest.step - start.step) * 1000 / PONG_PHYSICS_RATE;
+            const alpha = interval > 0 ? Math.min(1, (now - latestAt) / interval) : 1;
+            ball.x = start.ball.x + (latest.ball.x - start.ball.x) * alpha;
+            ball.y = start.ball.y + (latest.ball.y - start.ball.y) * alpha;
+            if (spectating) {
+                paddles.left.y = start.paddles.left + (latest.paddles.left - start.paddles.left) * alpha;
+                paddles.right.y = start.paddles.right + (latest.paddles.right - start.paddles.right) * alpha;
+            }
+        }
+
+        // Draw the game
+        drawPongGame();
+    }
+
+    function drawPongGame() {
+        // Clear canvas
+        ctx.fillStyle = 'black';
+        ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+        // Draw center line
+        ctx.strokeStyle = 'white';
+        ctx.setLineDash([10, 15]);
+        ctx.beginPath();
+        ctx.moveTo(canvas.width / 2, 0);
+        ctx.lineTo(canvas.width / 2, canvas.height);
+        ctx.stroke();
+        ctx.setLineDash([]);
+
+        // Draw paddles
+        ctx.fillStyle = 'white';
+        // Left paddle
+        ctx.fillRect(0, paddles.left.y, 20, paddles.left.height);
+        // Right paddle
+        ctx.fillRect(canvas.width - 20, paddles.right.y, 20, paddles.right.height);
+
+        // Draw ball
+        ctx.beginPath();
+        ctx.arc(ball.x, ball.y, ball.radius, 0, Math.PI * 2);
+        ctx.fill();
+
+        // Draw scores
+        ctx.font = '48px Arial';
+        ctx.textAlign = 'center';
+        // Left player score
+        ctx.fillText(scores.left.toString(), canvas.width / 4, 50);
+        // Right player score
+        ctx.fillText(scores.right.toString(), (canvas.width / 4) * 3, 50);
+
+        // Draw players label
+        ctx.font = '20px Arial';
+        ctx.fillText('Player 1 (W/S)', canvas.width / 4, 80);
+        ctx.fillText('Player 2 (↑/↓)', (canvas.width / 4) * 3, 80);
+    }
+
+    function showGameWin(winner, score1, score2) {
+        const gameOverDiv = document.getElementById('game-over');
+        const finalScoreDiv = document.getElementById('final-score');
+        document.querySelector('#game-over h2').textContent = `${winner} Wins!`;
+        finalScoreDiv.textContent = `Score: ${score1} - ${score2}`;
+        gameOverDiv.style.display = 'block';
+        // The server records the result for the leaderboard
+        document.getElementById('restart-btn').addEventListener('click', () => {
+            resetGame();
+        });
+    }
+}
+
+function showGameOver(score) {
+    document.getElementById('game-over').style.display = 'flex';
+    document.getElementById('final-score').innerText = score;
+}
+
+function showGameWon(playerScore, opponentScore) {
+    const gameOverDiv = document.getElementById('game-over');
+    const finalScoreDiv = document.getElementById('final-score');
+
+    document.querySelector('#game-over h2').textContent = 'You Win!';
+    finalScoreDiv.textContent = `Score: ${playerScore} - ${opponentScore}`;
+    gameOverDiv.style.display = 'block';
+
+    document.getElementById('restart-btn').addEventListener('click', () => {
+        resetGame();
+    });
+}
+
+function showGameLost(playerScore, opponentScore) {
+    const gameOverDiv = document.getElementById('game-over');
+    const finalScoreDiv = document.getElementById('final-score');
+
+    document.querySelector('#game-over h2').textContent = 'You Lost!';
+    finalScoreDiv.textContent = `Score: ${playerScore} - ${opponentScore}`;
+    gameOverDiv.style.display = 'block';
+
+    document.getElementById('restart-btn').addEventListener('click', () => {
+        resetGame();
+    });
+}
+
+function resetGame() {
+    // Hide game over
+    document.getElementById('game-over').style.display = 'none';
+
+    // Hide game containers
+    document.getElementById('snake-container').style.display = 'none';
+    document.getElementById('tetris-container').style.display = 'none';
+    document.getElementById('pong-container').style.display = 'none';
+    document.getElementById('tictactoe-container').style.display = 'none';
+
+    // Show main menu
+    document.getElementById('main-menu').style.display = 'flex';
+
+    // Hide leaderboard links
+    document.querySelector('.leaderboard-links').style.display = 'none';
+
+    // Clear any intervals
+    if (gameInterval) {
+        clearInterval(gameInterval);
+        gameInterval = null;
+    }
+
+    // Reset game state
+    if (currentGame === 'pong') {
+        // Instead of returning to menu, restart Pong in a fresh room
+        playerRoom = `pong_${Date.now()}`;
+        document.getElementById('main-menu').style.display = 'none';
+        document.getElementById('pong-container').style.display = 'block';
+        initPongGame();
+        return;
+    }
+    if (currentGame === 'tictactoe') {
+        document.getElementById('main-menu').style.display = 'none';
+        document.getElementById('tictactoe-container').style.display = 'block';
+        initTicTacToeGame();
+        return;
+    }
+    currentGame = null;
+    playerRoom = null;
+}
+
+// Initialize restart button event listener
+document.getElementById('restart-btn').addEventListener('click', resetGame);
+
+// Remove old event listener for restart-btn to avoid duplicate handlers
+document.getElementById('restart-btn').replaceWith(document.getElementById('restart-btn').cloneNode(true));
+document.getElementById('restart-btn').addEventListener('click', () => {
+    if (currentGame === 'snake') {
+        restartSnakeGame();
+    } else if (currentGame === 'tetris') {
+        restartTetrisGame();
+    } else if (currentGame === 'pong') {
+        resetGame();
+    }
+});
+
+socket.on('leaderboard_update', (data) => {
+    console.log('Leaderboard updated:', data.scores);
+});
+
+// --- Tic Tac Toe Game Logic ---
+function initTicTacToeGame() {
+    const boardDiv = document.getElementById('tictactoe-board');
+    const statusDiv = document.getElementById('tictactoe-status');
+    const restartBtn = document.getElementById('tictactoe-restart-btn');
+    let board = [[null, null, null], [null, null, null], [null, null, null]];
+    let turn = 0; // 0 for X, 1 for O
+    let winner = null;
+    let draw = false;
+    restartBtn.style.display = 'none';
+    boardDiv.innerHTML = '';
+    statusDiv.textContent = vsComputer ? 'Your turn (X)' : `Player 1's turn (X)`;
+
+    if (vsComputer) {
+        // The server plays O and answers each move in the same update
+        socket.off('tictactoe_update');
+        socket.on('tictactoe_update', (frame) => {
+            if (currentGame !== 'tictactoe') {
+                return;
+            }
+            ({ board, turn, winner, draw } = decodeFrame(frame));
+            renderBoard();
+        });
+        socket.off('tictactoe_joined');
+        socket.on('tictactoe_joined', (data) => {
+            ({ board, turn, winner, draw } = data.gameState);
+            renderBoard();
+        });
+        socket.emit('join_tictactoe', { room: playerRoom, ai: true, wire: wireFormat('tictactoe') });
+    }
+
+    function renderBoard() {
+        boardDiv.innerHTML = '';
+        for (let r = 0; r < 3; r++) {
+            for (let c = 0; c < 3; c++) {
+                const cell = document.createElement('div');
+                cell.style.width = '80px';
+                cell.style.height = '80px';
+                cell.style.background = 'rgba(255,255,255,0.1)';
+                cell.style.display = 'flex';
+                cell.style.alignItems = 'center';
+                cell.style.justifyContent = 'center';
+                cell.style.fontSize = '48px';
+                const playable = !board[r][c] && !winner && !draw && (!vsComputer || turn === 0);
+                cell.style.cursor = playable ? 'pointer' : 'default';
+                cell.style.border = '2px solid #FFA500';
+                cell.textContent = board[r][c] || '';
+                if (playable) {
+                    cell.addEventListener('click', () => {
+                        board[r][c] = turn === 0 ? 'X' : 'O';
+                        if (vsComputer) {
+                            turn = 1;
+                            socket.emit('tictactoe_move', { room: playerRoom, row: r, col: c });
+                            renderBoard();
+                            return;
+                        }
+                        if (checkWinner(board)) {
+                            winner = turn === 0 ? 'X' : 'O';
+                        } else if (isDraw(board)) {
+                            draw = true;
+                        } else {
+                            turn = 1 - turn;
+                        }
+                        renderBoard();
+                    });
+                }
+                boardDiv.appendChild(cell);
+            }
+        }
+        if (winner && vsComputer) {
+            statusDiv.textContent = winner === 'X' ? 'You win!' : 'The computer wins!';
+            restartBtn.style.display = 'block';
+        } else if (winner) {
+            statusDiv.textContent = `Player ${winner === 'X' ? 1 : 2} (${winner}) wins!`;
+            restartBtn.style.display = 'block';
+        } else if (draw) {
+            statusDiv.textContent = 'Draw!';
+            restartBtn.style.display = 'block';
+        } else if (vsComputer) {
+            statusDiv.textContent = turn === 0 ? 'Your turn (X)' : 'Computer is thinking...';
+            restartBtn.style.display = 'none';
+        } else {
+            statusDiv.textContent = `Player ${turn + 1}'s turn (${turn === 0 ? 'X' : 'O'})`;
+            restartBtn.style.display = 'none';
+        }
+    }
+    function checkWinner(b) {
+        for (let i = 0; i < 3; i++) {
+            if (b[i][0] && b[i][0] === b[i][1] && b[i][1] === b[i][2]) return true;
+            if (b[0][i] && b[0][i] === b[1][i] && b[1][i] === b[2][i]) return true;
+        }
+        if (b[0][0] && b[0][0] === b[1][1] && b[1][1] === b[2][2]) return true;
+        if (b[0][2] && b[0][2] === b[1][1] && b[1][1] === b[2][0]) return true;
+        return false;
+    }
+    function isDraw(b) {
+        return b.flat().every(cell => cell !== null) && !checkWinner(b);
+    }
+    restartBtn.onclick = function() {
+        if (vsComputer) {
+            socket.emit('restart_tictactoe', { room: playerRoom });
+            return;
+        }
+        board = [[null, null, null], [null, null, null], [null, null, null]];
+        turn = 0;
+        winner = null;
+        draw = false;
+        restartBtn.style.display = 'none';
+        renderBoard();
+    };
+    renderBoard();
+}
@@ -0,0 +1,201 @@
+"""Tetris engine: bitboard room state and piece moves, independent of Socket.IO.
+
+Each board row is an int with bit ``c`` set when column ``c`` is filled.
+Every piece is pre-rotated at import time into per-rotation row masks, so a
+collision test is a few shifts and ANDs and a line clear is a compare
+against FULL_ROW. The rows are kept in a 16-bit array.
+
+Pieces come from the room's own seeded generator and player moves are
+logged as inputs, so a game can be replayed from its seed (see replay.py).
+"""
+from array import array
+
+from recording import SeededRandom, new_seed, record
+
+BOARD_WIDTH = 10
+BOARD_HEIGHT = 20
+FULL_ROW = (1 << BOARD_WIDTH) - 1
+SPAWN_POSITION = (0, 3)  # row, col
+
+# Points per number of lines cleared at once, multiplied by the level
+LINE_SCORES = (100, 300, 500, 800)
+
+# Spawn orientation of each piece
+PIECES = [
+    # I piece
+    [[1, 1, 1, 1]],
+    # O piece
+    [[1, 1], [1, 1]],
+    # T piece
+    [[0, 1, 0], [1, 1, 1]],
+    # S piece
+    [[0, 1, 1], [1, 1, 0]],
+    # Z piece
+    [[1, 1, 0], [0, 1, 1]],
+    # J piece
+    [[1, 0, 0], [1, 1, 1]],
+    # L piece
+    [[0, 0, 1], [1, 1, 1]]
+]
+
+
+def _rotations(shape):
+    # Clockwise turns of the spawn orientation, as (matrix, width, row masks)
+    rotations = []
+    for _ in range(4):
+        masks = tuple(sum(1 << col for col, cell in enumerate(row) if cell) for row in shape)
+        rotations.append((shape, len(shape[0]), masks))
+        shape = [list(row) for row in zip(*shape[::-1])]
+    return tuple(rotations)
+
+
+# ROTATIONS[piece][rotation] -> (matrix, width, row masks)
+ROTATIONS = tuple(_rotations(shape) for shape in PIECES)
+
+# Player moves; their index is the input code in recorded games
+MOVES = ('left', 'right', 'down', 'rotate')
+MOVE_CODES = {move: code for code, move in enumerate(MOVES)}
+
+
+def generate_tetris_piece(rng):
+    return rng.randbelow(len(PIECES))
+
+
+class TetrisRoom:
+    __slots__ = ('board', 'piece', 'rotation', 'row', 'col', 'next_piece',
+                 'score', 'level', 'game_over', 'seq', 'seed', 'rng', 'ticks', 'inputs',
+                 'player_ids', 'scored')
+
+    def __init__(self, seed=None):
+        self.seed = new_seed() if seed is None else seed
+        self.rng = SeededRandom(self.seed)
+        self.ticks = 0  # Gravity drops so far
+        self.inputs = bytearray()  # Player moves (see recording.py)
+        self.player_ids = ()  # Users who joined while the game was on; only they may score it
+        self.scored = ()  # Users whose score for this game was recorded
+        self.board = array('H', bytes(2 * BOARD_HEIGHT))  # One bitmask per row, top row first
+        self.piece = generate_tetris_piece(self.rng)
+        self.rotation = 0
+        self.row, self.col = SPAWN_POSITION  # Top-left corner of the current piece
+        self.next_piece = generate_tetris_piece(self.rng)
+        self.score = 0
+        self.level = 1
+        self.game_over = False
+        self.seq = 0  # Sequence number of the last update sent to the room
+
+    def to_wire(self):
+        return {
+            'board': [[row >> col & 1 for col in range(BOARD_WIDTH)] for row in self.board],
+            'current_piece': ROTATIONS[self.piece][self.rotation][0],
+            'piece_position': [self.row, self.col],
+            'score': self.score,
+            'game_over': self.game_over,
+            'seq': self.seq
+        }
+
+
+def fits(board, piece, rotation, row, col):
+    _, width, masks = ROTATIONS[piece][rotation]
+    if col < 0 or col + width > BOARD_WIDTH or row < 0 or row + len(masks) > BOARD_HEIGHT:
+        return False
+    for i, mask in enumerate(masks):
+        if board[row + i] & (mask << col):
+            return False
+    return True
+
+
+def is_collision(game):
+    return not fits(game.board, game.piece, game.rotation, game.row, game.col)
+
+
+def place_piece(game):
+    """Lock the current piece into the board and return the cells it filled."""
+    board = game.board
+    row, col = game.row, game.col
+    _, _, masks = ROTATIONS[game.piece][game.rotation]
+    placed = []
+    for i, mask in enumerate(masks):
+        board[row + i] |= mask << col
+        placed.extend([row + i, col + c] for c in range(BOARD_WIDTH) if mask >> c & 1)
+    return placed
+
+
+def check_completed_lines(game, rows=None):
+    """Remove full rows and return their indices (top to bottom).
+
+    Only ``rows`` are tested when given, e.g. the rows a piece just locked into.
+    """
+    board = game.board
+    if rows is None:
+        rows = range(BOARD_HEIGHT)
+    cleared = [r for r in rows if board[r] == FULL_ROW]
+    # Remove completed lines and refill from the top
+    for r in cleared:
+        del board[r]
+        board.insert(0, 0)
+    return cleared
+
+
+def move_tetris_piece(game, move):
+    """Apply a move to the current piece and return what changed as a delta."""
+    board = game.board
+    piece = game.piece
+    rotation = game.rotation
+    row, col = game.row, game.col
+
+    delta = {}
+    if move in ('left', 'right', 'down'):
+        if move == 'left':
+            col -= 1
+        elif move == 'right':
+            col += 1
+        else:
+            row += 1
+        if fits(board, piece, rotation, row, col):
+            game.row, game.col = row, col
+            delta['piece_position'] = [row, col]
+        elif move == 'down':
+            delta.update(lock_piece(game))
+    elif move == 'rotate':
+        rotation = (rotation + 1) % 4
+        if fits(board, piece, rotation, row, col):
+            game.rotation = rotation
+            delta['current_piece'] = ROTATIONS[piece][rotation][0]
+    return delta
+
+
+def player_move(game, move):
+    """A move sent by a player; recorded unless it changed nothing."""
+    delta = move_tetris_piece(game, move)
+    if delta:
+        record(game, MOVE_CODES[move])
+    return delta
+
+
+def apply_gravity(game):
+    """Drop the piece one row, as the server does once per tick."""
+    game.ticks += 1
+    return move_tetris_piece(game, 'down')
+
+
+def lock_piece(game):
+    # Lock the piece, clear lines, score them and spawn the next piece
+    delta = {'placed': place_piece(game)}
+    height = len(ROTATIONS[game.piece][game.rotation][2])
+    cleared_rows = check_completed_lines(game, range(game.row, game.row + height))
+    if cleared_rows:
+        game.score += LINE_SCORES[len(cleared_rows) - 1] * game.level
+        game.level = 1 + game.score // 1000
+        delta['cleared_rows'] = cleared_rows
+        delta['score'] = game.score
+    game.piece = game.next_piece
+    game.rotation = 0
+    game.next_piece = generate_tetris_piece(game.rng)
+    game.row, game.col = SPAWN_POSITION
+    delta['current_piece'] = ROTATIONS[game.piece][0][0]
+    delta['piece_position'] = list(SPAWN_POSITION)
+    # Check for game over
+    if is_collision(game):
+        game.game_over = True
+        delta['game_over'] = True
+    return delta
@@ -0,0 +1,73 @@
+"""Tetris's Socket.IO handlers and server tick, loaded by server.load_game."""
+from flask_socketio import emit, join_room
+
+from server import add_player, add_room_member, emit_frame, game_finished, games, routed, socketio, start_tick_scheduler
+from tetris import TetrisRoom, apply_gravity, player_move
+
+
+@socketio.on('join_tetris')
+@routed('tetris')
+def handle_join_tetris(data):
+    room = data['room']
+    join_room(room)
+    start_tick_scheduler()
+    # Only initialize if not already present
+    if room not in games['tetris']:
+        games['tetris'][room] = TetrisRoom()
+    add_room_member('tetris', room, data)
+    add_player(games['tetris'][room])
+    # Notify client game started
+    emit('game_joined', {
+        'game': 'tetris',
+        'gameState': games['tetris'][room].to_wire()
+    })
+
+
+@socketio.on('tetris_move')
+@routed('tetris')
+def handle_tetris_move(data):
+    room = data['room']
+    move = data['move']
+    game = games['tetris'].get(room)
+
+    if not game or game.game_over:
+        return
+
+    delta = player_move(game, move)
+    # Blocked moves change nothing, so there is nothing to send
+    if delta:
+        if game.game_over:
+            game_finished('tetris', game)
+        game.seq += 1
+        delta['seq'] = game.seq
+        emit_frame('tetris', room, 'game_update', delta)
+
+
+@socketio.on('restart_tetris')
+@routed('tetris')
+def handle_restart_tetris(data):
+    room = data['room']
+    join_room(room)
+    games['tetris'][room] = TetrisRoom()
+    add_room_member('tetris', room, data)
+    add_player(games['tetris'][room])
+    emit('game_joined', {
+        'game': 'tetris',
+        'gameState': games['tetris'][room].to_wire()
+    })
+
+
+def tick(game):
+    if game.game_over:
+        return None
+    # Gravity: the server drops the piece one row per tick
+    delta = apply_gravity(game)
+    if game.game_over:
+        game_finished('tetris', game)
+    game.seq += 1
+    delta['seq'] = game.seq
+    return 'game_update', delta
+
+
+def finished(game):
+    return game.game_over
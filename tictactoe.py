@@ -0,0 +1,140 @@
+"""Tic-tac-toe room state and rules, independent of Socket.IO.
+
+The board is two 9-bit masks, one per mark, with bit ``row * 3 + col`` set
+for each cell the mark holds. A move only has to be tested against the
+precomputed win masks through the cell just played, and a draw is a full
+board. The computer opponent reads its moves from a table of perfect-play
+moves for every reachable position, built on the first computer move.
+"""
+import random
+from functools import lru_cache
+
+# Rows, columns, diagonals
+LINES = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6)
+)
+WIN_MASKS = tuple(sum(1 << cell for cell in line) for line in LINES)
+# WINS_THROUGH[cell] -> the win masks that include `cell`
+WINS_THROUGH = tuple(tuple(mask for mask in WIN_MASKS if mask >> cell & 1) for cell in range(9))
+FULL_BOARD = (1 << 9) - 1
+
+MARKS = ('X', 'O')
+
+
+class TicTacToeRoom:
+    __slots__ = ('x_mask', 'o_mask', 'players', 'turn', 'winner', 'draw', 'ai')
+
+    def __init__(self, players=None, ai=False):
+        self.x_mask = 0
+        self.o_mask = 0
+        # Socket ids by seat: the first plays X. A seat whose player left is None
+        # until someone takes it, so nobody else's mark or turn changes.
+        self.players = [] if players is None else players
+        self.turn = 0  # 0 for X, 1 for O
+        self.winner = None
+        self.draw = False
+        self.ai = ai  # The computer plays O
+
+    def sit(self, sid):
+        """Seat `sid` in the first free seat; return its index, or None if the room is full."""
+        if sid in self.players:
+            return self.players.index(sid)
+        if None in self.players:
+            seat = self.players.index(None)
+            self.players[seat] = sid
+            return seat
+        if len(self.players) < self.seats():
+            self.players.append(sid)
+            return len(self.players) - 1
+        return None
+
+    def leave(self, sid):
+        self.players[self.players.index(sid)] = None
+
+    def seats(self):
+        return 1 if self.ai else 2
+
+    def seated(self):
+        return sum(sid is not None for sid in self.players)
+
+    def board_wire(self):
+        return [
+            ['X' if self.x_mask >> cell & 1 else 'O' if self.o_mask >> cell & 1 else None
+             for cell in range(row, row + 3)]
+            for row in (0, 3, 6)
+        ]
+
+    def to_wire(self):
+        return {
+            'board': self.board_wire(),
+            'players': self.players,
+            'turn': self.turn,
+            'winner': self.winner,
+            'draw': self.draw,
+            'ai': self.ai
+        }
+
+
+def play(game, cell):
+    """Place the current player's mark on `cell`; return False if it is taken."""
+    bit = 1 << cell
+    if (game.x_mask | game.o_mask) & bit:
+        return False
+    if game.turn == 0:
+        game.x_mask |= bit
+        mask = game.x_mask
+    else:
+        game.o_mask |= bit
+        mask = game.o_mask
+    if any(mask & win == win for win in WINS_THROUGH[cell]):
+        game.winner = MARKS[game.turn]
+    elif game.x_mask | game.o_mask == FULL_BOARD:
+        game.draw = True
+    else:
+        game.turn = 1 - game.turn
+    return True
+
+
+def has_won(mask):
+    return any(mask & win == win for win in WIN_MASKS)
+
+
+@lru_cache(maxsize=None)
+def _score(mover, other):
+    # Minimax value for the side to move holding `mover` against `other`:
+    # positive wins, negative loses, larger when it happens sooner
+    if has_won(other):
+        return -(10 - bin(mover | other).count('1'))
+    free = FULL_BOARD & ~(mover | other)
+    if not free:
+        return 0
+    return max(-_score(other, mover | 1 << cell) for cell in range(9) if free >> cell & 1)
+
+
+@lru_cache(maxsize=None)
+def _best_moves():
+    # (x_mask, o_mask) -> perfect-play cells for the side to move, for every
+    # position reachable in a game
+    table = {}
+    positions = [(0, 0)]
+    while positions:
+        x, o = positions.pop()
+        if (x, o) in table or has_won(x) or has_won(o) or x | o == FULL_BOARD:
+            continue
+        x_to_move = bin(x).count('1') == bin(o).count('1')
+        mover, other = (x, o) if x_to_move else (o, x)
+        free = [cell for cell in range(9) if not (x | o) >> cell & 1]
+        scores = {cell: -_score(other, mover | 1 << cell) for cell in free}
+        best = max(scores.values())
+        table[x, o] = tuple(cell for cell in free if scores[cell] == best)
+        for cell in free:
+            positions.append((x | 1 << cell, o) if x_to_move else (x, o | 1 << cell))
+    _score.cache_clear()
+    return table
+
+
+def ai_move(game):
+    """Pick a perfect-play cell for the side to move; a table lookup."""
+    return random.choice(_best_moves()[game.x_mask, game.o_mask])
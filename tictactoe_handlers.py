@@ -0,0 +1,107 @@
+"""Tic-tac-toe's Socket.IO handlers, loaded by server.load_game."""
+from datetime import datetime
+
+from flask import request
+from flask_socketio import emit, join_room
+
+from server import (add_room_member, emit_frame, games, leaderboards, routed, score_writer, share_score,
+                    socket_user, socketio, start_tick_scheduler)
+from tictactoe import TicTacToeRoom, play, ai_move
+
+
+@socketio.on('join_tictactoe')
+@routed('tictactoe')
+def handle_tictactoe_join(data):
+    room = data['room']
+    join_room(room)
+    start_tick_scheduler()
+    if room not in games['tictactoe']:
+        # With 'ai' the joining player plays X against the computer
+        games['tictactoe'][room] = TicTacToeRoom(ai=bool(data.get('ai')))
+    add_room_member('tictactoe', room, data)
+    game = games['tictactoe'][room]
+    # A player who left mid-game leaves an empty seat, which the next joiner takes
+    game.sit(request.sid)
+    # Send game state and playerIndex to all players in the room
+    for idx, pid in enumerate(game.players):
+        if pid is not None:
+            emit('tictactoe_joined', {
+                'game': 'tictactoe',
+                'gameState': game.to_wire(),
+                'playerIndex': idx
+            }, room=pid)
+    if game.seated() == game.seats():
+        emit('tictactoe_start', room=room)
+
+
+@socketio.on('tictactoe_move')
+@routed('tictactoe')
+def handle_tictactoe_move(data):
+    room = data['room']
+    row = data['row']
+    col = data['col']
+    player_id = request.sid
+    game = games['tictactoe'].get(room)
+    if not game or game.winner or game.draw:
+        return
+    player_index = game.players.index(player_id) if player_id in game.players else -1
+    if player_index != game.turn:
+        return  # Not this player's turn
+    if not (0 <= row < 3 and 0 <= col < 3):
+        return
+    if not play(game, row * 3 + col):
+        return  # Cell already taken
+    if game.ai and not (game.winner or game.draw):
+        play(game, ai_move(game))
+    emit_frame('tictactoe', room, 'tictactoe_update', {
+        'board': game.board_wire(),
+        'turn': game.turn,
+        'winner': game.winner,
+        'draw': game.draw
+    })
+    # Leaderboard update if game ended
+    if game.winner or game.draw:
+        date = datetime.utcnow()
+        changed = False
+        for idx, pid in enumerate(game.players):
+            if pid is None:
+                continue
+            if game.winner:
+                score = 1 if (game.winner == ('X' if idx == 0 else 'O')) else 0
+            else:
+                score = 0.5  # Draw
+            # Players connected to another worker are not known here
+            user = socket_user(pid)
+            if user is not None:
+                score_writer.put(user.id, 'tictactoe', score, date)
+                share_score('tictactoe', user.username, score, date)
+                changed |= leaderboards.record('tictactoe', user.username, score, date)
+        if changed:
+            emit('leaderboard_update', leaderboards.to_wire('tictactoe'), broadcast=True)
+
+
+@socketio.on('restart_tictactoe')
+@routed('tictactoe')
+def handle_restart_tictactoe(data):
+    room = data['room']
+    if room in games['tictactoe']:
+        players = games['tictactoe'][room].players
+        games['tictactoe'][room] = game = TicTacToeRoom(players, ai=games['tictactoe'][room].ai)
+        # Send updated game state and playerIndex to all players
+        for idx, pid in enumerate(players):
+            if pid is not None:
+                emit('tictactoe_joined', {
+                    'game': 'tictactoe',
+                    'gameState': game.to_wire(),
+                    'playerIndex': idx
+                }, room=pid)
+
+
+def finished(game):
+    return game.winner or game.draw
+
+
+def player_left(game, sid):
+    if sid in game.players:
+        # The seat stays, so the other player keeps their mark and turn
+        game.leave(sid)
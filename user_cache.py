@@ -0,0 +1,69 @@
+"""Cached user records for Flask-Login and Socket.IO handlers.
+
+Flask-Login loads the user on every request, and each Socket.IO event is a
+request of its own. UserCache keeps a small record (id and username) per
+user id, least recently used first, for up to `ttl` seconds, so those loads
+do not reach the database. Entries are dropped on logout and whenever the
+user row changes.
+"""
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+from models import db, read, User
+
+
+class SessionUser(UserMixin):
+    """What handlers need of the logged-in user, without an ORM object."""
+    __slots__ = ('id', 'username')
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+
+def load_session_user(user_id):
+    row = read(db.select(User.id, User.username).where(User.id == user_id)).first()
+    return SessionUser(row.id, row.username) if row else None
+
+
+class UserCache:
+    def __init__(self, load=load_session_user, maxsize=10000, ttl=300):
+        self._load = load
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user id -> (record, expiry)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        user = self._load(user_id)
+        if user is None:
+            # Not cached, so a user created later is found at once
+            self._entries.pop(user_id, None)
+            return None
+        self._entries[user_id] = (user, now + self.ttl)
+        self._entries.move_to_end(user_id)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,133 @@
+"""Binary encodings for the high-frequency game events.
+
+Clients choose a wire format when they join a room: 'json' (the default)
+or 'binary'. Binary frames are sent as Socket.IO binary attachments. Each
+frame is a little-endian struct that starts with a one-byte layout id:
+
+    1 snake game_update   flags u8, seq u32, [head x u8, y u8], [food x u8, y u8], [score u16]
+    2 tetris game_update  flags u8, seq u32, [row i8, col i8],
+                          [piece height u8, width u8, cells u16 row-major],
+                          [placed n u8, n * (row u8, col u8)], [cleared n u8, n * row u8],
+                          [score u32]
+    3 pong_game_update    step u32, ball x, y, dx, dy f32, radius u8, paddle left, right f32,
+                          score left, right u16, winner u8 (0 none, 1 left, 2 right)
+    4 tictactoe_update    9 cells u8 (0 empty, 1 X, 2 O), turn u8, winner u8, draw u8
+
+A bracketed field is present only when its flag is set; the flags follow
+the field order, lowest bit first, with game_over as the last flag.
+static/js/index.js decodes the same layouts.
+
+PacketJSON is the json module Socket.IO encodes packets with, in either
+format: the stdlib's json.dumps builds a new encoder on every call that
+passes separators, which cost more than encoding the small frames.
+"""
+import json
+import struct
+
+WIRE_FORMATS = ('json', 'binary')
+
+SNAKE_DELTA = 1
+TETRIS_DELTA = 2
+PONG_SNAPSHOT = 3
+TICTACTOE_BOARD = 4
+
+_HEADER = struct.Struct('<BBI')
+_POINT = struct.Struct('<BB')
+_POSITION = struct.Struct('<bb')
+_PIECE = struct.Struct('<BBH')
+_PONG = struct.Struct('<BI4fB2f2HB')
+_TICTACTOE = struct.Struct('<B9sBBB')
+
+WINNERS = {None: 0, 'left': 1, 'right': 2}
+MARKS = {None: 0, 'X': 1, 'O': 2}
+
+
+class PacketJSON:
+    _encoder = json.JSONEncoder(separators=(',', ':'))
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return PacketJSON._encoder.encode(obj)
+
+    loads = staticmethod(json.loads)
+
+
+def stream_room(room, wire):
+    # Sockets in `room` that take its frames in `wire` format
+    return f'{room}@{wire}'
+
+
+def spectator_room(room, wire):
+    # Spectators of `room` taking its frames in `wire` format
+    return f'{room}@{wire}/watch'
+
+
+def encode_snake_delta(delta):
+    flags = 0
+    body = b''
+    if 'head' in delta:
+        flags |= 1
+        body += _POINT.pack(*delta['head'])
+    if delta.get('drop_tail'):
+        flags |= 2
+    if delta.get('food'):
+        flags |= 4
+        body += _POINT.pack(delta['food']['x'], delta['food']['y'])
+    if 'score' in delta:
+        flags |= 8
+        body += struct.pack('<H', delta['score'])
+    if delta.get('game_over'):
+        flags |= 16
+    return _HEADER.pack(SNAKE_DELTA, flags, delta['seq']) + body
+
+
+def encode_tetris_delta(delta):
+    flags = 0
+    body = b''
+    if 'piece_position' in delta:
+        flags |= 1
+        body += _POSITION.pack(*delta['piece_position'])
+    if 'current_piece' in delta:
+        flags |= 2
+        piece = delta['current_piece']
+        cells = sum(1 << i for i, cell in enumerate(cell for row in piece for cell in row) if cell)
+        body += _PIECE.pack(len(piece), len(piece[0]), cells)
+    if 'placed' in delta:
+        flags |= 4
+        placed = delta['placed']
+        body += struct.pack(f'<B{2 * len(placed)}B', len(placed), *(n for cell in placed for n in cell))
+    if 'cleared_rows' in delta:
+        flags |= 8
+        rows = delta['cleared_rows']
+        body += struct.pack(f'<B{len(rows)}B', len(rows), *rows)
+    if 'score' in delta:
+        flags |= 16
+        body += struct.pack('<I', delta['score'])
+    if delta.get('game_over'):
+        flags |= 32
+    return _HEADER.pack(TETRIS_DELTA, flags, delta['seq']) + body
+
+
+def encode_pong_snapshot(snapshot):
+    ball = snapshot['ball']
+    paddles = snapshot['paddles']
+    scores = snapshot['scores']
+    return _PONG.pack(PONG_SNAPSHOT, snapshot['step'],
+                      ball['x'], ball['y'], ball['dx'], ball['dy'], ball['radius'],
+                      paddles['left'], paddles['right'], scores['left'], scores['right'],
+                      WINNERS[snapshot['winner']])
+
+
+def encode_tictactoe_board(update):
+    cells = bytes(MARKS[cell] for row in update['board'] for cell in row)
+    return _TICTACTOE.pack(TICTACTOE_BOARD, cells, update['turn'], MARKS[update['winner']],
+                           update['draw'])
+
+
+# (game type, event) -> binary encoder for that event's JSON payload
+ENCODERS = {
+    ('snake', 'game_update'): encode_snake_delta,
+    ('tetris', 'game_update'): encode_tetris_delta,
+    ('pong', 'pong_game_update'): encode_pong_snapshot,
+    ('tictactoe', 'tictactoe_update'): encode_tictactoe_board
+}
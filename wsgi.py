@@ -0,0 +1,16 @@
+"""Process entry point: patches the standard library for gevent, then builds the app.
+
+The patching has to come before anything else imports socket, ssl or
+threading, so it lives here rather than in server.py. Serve the app with
+`python wsgi.py`, or point a gevent WSGI server at `wsgi:app`.
+"""
+from gevent import monkey
+monkey.patch_all()
+
+from server import create_app, init_db, socketio  # noqa: E402
+
+app = create_app()
+
+if __name__ == '__main__':
+    init_db()
+    socketio.run(app, debug=True)